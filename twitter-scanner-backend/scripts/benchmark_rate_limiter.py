@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-process rate limiting algorithms under client churn.
+
+Simulates a stream of distinct clients (scanning traffic, IPv6 churn)
+on a simulated clock and reports retained keys, traced memory and the
+cost per check. Memory should plateau once the first windows have
+passed instead of growing with the number of clients seen.
+
+Usage:
+    python scripts/benchmark_rate_limiter.py --clients 3000000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+from utils.rate_limit_algorithms import RATE_LIMIT_ALGORITHMS
+
+
+def run(name: str, clients: int, rate: int, window: float, max_requests: int, requests_per_client: int):
+    """Drive one algorithm with `clients` distinct keys arriving at `rate` per second."""
+    algorithm = RATE_LIMIT_ALGORITHMS[name](max_requests, window)
+    report_every = max(1, clients // 10)
+    checks = 0
+    check_time = 0.0
+
+    print(f"\n{name}: {clients:,} clients, {rate:,}/s, window {window:g}s")
+    print(f"{'clients':>12} {'sim time':>10} {'keys':>10} {'evicted':>12} {'memory MB':>10} {'ns/check':>9}")
+
+    tracemalloc.start()
+    for i in range(clients):
+        now = i / rate
+        key = f"2001:db8:{i:x}"
+        started = time.perf_counter()
+        for _ in range(requests_per_client):
+            algorithm.allow(key, now)
+        check_time += time.perf_counter() - started
+        checks += requests_per_client
+
+        if (i + 1) % report_every == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            print(
+                f"{i + 1:>12,} {now:>9.0f}s {len(algorithm.state):>10,} "
+                f"{algorithm.evictions:>12,} {current / 1024 / 1024:>10.1f} "
+                f"{check_time / checks * 1e9:>9.0f}"
+            )
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"peak traced memory: {peak / 1024 / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=3_000_000)
+    parser.add_argument("--rate", type=int, default=2000, help="new clients per simulated second")
+    parser.add_argument("--window", type=float, default=60.0, help="rate limit window in seconds")
+    parser.add_argument("--max-requests", type=int, default=100)
+    parser.add_argument("--requests-per-client", type=int, default=2)
+    parser.add_argument(
+        "--algorithm",
+        choices=sorted(RATE_LIMIT_ALGORITHMS),
+        action="append",
+        help="algorithm to run (repeatable, default: all)",
+    )
+    args = parser.parse_args()
+
+    for name in args.algorithm or sorted(RATE_LIMIT_ALGORITHMS):
+        run(name, args.clients, args.rate, args.window, args.max_requests, args.requests_per_client)
+
+
+if __name__ == "__main__":
+    main()
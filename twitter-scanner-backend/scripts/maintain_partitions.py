@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Run one usage_statistics partition maintenance pass.
+
+Creates upcoming monthly partitions, exports partitions older than
+USAGE_RETENTION_MONTHS to gzip NDJSON files in USAGE_ARCHIVE_DIR and drops
+them. The app runs the same job periodically unless
+PARTITION_MAINTENANCE_ENABLED=false; use this script from cron instead,
+or to check what a pass would do after changing retention.
+
+Usage:
+    python scripts/maintain_partitions.py
+    python scripts/maintain_partitions.py --retention-months 6
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+from core.database import db_pool
+from services.partition_maintenance import partition_maintenance
+
+
+async def run(args) -> int:
+    if args.retention_months is not None:
+        partition_maintenance.retention_months = args.retention_months
+    await db_pool.create_pool()
+    try:
+        summary = await partition_maintenance.run_once()
+    finally:
+        await db_pool.close_pool()
+
+    if "skipped" in summary:
+        print(f"skipped: {summary['skipped']}")
+        return 1
+    for name in summary["created"]:
+        print(f"created: {name}")
+    for name in summary["dropped"]:
+        print(f"archived and dropped: {name}")
+    print(f"rows archived: {summary['rows_archived']}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--retention-months", type=int, help="override USAGE_RETENTION_MONTHS for this run"
+    )
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
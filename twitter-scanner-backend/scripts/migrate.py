@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Apply or inspect database schema migrations.
+
+Run before starting a new release; the app itself only checks the
+schema version at startup (SCHEMA_CHECK=warn|refuse).
+
+Usage:
+    python scripts/migrate.py status
+    python scripts/migrate.py upgrade [--to VERSION]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+from core.database import db_pool
+from core.migrations import get_schema_status, migrate
+
+
+async def run(args) -> int:
+    await db_pool.create_pool()
+    try:
+        if args.command == "status":
+            status = await get_schema_status()
+            print(f"current version: {status['current']}")
+            print(f"latest version:  {status['latest']}")
+            for name in status["pending"]:
+                print(f"pending: {name}")
+            return 1 if status["pending"] else 0
+
+        applied = await migrate(args.to)
+        for migration in applied:
+            print(f"applied: {migration.version:04d}_{migration.name}")
+        if not applied:
+            print("schema is up to date")
+        return 0
+    finally:
+        await db_pool.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="show applied and pending migrations (exit 1 if any pending)")
+    upgrade = subparsers.add_parser("upgrade", help="apply pending migrations")
+    upgrade.add_argument("--to", type=int, help="stop after this version")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Rebuild the usage rollup tables from raw usage_statistics rows.
+
+Rollups are maintained as usage records are written; run this once to
+backfill history recorded before the rollup tables existed, or to repair
+a range of days. Days are processed one at a time to keep transactions
+short.
+
+Usage:
+    python scripts/rebuild_rollups.py --start 2025-01-01 --end 2025-02-01
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+from core.database import UsageStatsDB, db_pool
+
+
+def parse_date(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+async def rebuild(start: datetime, end: datetime):
+    await db_pool.create_pool()
+    try:
+        day = start
+        while day < end:
+            rows = await UsageStatsDB.rebuild_rollups(day, day + timedelta(days=1))
+            print(f"{day:%Y-%m-%d}: {rows} raw rows aggregated")
+            day += timedelta(days=1)
+    finally:
+        await db_pool.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--start", type=parse_date, required=True, help="first day (YYYY-MM-DD)")
+    parser.add_argument(
+        "--end",
+        type=parse_date,
+        default=datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1),
+        help="day after the last one (YYYY-MM-DD, default: tomorrow)",
+    )
+    args = parser.parse_args()
+    asyncio.run(rebuild(args.start, args.end))
+
+
+if __name__ == "__main__":
+    main()
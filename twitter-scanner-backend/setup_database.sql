@@ -10,21 +10,63 @@ USE twitter_scanner;
 -- Create usage_statistics table
 DROP TABLE IF EXISTS usage_statistics;
 CREATE TABLE IF NOT EXISTS usage_statistics (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
+    user_id VARCHAR(36) COMMENT '用户ID',
     client_ip VARCHAR(45) NOT NULL COMMENT '客户端IP地址',
     user_agent TEXT COMMENT '浏览器标识信息',
     success BOOLEAN NOT NULL COMMENT '是否成功',
+    outcome VARCHAR(20) NOT NULL DEFAULT 'success' COMMENT '结果(success/error/cancelled/deadline_exceeded)',
     twitter_count INT NOT NULL COMMENT '分析的Twitter数量',
     content_length INT NOT NULL COMMENT '处理内容总长度(字符数)',
     processing_time_ms INT NOT NULL COMMENT '处理时间(毫秒)',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '记录创建时间',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '记录创建时间',
     
-    -- 索引
-    INDEX idx_client_ip (client_ip),
-    INDEX idx_created_at (created_at),
-    INDEX idx_success (success)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户统计信息表';
-ALTER TABLE usage_statistics
-  MODIFY COLUMN user_id VARCHAR(36) COMMENT '用户ID'、;
+    -- 分区键必须包含在主键中
+    PRIMARY KEY (id, created_at),
+    -- 索引 (查询使用 created_at 范围条件, 不使用 DATE(created_at);
+    -- 记录分页按 id 倒序)
+    INDEX idx_created_client (created_at, client_ip),
+    INDEX idx_client_id (client_ip, id),
+    INDEX idx_user_id_id (user_id, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户统计信息表'
+-- Monthly partitions (pYYYYMM) are split off pfuture and expired ones
+-- archived and dropped by the partition maintenance job
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+    PARTITION pfuture VALUES LESS THAN MAXVALUE
+);
+-- Rollup tables read by the stats API (maintained as usage records are written;
+-- backfill with scripts/rebuild_rollups.py). user_id '' means no user id.
+CREATE TABLE IF NOT EXISTS usage_rollup_hourly (
+    bucket DATETIME NOT NULL COMMENT '小时起始时间',
+    client_ip VARCHAR(45) NOT NULL COMMENT '客户端IP地址',
+    user_id VARCHAR(36) NOT NULL DEFAULT '' COMMENT '用户ID',
+    outcome VARCHAR(20) NOT NULL COMMENT '结果',
+    requests INT NOT NULL DEFAULT 0 COMMENT '请求数',
+    tweets BIGINT NOT NULL DEFAULT 0 COMMENT '分析的Twitter数量',
+    content_length BIGINT NOT NULL DEFAULT 0 COMMENT '处理内容总长度',
+    processing_time_ms BIGINT NOT NULL DEFAULT 0 COMMENT '处理时间总和(毫秒)',
+    first_access TIMESTAMP NULL COMMENT '首次访问时间',
+    last_access TIMESTAMP NULL COMMENT '最后访问时间',
+    PRIMARY KEY (bucket, client_ip, user_id, outcome),
+    INDEX idx_client_ip_bucket (client_ip, bucket),
+    INDEX idx_user_id_bucket (user_id, bucket)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='按小时汇总的统计信息';
+
+CREATE TABLE IF NOT EXISTS usage_rollup_daily (
+    bucket DATE NOT NULL COMMENT '日期',
+    client_ip VARCHAR(45) NOT NULL COMMENT '客户端IP地址',
+    user_id VARCHAR(36) NOT NULL DEFAULT '' COMMENT '用户ID',
+    outcome VARCHAR(20) NOT NULL COMMENT '结果',
+    requests INT NOT NULL DEFAULT 0 COMMENT '请求数',
+    tweets BIGINT NOT NULL DEFAULT 0 COMMENT '分析的Twitter数量',
+    content_length BIGINT NOT NULL DEFAULT 0 COMMENT '处理内容总长度',
+    processing_time_ms BIGINT NOT NULL DEFAULT 0 COMMENT '处理时间总和(毫秒)',
+    first_access TIMESTAMP NULL COMMENT '首次访问时间',
+    last_access TIMESTAMP NULL COMMENT '最后访问时间',
+    PRIMARY KEY (bucket, client_ip, user_id, outcome),
+    INDEX idx_client_ip_bucket (client_ip, bucket),
+    INDEX idx_user_id_bucket (user_id, bucket)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='按天汇总的统计信息';
+
 -- Show table structure
 DESCRIBE usage_statistics;
\ No newline at end of file
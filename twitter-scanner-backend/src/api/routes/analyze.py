@@ -1,25 +1,63 @@
 """Tweet analysis route."""
 
+import asyncio
+import json
+import math
 import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
 from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi.responses import StreamingResponse
 
-from core.models import AnalyzeRequest, AnalyzeResponse, UsageInfo
+from core.config import settings
+from core.models import AnalyzeRequest, AnalyzeResponse, Tweet, UsageInfo
 from core.logging_config import get_logger
-from core.database import UsageStatsDB
-from services.claude_client import ClaudeClient, ClaudeAPIError
-from utils.rate_limiter import rate_limit_manager
+from core.database import (
+    OUTCOME_CANCELLED,
+    OUTCOME_DEADLINE_EXCEEDED,
+    OUTCOME_ERROR,
+    OUTCOME_SUCCESS,
+)
+from services.analysis_cache import analysis_cache
+from services.chunked_analysis import AnalysisResult, chunked_analyzer
+from services.model_router import ModelRoute, model_router
+from services.tweet_compactor import CompactionResult, tweet_compactor
+from services.usage_cost import usage_cost_model
+from services.usage_recorder import usage_recorder
+from services.single_flight import (
+    analysis_request_flights,
+    upstream_analysis_flights,
+)
+from services.claude_client import (
+    claude_client,
+    ClaudeAPIError,
+    UpstreamUnavailableError,
+    request_deadline,
+    track_usage,
+)
+from utils.rate_limiter import RateLimiterUnavailableError, rate_limit_manager
 
 router = APIRouter()
 logger = get_logger("api.analyze")
 
-# Initialize Claude client
-claude_client = ClaudeClient()
+T = TypeVar("T")
 
 
 # Dependencies for rate limiting
+def rate_limiter_unavailable(error: RateLimiterUnavailableError) -> HTTPException:
+    """503 for requests rejected while the shared limiter is down (fail-closed)."""
+    return HTTPException(
+        status_code=503,
+        detail={"error": "Rate limiter unavailable", "retry_after": error.retry_after},
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
 async def check_rate_limit(request: Request):
     """Dependency to check rate limits."""
-    is_allowed, retry_after = rate_limit_manager.check_rate_limit(request)
+    try:
+        is_allowed, retry_after = await rate_limit_manager.check_rate_limit(request)
+    except RateLimiterUnavailableError as e:
+        raise rate_limiter_unavailable(e)
     if not is_allowed:
         client_ip = rate_limit_manager.get_client_ip(request)
         logger.warning(
@@ -31,33 +69,249 @@ async def check_rate_limit(request: Request):
         )
 
 
-async def check_usage_limit(request: Request):
-    """Dependency to check usage limits."""
-    is_allowed, usage_info = rate_limit_manager.check_usage_limit(request)
-    if not is_allowed:
-        client_ip = rate_limit_manager.get_client_ip(request)
+def usage_limit_exceeded(
+    usage_info: Dict[str, Any], required: Optional[float] = None
+) -> HTTPException:
+    """429 for a client whose remaining budget cannot cover the request."""
+    detail = {
+        "error": (
+            f"Free usage limit reached ({usage_info['limit']} units per "
+            f"{settings.usage_reset_interval_hours} hours)"
+        ),
+        "usage": usage_info["usage"],
+        "limit": usage_info["limit"],
+        "remaining": usage_info["remaining"],
+        "reset_time": usage_info["reset_time"],
+    }
+    if required is not None:
+        detail["required"] = required
+    return HTTPException(status_code=429, detail=detail)
+
+
+async def reserve_usage(
+    request: Optional[Request], units: float, client_key: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Reserve the estimated cost of an analysis before calling Claude.
+
+    This is also the usage admission check (zero units only checks); the
+    budget is checked and charged atomically in a single round trip.
+
+    Returns:
+        Usage info after the reservation
+
+    Raises:
+        HTTPException: 429 if the remaining budget cannot cover it, 503 if
+            the shared limiter is down and the policy is fail-closed
+    """
+    try:
+        reserved, usage_info = await rate_limit_manager.reserve_usage(
+            request, units, client_key
+        )
+    except RateLimiterUnavailableError as e:
+        raise rate_limiter_unavailable(e)
+    if not reserved:
         logger.warning(
-            "Usage limit exceeded", client_ip=client_ip, usage_info=usage_info
+            "Usage budget too small for request",
+            client_key=client_key,
+            required=units,
+            remaining=usage_info["remaining"],
         )
-        raise HTTPException(
-            status_code=429,
-            detail={
-                "error": f"Free usage limit reached ({usage_info['limit']} requests per 24 hours)",
-                "usage": usage_info["usage"],
-                "limit": usage_info["limit"],
-                "reset_time": usage_info["reset_time"],
-            },
+        raise usage_limit_exceeded(usage_info, units or None)
+    return usage_info
+
+
+def cache_hit_units(tweet_count: int) -> float:
+    """Units charged for a result served from the analysis cache."""
+    if settings.analysis_cache_hits_count_usage:
+        return usage_cost_model.cache_hit(tweet_count)
+    return 0.0
+
+
+async def record_usage_stats(
+    request: Request,
+    analyze_request: AnalyzeRequest,
+    success: bool,
+    processing_time_ms: int,
+    outcome: Optional[str] = None,
+):
+    """Record usage statistics for an analysis, never failing the request."""
+    await save_usage_record(
+        client_ip=rate_limit_manager.get_client_ip(request),
+        user_agent=request.headers.get("User-Agent"),
+        user_id=request.headers.get("X-User-ID") or analyze_request.user_id,
+        analyze_request=analyze_request,
+        success=success,
+        processing_time_ms=processing_time_ms,
+        outcome=outcome,
+    )
+
+
+async def save_usage_record(
+    client_ip: str,
+    user_agent: Optional[str],
+    user_id: Optional[str],
+    analyze_request: AnalyzeRequest,
+    success: bool,
+    processing_time_ms: int,
+    outcome: Optional[str] = None,
+):
+    """Queue one usage record from explicit client details (written in batches)."""
+    await usage_recorder.record(
+        client_ip=client_ip,
+        success=success,
+        twitter_count=len(analyze_request.tweets),
+        content_length=sum(len(tweet.content) for tweet in analyze_request.tweets),
+        processing_time_ms=processing_time_ms,
+        user_agent=user_agent,
+        user_id=user_id,
+        outcome=outcome,
+    )
+
+
+def build_cache_key(
+    analyze_request: AnalyzeRequest,
+    tweets: List[Tweet],
+    model: str,
+    max_tokens: int,
+    chunked: bool,
+) -> str:
+    """Build the result cache key for an analysis request (from the compacted tweets)."""
+    effective_system_prompt = (
+        analyze_request.system_prompt or claude_client.get_default_system_prompt()
+    )
+    return analysis_cache.make_key(
+        tweets,
+        effective_system_prompt,
+        {
+            **claude_client.get_model_params(model, max_tokens),
+            "chunked": chunked,
+        },
+    )
+
+
+class RequestCancelledError(Exception):
+    """The client disconnected or its deadline passed before the analysis finished."""
+
+    def __init__(self, outcome: str):
+        self.outcome = outcome
+        super().__init__(outcome)
+
+
+def get_client_timeout(request: Request) -> Optional[float]:
+    """Client deadline in seconds from the timeout header, if one was sent."""
+    value = request.headers.get(settings.client_timeout_header)
+    try:
+        timeout_ms = int(value) if value else 0
+    except ValueError:
+        return None
+    return timeout_ms / 1000 if timeout_ms > 0 else None
+
+
+async def wait_for_disconnect(request: Request):
+    """Return once the client disconnects (the body is already read, so the
+    next ASGI receive message is the disconnect)."""
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def run_until_cancelled(
+    request: Request,
+    fn: Callable[[], Awaitable[T]],
+    timeout: Optional[float] = None,
+) -> T:
+    """
+    Run fn() until it finishes, the client disconnects or the deadline passes.
+
+    The deadline is propagated to the Claude client so retries that cannot
+    finish in time are not started; on disconnect or deadline the work is
+    cancelled, which aborts the in-flight upstream call.
+
+    Args:
+        request: Incoming request (watched for disconnects)
+        fn: Coroutine factory performing the work
+        timeout: Client deadline in seconds, or None
+
+    Returns:
+        Result of fn()
+
+    Raises:
+        RequestCancelledError: If the client disconnected or the deadline passed
+    """
+    with request_deadline(timeout):
+        work = asyncio.ensure_future(fn())
+    watcher = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait(
+            {work, watcher}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
         )
+        if work in done:
+            return work.result()
+        raise RequestCancelledError(
+            OUTCOME_CANCELLED if watcher in done else OUTCOME_DEADLINE_EXCEEDED
+        )
+    finally:
+        watcher.cancel()
+        if not work.done():
+            work.cancel()
+            await asyncio.gather(work, return_exceptions=True)
 
-    # Store usage info in request state for later use
-    request.state.usage_info = usage_info
-    return usage_info
+
+def claude_error_status(error: ClaudeAPIError) -> int:
+    """Map a Claude API error to the HTTP status reported to the client."""
+    if isinstance(error, UpstreamUnavailableError):
+        return 503
+    if error.status_code == 429:
+        return 429
+    if error.status_code and 400 <= error.status_code < 500:
+        return 400
+    return 500
+
+
+async def run_claude_analysis(
+    analyze_request: AnalyzeRequest,
+    compaction: CompactionResult,
+    use_chunking: bool,
+    route: ModelRoute,
+) -> Tuple[AnalysisResult, Dict[str, int]]:
+    """Call Claude API (map-reduce for large batches) and return the analysis and token usage."""
+    start_time = time.time()
+    success = False
+    with track_usage() as upstream_usage:
+        try:
+            if use_chunking:
+                analysis = await chunked_analyzer.analyze(
+                    compaction.tweets,
+                    analyze_request.system_prompt,
+                    model=route.model,
+                    max_tokens=route.max_tokens,
+                )
+            else:
+                analysis = AnalysisResult(
+                    await claude_client.analyze_tweets(
+                        compaction.tweets,
+                        analyze_request.system_prompt,
+                        max_tokens=compaction.max_tokens,
+                        model=route.model,
+                    ),
+                    len(compaction.tweets),
+                )
+            success = True
+        finally:
+            model_router.record(
+                route,
+                len(compaction.tweets),
+                time.time() - start_time,
+                upstream_usage,
+                success,
+            )
+    return analysis, upstream_usage
 
 
 @router.post(
     "/api/analyze",
     response_model=AnalyzeResponse,
-    dependencies=[Depends(check_rate_limit), Depends(check_usage_limit)],
+    dependencies=[Depends(check_rate_limit)],
 )
 async def analyze_tweets(request: Request, analyze_request: AnalyzeRequest):
     """
@@ -70,9 +324,6 @@ async def analyze_tweets(request: Request, analyze_request: AnalyzeRequest):
     client_ip = rate_limit_manager.get_client_ip(request)
     request_id = f"{client_ip}_{int(start_time)}"
 
-    # Get user_id from request headers or body (generated by frontend)
-    user_id = request.headers.get('X-User-ID') or analyze_request.user_id
-
     # Calculate basic metrics
     tweet_count = len(analyze_request.tweets)
     total_content_length = sum(len(tweet.content) for tweet in analyze_request.tweets)
@@ -82,7 +333,10 @@ async def analyze_tweets(request: Request, analyze_request: AnalyzeRequest):
         return int((time.time() - start_time) * 1000)
 
     async def log_error_and_raise(
-        error_msg: str, status_code: int = 500, **extra_context
+        error_msg: str,
+        status_code: int = 500,
+        headers: Optional[Dict[str, str]] = None,
+        **extra_context,
     ):
         """Log error, record failed statistics, and raise HTTPException."""
         processing_time_ms = get_processing_time_ms()
@@ -99,23 +353,7 @@ async def analyze_tweets(request: Request, analyze_request: AnalyzeRequest):
         )
 
         # Record failed usage statistics
-        try:
-            user_agent = request.headers.get("User-Agent")
-            await UsageStatsDB.add_usage_record(
-                client_ip=client_ip,
-                success=False,
-                twitter_count=tweet_count,
-                content_length=total_content_length,
-                processing_time_ms=processing_time_ms,
-                user_agent=user_agent,
-                user_id=user_id,
-            )
-        except Exception as db_error:
-            logger.error(
-                "Failed to record failed usage statistics",
-                client_ip=client_ip,
-                error=str(db_error),
-            )
+        await record_usage_stats(request, analyze_request, False, processing_time_ms)
 
         raise HTTPException(
             status_code=status_code,
@@ -124,11 +362,9 @@ async def analyze_tweets(request: Request, analyze_request: AnalyzeRequest):
                 "error": error_msg,
                 "processingTime": processing_time_ms,
             },
+            headers=headers,
         )
 
-    # Get usage info (since dependency is commented out)
-    _, usage_info = rate_limit_manager.check_usage_limit(request)
-
     # Log request start
     logger.info(
         "开始分析",
@@ -136,80 +372,408 @@ async def analyze_tweets(request: Request, analyze_request: AnalyzeRequest):
         client_ip=client_ip,
         tweet_count=tweet_count,
         content_length=total_content_length,
-        current_usage=usage_info["usage"],
+        mode=analyze_request.mode,
     )
 
-    try:
-        # Call Claude API
-        analysis = await claude_client.analyze_tweets(
-            analyze_request.tweets, analyze_request.system_prompt
-        )
+    # Pick the model tier, then trim whitespace, URL and duplicate noise
+    # and fit the input budget
+    route = model_router.route(analyze_request.tweets, analyze_request.template_id)
+    compaction = tweet_compactor.compact(analyze_request.tweets, route.max_tokens)
 
-        # Update usage counter
-        updated_usage = rate_limit_manager.increment_usage(request)
+    # Serve identical content from the result cache unless the client opts out
+    use_chunking = chunked_analyzer.should_chunk(compaction.tweets, analyze_request.mode)
+    cache_key = build_cache_key(
+        analyze_request,
+        compaction.tweets,
+        route.model,
+        compaction.max_tokens,
+        use_chunking,
+    )
+    bypass_cache = "no-cache" in request.headers.get("Cache-Control", "").lower()
+    cache_status = "bypass" if bypass_cache else "miss"
+    cached_analysis = None if bypass_cache else await analysis_cache.get(cache_key)
+
+    if cached_analysis is not None:
+        # Admit and charge the hit in one call (zero units when hits are free)
+        updated_usage = await reserve_usage(
+            request, cache_hit_units(len(compaction.tweets))
+        )
         processing_time_ms = get_processing_time_ms()
 
-        # Record successful usage statistics
-        try:
-            user_agent = request.headers.get("User-Agent")
-            await UsageStatsDB.add_usage_record(
-                client_ip=client_ip,
-                success=True,
-                twitter_count=tweet_count,
-                content_length=total_content_length,
-                processing_time_ms=processing_time_ms,
-                user_agent=user_agent,
-                user_id=user_id,
-            )
-        except Exception as db_error:
-            logger.error(
-                "Failed to record usage statistics",
-                client_ip=client_ip,
-                error=str(db_error),
-            )
+        await record_usage_stats(request, analyze_request, True, processing_time_ms)
 
-        # Log successful completion
         logger.info(
-            "tweet analysis completed",
+            "tweet analysis served from cache",
             request_id=request_id,
             client_ip=client_ip,
             processing_time_ms=processing_time_ms,
-            analysis_length=len(analysis),
+            cache_key=cache_key[:16],
             new_usage=updated_usage["usage"],
         )
 
         return AnalyzeResponse(
             success=True,
-            analysis=analysis,
+            analysis=cached_analysis,
             usage=UsageInfo(
                 current=updated_usage["usage"],
                 limit=updated_usage["limit"],
                 remaining=updated_usage["remaining"],
             ),
             processingTime=processing_time_ms,
+            cacheStatus="hit",
+            tokensSaved=compaction.tokens_saved,
+            model=route.model,
         )
 
-    except ClaudeAPIError as e:
-        # Determine error type
-        if e.status_code == 429:
-            status_code = 429
-        elif e.status_code and 400 <= e.status_code < 500:
-            status_code = 400
-        else:
-            status_code = 500
+    async def run_analysis() -> AnalyzeResponse:
+        """Call Claude, charge usage and record statistics (once per logical request)."""
+        # Reserve the estimated cost up front; it is reconciled against the
+        # reported tokens on success and refunded if the call fails
+        reserved = usage_cost_model.estimate(compaction, analyze_request.system_prompt)
+        await reserve_usage(request, reserved)
+        settled = False
+        try:
+            # Identical content analyzed concurrently by other clients shares one call
+            (result, upstream_usage), _ = await upstream_analysis_flights.do(
+                cache_key,
+                lambda: run_claude_analysis(
+                    analyze_request, compaction, use_chunking, route
+                ),
+            )
+            analysis = result.text
+
+            # Store result for identical future requests; a partial digest
+            # (some chunks failed) is not reused, the next request retries
+            if not result.partial:
+                await analysis_cache.set(cache_key, analysis)
 
-        await log_error_and_raise(
-            error_msg=e.message,
-            status_code=status_code,
-            claude_status_code=e.status_code,
-            attempt=e.attempt,
-            error_type="claude_api_error",
+            # Settle the reservation at the actual cost of what was analyzed
+            cost = usage_cost_model.actual(result.analyzed_tweets, upstream_usage)
+            updated_usage = await rate_limit_manager.reconcile_usage(
+                request, reserved, cost
+            )
+            settled = True
+            processing_time_ms = get_processing_time_ms()
+
+            # Record successful usage statistics
+            await record_usage_stats(request, analyze_request, True, processing_time_ms)
+
+            # Log successful completion
+            logger.info(
+                "tweet analysis completed",
+                request_id=request_id,
+                client_ip=client_ip,
+                processing_time_ms=processing_time_ms,
+                analysis_length=len(analysis),
+                new_usage=updated_usage["usage"],
+                reserved_units=reserved,
+                charged_units=cost,
+                partial=result.partial,
+                upstream_usage=upstream_usage,
+                model_route=route.name,
+                model=route.model,
+            )
+
+            return AnalyzeResponse(
+                success=True,
+                analysis=analysis,
+                usage=UsageInfo(
+                    current=updated_usage["usage"],
+                    limit=updated_usage["limit"],
+                    remaining=updated_usage["remaining"],
+                ),
+                processingTime=processing_time_ms,
+                cacheStatus=cache_status,
+                upstreamUsage=upstream_usage,
+                tokensSaved=compaction.tokens_saved,
+                model=route.model,
+                partial=result.partial,
+            )
+
+        except UpstreamUnavailableError as e:
+            retry_after = max(1, math.ceil(e.retry_after))
+            await log_error_and_raise(
+                error_msg=e.message,
+                status_code=503,
+                headers={"Retry-After": str(retry_after)},
+                retry_after=retry_after,
+                error_type="upstream_unavailable",
+            )
+
+        except ClaudeAPIError as e:
+            await log_error_and_raise(
+                error_msg=e.message,
+                status_code=claude_error_status(e),
+                claude_status_code=e.status_code,
+                attempt=e.attempt,
+                error_type="claude_api_error",
+            )
+
+        except Exception as e:
+            await log_error_and_raise(
+                error_msg="Internal server error",
+                status_code=500,
+                original_error=str(e),
+                error_type=type(e).__name__,
+            )
+
+        finally:
+            # Failed or cancelled analyses are not charged
+            if not settled:
+                await asyncio.shield(
+                    rate_limit_manager.reconcile_usage(request, reserved, 0)
+                )
+
+    # Duplicate logical requests (same Idempotency-Key, or same content from
+    # the same client) join the in-flight analysis or reuse its result and
+    # are not charged again; a cache bypass only joins in-flight calls
+    idempotency_key = request.headers.get("Idempotency-Key")
+    logical_key = (
+        f"{rate_limit_manager.get_client_key(request)}:{idempotency_key or cache_key}"
+    )
+    # Stop waiting on Claude once the client is gone or its deadline passed;
+    # the upstream call is cancelled unless duplicate requests still wait on it
+    client_timeout = get_client_timeout(request)
+    try:
+        response, shared = await run_until_cancelled(
+            request,
+            lambda: analysis_request_flights.do(
+                logical_key,
+                run_analysis,
+                reuse_result=bool(idempotency_key) or not bypass_cache,
+                retain=lambda response: not response.partial,
+            ),
+            client_timeout,
+        )
+    except RequestCancelledError as e:
+        processing_time_ms = get_processing_time_ms()
+        logger.warning(
+            "analysis abandoned by client, upstream call cancelled",
+            request_id=request_id,
+            client_ip=client_ip,
+            outcome=e.outcome,
+            client_timeout_ms=int(client_timeout * 1000) if client_timeout else None,
+            processing_time_ms=processing_time_ms,
+            tweet_count=tweet_count,
+        )
+        await record_usage_stats(
+            request, analyze_request, False, processing_time_ms, outcome=e.outcome
+        )
+        deadline_exceeded = e.outcome == OUTCOME_DEADLINE_EXCEEDED
+        raise HTTPException(
+            status_code=504 if deadline_exceeded else 499,
+            detail={
+                "success": False,
+                "error": (
+                    "Request deadline exceeded"
+                    if deadline_exceeded
+                    else "Client closed request"
+                ),
+                "processingTime": processing_time_ms,
+            },
+        )
+
+    if shared:
+        logger.info(
+            "duplicate analyze request served from shared result",
+            request_id=request_id,
+            client_ip=client_ip,
+            idempotency_key=idempotency_key,
+            processing_time_ms=get_processing_time_ms(),
         )
+        return response.model_copy(update={"cacheStatus": "shared"})
+    return response
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post(
+    "/api/analyze/stream",
+    dependencies=[Depends(check_rate_limit)],
+)
+async def analyze_tweets_stream(request: Request, analyze_request: AnalyzeRequest):
+    """
+    Analyze tweets using Claude API, streaming the result as server-sent events.
+
+    Events:
+        delta: {"text": ...} for each chunk of the markdown analysis
+        done: usage, processing time, time to first token and upstream token usage
+        error: {"error": ..., "status_code": ...} if the analysis failed
 
-    except Exception as e:
-        await log_error_and_raise(
-            error_msg="Internal server error",
-            status_code=500,
-            original_error=str(e),
-            error_type=type(e).__name__,
+    Streaming always uses a single Claude call (the mode field is ignored).
+    The estimated cost is reserved before streaming starts and settled at
+    the actual cost on completion; a stream that fails or is aborted keeps
+    the reservation once any text has been delivered. A usage record is
+    written when the stream completes, fails or is aborted by the client.
+    """
+    start_time = time.time()
+    client_ip = rate_limit_manager.get_client_ip(request)
+    request_id = f"{client_ip}_{int(start_time)}"
+    tweet_count = len(analyze_request.tweets)
+
+    route = model_router.route(analyze_request.tweets, analyze_request.template_id)
+    compaction = tweet_compactor.compact(analyze_request.tweets, route.max_tokens)
+    cache_key = build_cache_key(
+        analyze_request,
+        compaction.tweets,
+        route.model,
+        compaction.max_tokens,
+        chunked=False,
+    )
+    bypass_cache = "no-cache" in request.headers.get("Cache-Control", "").lower()
+    cached_analysis = None if bypass_cache else await analysis_cache.get(cache_key)
+    client_timeout = get_client_timeout(request)
+    reserved = 0.0
+    if cached_analysis is None:
+        reserved = usage_cost_model.estimate(compaction, analyze_request.system_prompt)
+        await reserve_usage(request, reserved)
+    else:
+        hit_usage = await reserve_usage(
+            request, cache_hit_units(len(compaction.tweets))
         )
+
+    logger.info(
+        "开始流式分析",
+        request_id=request_id,
+        client_ip=client_ip,
+        tweet_count=tweet_count,
+        cache_hit=cached_analysis is not None,
+        model_route=route.name,
+    )
+
+    async def event_stream():
+        success = False
+        cancelled = False
+        delivered = False
+        settled = False
+        first_token_ms = None
+        upstream_usage: Dict[str, Any] = {}
+        analysis_parts = []
+        try:
+            if cached_analysis is not None:
+                first_token_ms = int((time.time() - start_time) * 1000)
+                delivered = True
+                yield format_sse("delta", {"text": cached_analysis})
+                cache_status = "hit"
+            else:
+                upstream_start = time.time()
+                # The deadline bounds retries before the first byte; client
+                # disconnects cancel this generator (and the upstream stream)
+                with request_deadline(client_timeout):
+                    async for event in claude_client.stream_tweets_analysis(
+                        compaction.tweets,
+                        analyze_request.system_prompt,
+                        max_tokens=compaction.max_tokens,
+                        model=route.model,
+                    ):
+                        if event["type"] == "text":
+                            if first_token_ms is None:
+                                first_token_ms = int((time.time() - start_time) * 1000)
+                            delivered = True
+                            analysis_parts.append(event["text"])
+                            yield format_sse("delta", {"text": event["text"]})
+                        elif event["type"] == "done":
+                            upstream_usage = event["usage"]
+                model_router.record(
+                    route,
+                    len(compaction.tweets),
+                    time.time() - upstream_start,
+                    upstream_usage,
+                )
+                if analysis_parts:
+                    await analysis_cache.set(cache_key, "".join(analysis_parts))
+                cache_status = "bypass" if bypass_cache else "miss"
+
+            if cache_status != "hit":
+                updated_usage = await rate_limit_manager.reconcile_usage(
+                    request,
+                    reserved,
+                    usage_cost_model.actual(len(compaction.tweets), upstream_usage),
+                )
+            else:
+                updated_usage = hit_usage
+            settled = True
+            success = True
+
+            yield format_sse(
+                "done",
+                {
+                    "success": True,
+                    "usage": UsageInfo(
+                        current=updated_usage["usage"],
+                        limit=updated_usage["limit"],
+                        remaining=updated_usage["remaining"],
+                    ).model_dump(),
+                    "processingTime": int((time.time() - start_time) * 1000),
+                    "timeToFirstToken": first_token_ms,
+                    "upstreamUsage": upstream_usage,
+                    "cacheStatus": cache_status,
+                    "tokensSaved": compaction.tokens_saved,
+                    "model": route.model,
+                },
+            )
+
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client disconnected; the upstream stream is closed on the way out
+            cancelled = True
+            raise
+
+        except ClaudeAPIError as e:
+            model_router.record(
+                route,
+                len(compaction.tweets),
+                time.time() - upstream_start,
+                success=False,
+            )
+            logger.error(
+                "streaming analysis failed",
+                request_id=request_id,
+                client_ip=client_ip,
+                error=e.message,
+                claude_status_code=e.status_code,
+            )
+            yield format_sse(
+                "error",
+                {
+                    "success": False,
+                    "error": e.message,
+                    "status_code": e.status_code,
+                    "retry_after": getattr(e, "retry_after", None),
+                    "processingTime": int((time.time() - start_time) * 1000),
+                },
+            )
+
+        finally:
+            processing_time_ms = int((time.time() - start_time) * 1000)
+            if not settled and reserved and not delivered:
+                # Nothing reached the client: refund the reservation
+                await asyncio.shield(
+                    rate_limit_manager.reconcile_usage(request, reserved, 0)
+                )
+            if not success:
+                logger.info(
+                    "streaming analysis ended without completion",
+                    request_id=request_id,
+                    client_ip=client_ip,
+                    delivered=delivered,
+                    client_disconnected=cancelled,
+                    processing_time_ms=processing_time_ms,
+                )
+            if success:
+                outcome = OUTCOME_SUCCESS
+            else:
+                outcome = OUTCOME_CANCELLED if cancelled else OUTCOME_ERROR
+            await asyncio.shield(
+                record_usage_stats(
+                    request, analyze_request, success, processing_time_ms, outcome
+                )
+            )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,411 @@
+"""Asynchronous analysis job routes."""
+
+import math
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from core.config import settings
+from core.models import AnalyzeJobResponse, AnalyzeRequest, AnalyzeResponse, UsageInfo
+from core.logging_config import get_logger
+from services.analysis_cache import analysis_cache
+from services.chunked_analysis import chunked_analyzer
+from services.claude_client import claude_client, ClaudeAPIError, USAGE_FIELDS
+from services.batch_collector import batch_collector
+from services.model_router import model_router
+from services.job_queue import (
+    JobFailedError,
+    JobQueueFullError,
+    job_store,
+    job_worker_pool,
+    new_job,
+)
+from services.single_flight import upstream_analysis_flights
+from services.tweet_compactor import tweet_compactor
+from services.usage_cost import usage_cost_model
+from utils.rate_limiter import rate_limit_manager
+from api.routes.analyze import (
+    build_cache_key,
+    check_rate_limit,
+    claude_error_status,
+    reserve_usage,
+    run_claude_analysis,
+    save_usage_record,
+)
+
+router = APIRouter()
+logger = get_logger("api.jobs")
+
+ANALYSIS_JOB = "analysis"
+
+
+def format_job(job: Dict[str, Any]) -> AnalyzeJobResponse:
+    """Convert a stored job record into the API response."""
+
+    def iso(timestamp: Optional[float]) -> Optional[str]:
+        return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+    return AnalyzeJobResponse(
+        jobId=job["id"],
+        status=job["status"],
+        createdAt=iso(job["created_at"]),
+        startedAt=iso(job["started_at"]),
+        finishedAt=iso(job["finished_at"]),
+        result=job["result"],
+        error=job["error"],
+    )
+
+
+async def process_analysis_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one queued analysis (worker side of POST /api/analyze/jobs).
+
+    Follows the same compaction, cache, coalescing and usage accounting
+    as /api/analyze, using the client details captured at submission.
+
+    Returns:
+        Serialized AnalyzeResponse
+
+    Raises:
+        JobFailedError: If the Claude call failed
+    """
+    start_time = time.time()
+    analyze_request = AnalyzeRequest(**job["payload"])
+    context = job["context"]
+    success = False
+
+    route = model_router.route(analyze_request.tweets, analyze_request.template_id)
+    compaction = tweet_compactor.compact(analyze_request.tweets, route.max_tokens)
+    use_chunking = chunked_analyzer.should_chunk(compaction.tweets, analyze_request.mode)
+    cache_key = build_cache_key(
+        analyze_request,
+        compaction.tweets,
+        route.model,
+        compaction.max_tokens,
+        use_chunking,
+    )
+    cached_analysis = (
+        None if context["bypass_cache"] else await analysis_cache.get(cache_key)
+    )
+
+    reserved = 0.0
+    try:
+        if cached_analysis is not None:
+            analysis, upstream_usage, cache_status = cached_analysis, None, "hit"
+            partial = False
+            if settings.analysis_cache_hits_count_usage:
+                updated_usage = await rate_limit_manager.increment_usage(
+                    None,
+                    client_key=context["client_key"],
+                    units=usage_cost_model.cache_hit(len(compaction.tweets)),
+                )
+            else:
+                updated_usage = await rate_limit_manager.get_usage_stats(
+                    None, client_key=context["client_key"]
+                )
+        else:
+            units = usage_cost_model.estimate(compaction, analyze_request.system_prompt)
+            await reserve_usage(None, units, client_key=context["client_key"])
+            reserved = units
+            (result, upstream_usage), _ = await upstream_analysis_flights.do(
+                cache_key,
+                lambda: run_claude_analysis(
+                    analyze_request, compaction, use_chunking, route
+                ),
+            )
+            analysis, partial = result.text, result.partial
+            # A partial digest (some chunks failed) is stored with the job
+            # but not cached, so the next request retries the batch
+            if not partial:
+                await analysis_cache.set(cache_key, analysis)
+            updated_usage = await rate_limit_manager.reconcile_usage(
+                None,
+                reserved,
+                usage_cost_model.actual(result.analyzed_tweets, upstream_usage),
+                client_key=context["client_key"],
+            )
+            cache_status = "bypass" if context["bypass_cache"] else "miss"
+        success = True
+
+    except HTTPException as e:
+        # Remaining budget too small by the time the job ran
+        raise JobFailedError({**e.detail, "status_code": e.status_code})
+
+    except ClaudeAPIError as e:
+        retry_after = getattr(e, "retry_after", None)
+        raise JobFailedError(
+            {
+                "error": e.message,
+                "status_code": claude_error_status(e),
+                "claude_status_code": e.status_code,
+                "retry_after": max(1, math.ceil(retry_after)) if retry_after else None,
+            }
+        )
+
+    finally:
+        if reserved and not success:
+            await rate_limit_manager.reconcile_usage(
+                None, reserved, 0, client_key=context["client_key"]
+            )
+        await save_usage_record(
+            client_ip=context["client_ip"],
+            user_agent=context["user_agent"],
+            user_id=context["user_id"],
+            analyze_request=analyze_request,
+            success=success,
+            processing_time_ms=int((time.time() - start_time) * 1000),
+        )
+
+    processing_time_ms = int((time.time() - start_time) * 1000)
+    logger.info(
+        "analysis job completed",
+        job_id=job["id"],
+        client_ip=context["client_ip"],
+        processing_time_ms=processing_time_ms,
+        queue_time_ms=int((start_time - job["created_at"]) * 1000),
+        cache_status=cache_status,
+        partial=partial,
+        new_usage=updated_usage["usage"],
+    )
+
+    return AnalyzeResponse(
+        success=True,
+        analysis=analysis,
+        usage=UsageInfo(
+            current=updated_usage["usage"],
+            limit=updated_usage["limit"],
+            remaining=updated_usage["remaining"],
+        ),
+        processingTime=processing_time_ms,
+        cacheStatus=cache_status,
+        upstreamUsage=upstream_usage,
+        tokensSaved=compaction.tokens_saved,
+        model=route.model,
+        partial=partial,
+    ).model_dump()
+
+
+def prepare_batch_analysis(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the Message Batches request for a bulk analysis job."""
+    analyze_request = AnalyzeRequest(**job["payload"])
+    route = model_router.route(analyze_request.tweets, analyze_request.template_id)
+    compaction = tweet_compactor.compact(analyze_request.tweets, route.max_tokens)
+    job["context"]["cache_key"] = build_cache_key(
+        analyze_request,
+        compaction.tweets,
+        route.model,
+        compaction.max_tokens,
+        chunked=False,
+    )
+    job["context"]["tokens_saved"] = compaction.tokens_saved
+    job["context"]["tweet_count"] = len(compaction.tweets)
+    job["context"]["model"] = route.model
+    return claude_client.build_batch_request(
+        job["id"],
+        compaction.tweets,
+        analyze_request.system_prompt,
+        max_tokens=compaction.max_tokens,
+        model=route.model,
+    )
+
+
+async def finish_batch_analysis(
+    job: Dict[str, Any], entry: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Turn a Message Batches result entry into the job result.
+
+    Returns:
+        Serialized AnalyzeResponse
+
+    Raises:
+        JobFailedError: If the batch request errored, expired or was canceled
+    """
+    analyze_request = AnalyzeRequest(**job["payload"])
+    context = job["context"]
+    result = entry.get("result") or {}
+    processing_time_ms = int((time.time() - job["created_at"]) * 1000)
+    success = result.get("type") == "succeeded"
+
+    await save_usage_record(
+        client_ip=context["client_ip"],
+        user_agent=context["user_agent"],
+        user_id=context["user_id"],
+        analyze_request=analyze_request,
+        success=success,
+        processing_time_ms=processing_time_ms,
+    )
+
+    if not success:
+        error = (result.get("error") or {}).get("error") or result.get("error") or {}
+        raise JobFailedError(
+            {
+                "error": error.get("message") or f"Batch request {result.get('type', 'failed')}",
+                "result_type": result.get("type"),
+                "batch_id": context.get("batch_id"),
+            }
+        )
+
+    message = result.get("message") or {}
+    analysis = "".join(
+        block.get("text", "")
+        for block in message.get("content", [])
+        if block.get("type") == "text"
+    )
+    await analysis_cache.set(context["cache_key"], analysis)
+    usage = message.get("usage") or {}
+    updated_usage = await rate_limit_manager.reconcile_usage(
+        None,
+        context.get("reserved_units", 0),
+        usage_cost_model.actual(context.get("tweet_count", 0), usage),
+        client_key=context["client_key"],
+    )
+
+    logger.info(
+        "bulk analysis job completed",
+        job_id=job["id"],
+        batch_id=context.get("batch_id"),
+        client_ip=context["client_ip"],
+        processing_time_ms=processing_time_ms,
+        new_usage=updated_usage["usage"],
+    )
+
+    return AnalyzeResponse(
+        success=True,
+        analysis=analysis,
+        usage=UsageInfo(
+            current=updated_usage["usage"],
+            limit=updated_usage["limit"],
+            remaining=updated_usage["remaining"],
+        ),
+        processingTime=processing_time_ms,
+        cacheStatus="bypass" if context["bypass_cache"] else "miss",
+        upstreamUsage={field: usage.get(field) or 0 for field in USAGE_FIELDS},
+        tokensSaved=context.get("tokens_saved", 0),
+        model=context.get("model"),
+    ).model_dump()
+
+
+async def abandon_batch_analysis(job: Dict[str, Any]):
+    """Refund the units reserved for a bulk job that failed."""
+    reserved = job["context"].get("reserved_units", 0)
+    if reserved:
+        await rate_limit_manager.reconcile_usage(
+            None, reserved, 0, client_key=job["context"]["client_key"]
+        )
+
+
+@router.post(
+    "/api/analyze/jobs",
+    response_model=AnalyzeJobResponse,
+    status_code=202,
+    dependencies=[Depends(check_rate_limit)],
+)
+async def submit_analysis_job(
+    request: Request,
+    response: Response,
+    analyze_request: AnalyzeRequest,
+    bulk: bool = Query(
+        False,
+        description="Process through the Message Batches API (cheaper, may take hours)",
+    ),
+):
+    """
+    Queue an analysis and return its job id immediately.
+
+    Poll GET /api/analyze/jobs/{job_id} (optionally with ?wait=seconds to
+    long-poll) for the status and result. Usage is reserved when the job
+    runs and settled at the actual cost, as for /api/analyze (bulk jobs
+    reserve it at submission and settle when their result arrives). Bulk
+    jobs always use a single Claude call per job (the mode field is
+    ignored) unless the result is cached.
+    """
+    client_ip = rate_limit_manager.get_client_ip(request)
+    job = new_job(
+        ANALYSIS_JOB,
+        payload=analyze_request.model_dump(),
+        context={
+            "client_key": rate_limit_manager.get_client_key(request),
+            "client_ip": client_ip,
+            "user_agent": request.headers.get("User-Agent"),
+            "user_id": request.headers.get("X-User-ID") or analyze_request.user_id,
+            "bypass_cache": "no-cache"
+            in request.headers.get("Cache-Control", "").lower(),
+        },
+    )
+
+    try:
+        if bulk:
+            route = model_router.route(
+                analyze_request.tweets, analyze_request.template_id
+            )
+            compaction = tweet_compactor.compact(
+                analyze_request.tweets, route.max_tokens
+            )
+        if bulk and not job["context"]["bypass_cache"]:
+            # Cached results are served right away by the regular workers
+            bulk = not await analysis_cache.get(
+                build_cache_key(
+                    analyze_request,
+                    compaction.tweets,
+                    route.model,
+                    compaction.max_tokens,
+                    chunked=False,
+                )
+            )
+        if bulk:
+            # Reserve now: the bulk queue must not let a client run past its budget
+            units = usage_cost_model.estimate(compaction, analyze_request.system_prompt)
+            await reserve_usage(request, units, client_key=job["context"]["client_key"])
+            job["context"]["reserved_units"] = units
+            try:
+                await batch_collector.submit(job)
+            except JobQueueFullError:
+                await rate_limit_manager.reconcile_usage(
+                    request, units, 0, client_key=job["context"]["client_key"]
+                )
+                raise
+        else:
+            # Admission check only (zero units); the job reserves its cost when it runs
+            await reserve_usage(request, 0, client_key=job["context"]["client_key"])
+            await job_store.submit(job)
+    except JobQueueFullError:
+        logger.warning("Analysis job rejected, queue full", client_ip=client_ip)
+        raise HTTPException(
+            status_code=503,
+            detail={"success": False, "error": "Job queue is full, please retry later"},
+            headers={"Retry-After": "30"},
+        )
+
+    logger.info(
+        "analysis job queued",
+        job_id=job["id"],
+        client_ip=client_ip,
+        tweet_count=len(analyze_request.tweets),
+        bulk=bulk,
+    )
+
+    response.headers["Location"] = f"/api/analyze/jobs/{job['id']}"
+    return format_job(job)
+
+
+@router.get("/api/analyze/jobs/{job_id}", response_model=AnalyzeJobResponse)
+async def get_analysis_job(
+    job_id: str,
+    wait: float = Query(
+        0, ge=0, description="Seconds to wait for the job to finish (long-poll)"
+    ),
+):
+    """Get the status of an analysis job, optionally waiting for it to finish."""
+    job = await job_store.wait(job_id, min(wait, settings.job_max_wait_seconds))
+    if job is None:
+        raise HTTPException(status_code=404, detail={"error": "Job not found"})
+    return format_job(job)
+
+
+# Register the worker-side handlers for analysis jobs
+job_worker_pool.register(ANALYSIS_JOB, process_analysis_job)
+batch_collector.register(
+    ANALYSIS_JOB, prepare_batch_analysis, finish_batch_analysis, abandon_batch_analysis
+)
@@ -1,16 +1,70 @@
 """Statistics API routes."""
 
-from datetime import datetime
-from typing import Optional
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
-from core.models import UserStatsResponse, DailyStatsResponse, UsageStatsRecord
+from core.config import settings
+from core.models import (
+    DailyStatsResponse,
+    HourlyStats,
+    HourlyStatsResponse,
+    UsageRecordsPage,
+    UsageStatsRecord,
+    UserStatsResponse,
+)
 from core.logging_config import get_logger
-from core.database import UsageStatsDB
+from core.database import USAGE_RECORD_COLUMNS, UsageStatsDB, format_usage_record
+from services.analysis_cache import analysis_cache
+from services.claude_client import claude_client
+from services.batch_collector import batch_collector
+from services.job_queue import job_worker_pool
+from services.model_router import model_router
+from services.tweet_compactor import tweet_compactor
+from services.partition_maintenance import partition_maintenance
+from services.usage_recorder import usage_recorder
+from services.single_flight import (
+    analysis_request_flights,
+    upstream_analysis_flights,
+)
+from utils.rate_limiter import rate_limit_manager
 
 router = APIRouter()
 logger = get_logger("api.stats")
 
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Each running export holds a pooled database connection until it finishes
+export_slots = asyncio.Semaphore(max(1, settings.export_max_concurrency))
+
+
+def validate_date(date: Optional[str]):
+    """Reject dates not in YYYY-MM-DD format."""
+    if date is None:
+        return
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+
+def encode_records(rows: List[tuple], format: str) -> str:
+    """Encode a chunk of USAGE_RECORD_COLUMNS rows as NDJSON lines or CSV rows."""
+    if format == "ndjson":
+        return "".join(
+            json.dumps(format_usage_record(row), ensure_ascii=False) + "\n" for row in rows
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(format_usage_record(row).values() for row in rows)
+    return buffer.getvalue()
+
 
 @router.get("/api/stats/user/{client_ip}", response_model=UserStatsResponse)
 async def get_user_stats(
@@ -18,25 +72,40 @@ async def get_user_stats(
     date: Optional[str] = Query(None, description="Filter by date (YYYY-MM-DD)")
 ):
     """Get usage statistics for a specific user (client IP)."""
+    validate_date(date)
     try:
-        stats = await UsageStatsDB.get_user_stats(client_ip, date)
+        stats = await UsageStatsDB.get_user_stats(client_ip, date=date)
         return UserStatsResponse(**stats)
     except Exception as e:
         logger.error(f"Failed to get user stats for {client_ip}: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve user statistics")
 
 
+@router.get("/api/stats/user-id/{user_id}", response_model=UserStatsResponse)
+async def get_user_id_stats(
+    user_id: str,
+    date: Optional[str] = Query(None, description="Filter by date (YYYY-MM-DD)")
+):
+    """Get usage statistics for a specific user (user ID)."""
+    validate_date(date)
+    try:
+        stats = await UsageStatsDB.get_user_stats(user_id=user_id, date=date)
+        return UserStatsResponse(**stats)
+    except Exception as e:
+        logger.error(f"Failed to get user stats for user_id {user_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve user statistics")
+
+
 @router.get("/api/stats/daily/{date}", response_model=DailyStatsResponse)
-async def get_daily_stats(date: str):
+async def get_daily_stats(
+    date: str,
+    user_id: Optional[str] = Query(None, description="Only this user ID"),
+):
     """Get daily statistics for all users."""
-    try:
-        # Validate date format
-        datetime.strptime(date, "%Y-%m-%d")
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    validate_date(date)
     
     try:
-        users_stats = await UsageStatsDB.get_daily_stats(date)
+        users_stats = await UsageStatsDB.get_daily_stats(date, user_id=user_id)
         user_responses = [UserStatsResponse(**stats) for stats in users_stats]
         
         return DailyStatsResponse(date=date, users=user_responses)
@@ -47,42 +116,178 @@ async def get_daily_stats(date: str):
 
 @router.get("/api/stats/recent", response_model=list[UsageStatsRecord])
 async def get_recent_records(
-    limit: int = Query(100, ge=1, le=1000, description="Number of records to return")
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    user_id: Optional[str] = Query(None, description="Only records for this user ID"),
+    client_ip: Optional[str] = Query(None, description="Only records for this client IP"),
 ):
     """Get recent usage records."""
     try:
-        records = await UsageStatsDB.get_recent_records(limit)
+        records = await UsageStatsDB.get_recent_records(
+            limit, user_id=user_id, client_ip=client_ip
+        )
         return [UsageStatsRecord(**record) for record in records]
     except Exception as e:
         logger.error(f"Failed to get recent records: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve recent records")
 
 
+@router.get("/api/stats/records", response_model=UsageRecordsPage)
+async def get_records_page(
+    limit: int = Query(100, ge=1, le=1000, description="Number of records per page"),
+    cursor: Optional[int] = Query(
+        None, ge=1, description="next_cursor of the previous page (omit for the newest records)"
+    ),
+    user_id: Optional[str] = Query(None, description="Only records for this user ID"),
+    client_ip: Optional[str] = Query(None, description="Only records for this client IP"),
+):
+    """Page through all usage records, newest first (keyset pagination on id)."""
+    try:
+        # One extra row tells whether another page follows
+        records = await UsageStatsDB.get_recent_records(
+            limit + 1, user_id=user_id, client_ip=client_ip, before_id=cursor
+        )
+    except Exception as e:
+        logger.error(f"Failed to get records page: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve records")
+
+    next_cursor = records[limit - 1]["id"] if len(records) > limit else None
+    return {"records": records[:limit], "next_cursor": next_cursor}
+
+
+@router.get("/api/stats/export")
+async def export_records(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    start: Optional[str] = Query(None, description="First day (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="Last day, inclusive (YYYY-MM-DD)"),
+    user_id: Optional[str] = Query(None, description="Only records for this user ID"),
+    client_ip: Optional[str] = Query(None, description="Only records for this client IP"),
+):
+    """
+    Export usage records as NDJSON or CSV.
+
+    Rows are streamed from an unbuffered cursor and sent chunk by chunk,
+    so memory stays flat regardless of the export size. Rows are not
+    sorted. At most EXPORT_MAX_CONCURRENCY exports run at once (each
+    holds a database connection); others get a 503.
+    """
+    validate_date(start)
+    validate_date(end)
+    if export_slots.locked():
+        raise HTTPException(
+            status_code=503,
+            detail="Too many exports in progress, please retry later",
+            headers={"Retry-After": "30"},
+        )
+    await export_slots.acquire()
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            export_slots.release()
+
+    chunks = UsageStatsDB.stream_records(
+        user_id=user_id,
+        client_ip=client_ip,
+        start=datetime.strptime(start, "%Y-%m-%d") if start else None,
+        end=datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1) if end else None,
+    )
+
+    # Run the query before responding, so database errors still get a 500
+    try:
+        first_chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        first_chunk = []
+    except Exception as e:
+        release()
+        logger.error(f"Failed to export records: {e}")
+        raise HTTPException(status_code=500, detail="Failed to export records")
+
+    async def body() -> AsyncIterator[str]:
+        try:
+            if format == "csv":
+                yield ",".join(USAGE_RECORD_COLUMNS) + "\r\n"
+            if not first_chunk:
+                return
+            exported = len(first_chunk)
+            yield encode_records(first_chunk, format)
+            try:
+                async for rows in chunks:
+                    exported += len(rows)
+                    yield encode_records(rows, format)
+            except Exception as e:
+                # Headers are already sent; the truncated body is all we can signal
+                logger.error("Record export aborted", error=str(e), exported=exported)
+                raise
+            logger.info("Records exported", format=format, rows=exported)
+        finally:
+            release()
+
+    filename = f"usage_statistics-{start or 'all'}-{end or 'now'}.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        # Also frees the slot if the client left before the body started
+        background=BackgroundTask(release),
+    )
+
+
+@router.get("/api/stats/hourly/{date}", response_model=HourlyStatsResponse)
+async def get_hourly_stats(date: str):
+    """Get per-hour statistics for a day."""
+    validate_date(date)
+
+    try:
+        hours = await UsageStatsDB.get_hourly_stats(date)
+        return HourlyStatsResponse(date=date, hours=[HourlyStats(**hour) for hour in hours])
+    except Exception as e:
+        logger.error(f"Failed to get hourly stats for {date}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve hourly statistics")
+
+
 @router.get("/api/stats/summary")
 async def get_stats_summary():
     """Get overall statistics summary."""
     try:
         today = datetime.now().strftime("%Y-%m-%d")
-        daily_stats = await UsageStatsDB.get_daily_stats(today)
-        
-        total_requests_today = sum(user["requests"] for user in daily_stats)
-        total_successful_today = sum(user["successful"] for user in daily_stats)
-        total_failed_today = sum(user["failed"] for user in daily_stats)
-        total_tweets_today = sum(user["tweets_analyzed"] for user in daily_stats)
-        active_users_today = len(daily_stats)
+        summary = await UsageStatsDB.get_daily_summary(today)
+        total_requests_today = summary["total_requests"]
         
         return {
             "date": today,
             "total_requests": total_requests_today,
-            "successful_requests": total_successful_today,
-            "failed_requests": total_failed_today,
-            "total_tweets_analyzed": total_tweets_today,
-            "active_users": active_users_today,
+            "successful_requests": summary["successful_requests"],
+            "failed_requests": summary["failed_requests"],
+            "total_tweets_analyzed": summary["total_tweets_analyzed"],
+            "active_users": summary["active_users"],
             "success_rate": round(
-                (total_successful_today / total_requests_today * 100) if total_requests_today > 0 else 0,
+                (summary["successful_requests"] / total_requests_today * 100) if total_requests_today > 0 else 0,
                 2
             )
         }
     except Exception as e:
         logger.error(f"Failed to get stats summary: {e}")
-        raise HTTPException(status_code=500, detail="Failed to retrieve statistics summary")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to retrieve statistics summary")
+
+
+@router.get("/api/stats/runtime")
+async def get_runtime_stats():
+    """Get in-process runtime statistics (caches, upstream client)."""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "analysis_cache": analysis_cache.get_stats(),
+        "compaction": tweet_compactor.get_stats(),
+        "model_routing": model_router.get_stats(),
+        "claude": claude_client.get_stats(),
+        "jobs": await job_worker_pool.get_stats(),
+        "batches": batch_collector.get_stats(),
+        "rate_limiter": rate_limit_manager.get_stats(),
+        "usage_recorder": usage_recorder.get_stats(),
+        "partition_maintenance": partition_maintenance.get_stats(),
+        "coalescing": {
+            "requests": analysis_request_flights.get_stats(),
+            "upstream": upstream_analysis_flights.get_stats(),
+        },
+    }
@@ -13,7 +13,7 @@ router = APIRouter()
 @router.get("/usage", response_model=UsageResponse)
 async def get_usage_stats(request: Request, client_key: Optional[str] = None):
     """Get usage statistics for a client."""
-    usage_stats = rate_limit_manager.get_usage_stats(request, client_key)
+    usage_stats = await rate_limit_manager.get_usage_stats(request, client_key)
 
     return UsageResponse(
         usage=usage_stats["usage"],
@@ -14,6 +14,120 @@ class Settings(BaseSettings):
     claude_api_url: str = Field(
         default="https://api.anthropic.com/v1/messages", alias="CLAUDE_API_URL"
     )
+    claude_api_keys: str = Field(
+        default="", alias="CLAUDE_API_KEYS"
+    )  # comma-separated; overrides CLAUDE_API_KEY for load balancing
+    claude_api_urls: str = Field(
+        default="", alias="CLAUDE_API_URLS"
+    )  # comma-separated; one URL shared by all keys, or one per key
+    claude_batches_url: str = Field(
+        default="https://api.anthropic.com/v1/messages/batches",
+        alias="CLAUDE_BATCHES_URL",
+    )
+    claude_prompt_caching: bool = Field(default=True, alias="CLAUDE_PROMPT_CACHING")
+    claude_model: str = Field(default="claude-sonnet-4-20250514", alias="CLAUDE_MODEL")
+    claude_max_tokens: int = Field(default=4000, alias="CLAUDE_MAX_TOKENS")
+
+    # Model Routing (tiering by batch size and template)
+    routing_enabled: bool = Field(default=False, alias="MODEL_ROUTING_ENABLED")
+    routing_small_model: str = Field(
+        default="claude-3-5-haiku-20241022", alias="MODEL_ROUTING_SMALL_MODEL"
+    )
+    routing_small_max_tokens: int = Field(
+        default=2000, alias="MODEL_ROUTING_SMALL_MAX_TOKENS"
+    )
+    routing_small_max_tweets: int = Field(
+        default=20, alias="MODEL_ROUTING_SMALL_MAX_TWEETS"
+    )  # batches up to this size (and content length) use the small model
+    routing_small_max_chars: int = Field(
+        default=6000, alias="MODEL_ROUTING_SMALL_MAX_CHARS"
+    )
+    routing_template_rules: str = Field(
+        default="", alias="MODEL_ROUTING_TEMPLATE_RULES"
+    )  # comma-separated template_id=model[:max_tokens]
+
+    # Claude Retry Policy and Circuit Breaker
+    claude_max_retries: int = Field(default=3, alias="CLAUDE_MAX_RETRIES")
+    claude_retry_base_delay: float = Field(
+        default=1.0, alias="CLAUDE_RETRY_BASE_DELAY"
+    )  # seconds
+    claude_retry_max_delay: float = Field(default=20.0, alias="CLAUDE_RETRY_MAX_DELAY")
+    claude_retry_deadline: float = Field(
+        default=150.0, alias="CLAUDE_RETRY_DEADLINE"
+    )  # total seconds per call including retries
+    circuit_breaker_failure_threshold: int = Field(
+        default=5, alias="CIRCUIT_BREAKER_FAILURE_THRESHOLD"
+    )
+    circuit_breaker_recovery_timeout: float = Field(
+        default=30.0, alias="CIRCUIT_BREAKER_RECOVERY_TIMEOUT"
+    )
+    circuit_breaker_half_open_max_calls: int = Field(
+        default=1, alias="CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS"
+    )
+
+    # Hedged Requests (opt-in tail-latency reduction)
+    claude_hedging_enabled: bool = Field(default=False, alias="CLAUDE_HEDGING_ENABLED")
+    claude_hedge_percentile: float = Field(
+        default=95.0, alias="CLAUDE_HEDGE_PERCENTILE"
+    )  # hedge once the primary is slower than this latency percentile
+    claude_hedge_budget_ratio: float = Field(
+        default=0.05, alias="CLAUDE_HEDGE_BUDGET_RATIO"
+    )  # at most this fraction of extra requests
+    claude_hedge_min_delay: float = Field(
+        default=2.0, alias="CLAUDE_HEDGE_MIN_DELAY"
+    )  # seconds
+    claude_hedge_min_samples: int = Field(
+        default=20, alias="CLAUDE_HEDGE_MIN_SAMPLES"
+    )
+
+    # Upstream Key/Endpoint Pool
+    upstream_ejection_seconds: float = Field(
+        default=30.0, alias="UPSTREAM_EJECTION_SECONDS"
+    )  # used when a 429 has no Retry-After, and after repeated failures
+    upstream_ejection_failure_threshold: int = Field(
+        default=3, alias="UPSTREAM_EJECTION_FAILURE_THRESHOLD"
+    )
+
+    # Upstream Admission Control (adaptive concurrency limit)
+    upstream_concurrency_initial: int = Field(
+        default=8, alias="UPSTREAM_CONCURRENCY_INITIAL"
+    )
+    upstream_concurrency_min: int = Field(default=1, alias="UPSTREAM_CONCURRENCY_MIN")
+    upstream_concurrency_max: int = Field(default=32, alias="UPSTREAM_CONCURRENCY_MAX")
+    upstream_queue_size: int = Field(default=50, alias="UPSTREAM_QUEUE_SIZE")
+    upstream_queue_timeout: float = Field(
+        default=30.0, alias="UPSTREAM_QUEUE_TIMEOUT"
+    )  # seconds
+    upstream_latency_tolerance: float = Field(
+        default=3.0, alias="UPSTREAM_LATENCY_TOLERANCE"
+    )  # multiples of same-size baseline latency treated as congestion
+
+    # Claude HTTP Client (shared connection pool)
+    claude_http2: bool = Field(default=True, alias="CLAUDE_HTTP2")
+    claude_max_connections: int = Field(default=100, alias="CLAUDE_MAX_CONNECTIONS")
+    claude_max_keepalive_connections: int = Field(
+        default=20, alias="CLAUDE_MAX_KEEPALIVE_CONNECTIONS"
+    )
+    claude_keepalive_expiry: float = Field(
+        default=60.0, alias="CLAUDE_KEEPALIVE_EXPIRY"
+    )  # seconds
+    claude_connect_timeout: float = Field(default=10.0, alias="CLAUDE_CONNECT_TIMEOUT")
+    claude_read_timeout: float = Field(
+        default=60.0, alias="CLAUDE_READ_TIMEOUT"
+    )  # upper bound; analyses size their read timeout from the batch
+    claude_read_timeout_base: float = Field(
+        default=20.0, alias="CLAUDE_READ_TIMEOUT_BASE"
+    )
+    claude_read_timeout_per_tweet: float = Field(
+        default=0.3, alias="CLAUDE_READ_TIMEOUT_PER_TWEET"
+    )
+    claude_write_timeout: float = Field(default=10.0, alias="CLAUDE_WRITE_TIMEOUT")
+    claude_pool_timeout: float = Field(default=10.0, alias="CLAUDE_POOL_TIMEOUT")
+
+    # Client Deadlines
+    client_timeout_header: str = Field(
+        default="X-Request-Timeout-Ms", alias="CLIENT_TIMEOUT_HEADER"
+    )  # client-supplied deadline for /api/analyze, in milliseconds
 
     # Server Configuration
     port: int = Field(default=3000, alias="PORT")
@@ -25,22 +139,186 @@ class Settings(BaseSettings):
     rate_limit_window_ms: int = Field(
         default=900000, alias="RATE_LIMIT_WINDOW_MS"
     )  # 15 minutes
+    rate_limit_algorithm: str = Field(
+        default="sliding_window", alias="RATE_LIMIT_ALGORITHM"
+    )  # in-process limiter: sliding_window or gcra
+
+    # Shared Rate Limiting (Redis)
+    rate_limit_use_redis: bool = Field(
+        default=True, alias="RATE_LIMIT_USE_REDIS"
+    )  # only effective when REDIS_URL is set
+    rate_limit_failure_mode: str = Field(
+        default="open", alias="RATE_LIMIT_FAILURE_MODE"
+    )  # open: fall back to per-process limits; closed: reject while Redis is down
+    rate_limit_redis_timeout: float = Field(
+        default=0.5, alias="RATE_LIMIT_REDIS_TIMEOUT"
+    )  # seconds
+    rate_limit_redis_retry_seconds: float = Field(
+        default=5.0, alias="RATE_LIMIT_REDIS_RETRY_SECONDS"
+    )  # how long to stay on the fallback after a Redis error
+    rate_limit_redis_prefix: str = Field(
+        default="ratelimit:", alias="RATE_LIMIT_REDIS_PREFIX"
+    )
 
-    # Usage Tracking
-    max_free_usage_per_ip: int = Field(default=50, alias="MAX_FREE_USAGE_PER_IP")
+    # Usage Tracking (quota measured in cost units, see USAGE_COST_*)
+    max_free_usage_per_ip: float = Field(default=50, alias="MAX_FREE_USAGE_PER_IP")
     usage_reset_interval_hours: int = Field(
         default=24, alias="USAGE_RESET_INTERVAL_HOURS"
     )
+    usage_snapshot_path: str = Field(
+        default="data/usage_snapshot.json", alias="USAGE_SNAPSHOT_PATH"
+    )  # per-process windows; single-process deployments (use Redis otherwise)
+    usage_snapshot_interval_seconds: float = Field(
+        default=60.0, alias="USAGE_SNAPSHOT_INTERVAL_SECONDS"
+    )
+    usage_cost_base: float = Field(default=0.5, alias="USAGE_COST_BASE")
+    usage_cost_per_tweet: float = Field(default=0.01, alias="USAGE_COST_PER_TWEET")
+    usage_cost_per_1k_input_tokens: float = Field(
+        default=0.1, alias="USAGE_COST_PER_1K_INPUT_TOKENS"
+    )
+    usage_cost_per_1k_output_tokens: float = Field(
+        default=0.5, alias="USAGE_COST_PER_1K_OUTPUT_TOKENS"
+    )
+
+    # Request Coalescing / Idempotency
+    idempotency_window_seconds: int = Field(
+        default=600, alias="IDEMPOTENCY_WINDOW_SECONDS"
+    )
+    idempotency_max_entries: int = Field(
+        default=10000, alias="IDEMPOTENCY_MAX_ENTRIES"
+    )
+
+    # Tweet Compaction (before prompt construction)
+    compaction_enabled: bool = Field(default=True, alias="COMPACTION_ENABLED")
+    compaction_input_token_budget: int = Field(
+        default=100000, alias="COMPACTION_INPUT_TOKEN_BUDGET"
+    )  # tweets past this estimated prompt size are dropped
+    compaction_max_tweet_tokens: int = Field(
+        default=1000, alias="COMPACTION_MAX_TWEET_TOKENS"
+    )
+    compaction_output_ratio: float = Field(
+        default=0.75, alias="COMPACTION_OUTPUT_RATIO"
+    )  # max_tokens = input tokens * ratio, clamped to [min, CLAUDE max_tokens]
+    compaction_min_output_tokens: int = Field(
+        default=1500, alias="COMPACTION_MIN_OUTPUT_TOKENS"
+    )
+
+    # Chunked (map-reduce) Analysis
+    analysis_chunk_threshold_tokens: int = Field(
+        default=12000, alias="ANALYSIS_CHUNK_THRESHOLD_TOKENS"
+    )  # auto mode switches to chunked analysis above this prompt size
+    analysis_chunk_max_tokens: int = Field(
+        default=6000, alias="ANALYSIS_CHUNK_MAX_TOKENS"
+    )
+    analysis_chunk_concurrency: int = Field(
+        default=4, alias="ANALYSIS_CHUNK_CONCURRENCY"
+    )
+    analysis_chunk_timeout: float = Field(
+        default=45.0, alias="ANALYSIS_CHUNK_TIMEOUT"
+    )  # seconds per chunk, including retries
+    analysis_chunk_output_tokens: int = Field(
+        default=1500, alias="ANALYSIS_CHUNK_OUTPUT_TOKENS"
+    )
 
     # Redis Configuration (optional)
     redis_url: Optional[str] = Field(default=None, alias="REDIS_URL")
 
+    # Analysis Result Cache
+    analysis_cache_enabled: bool = Field(default=True, alias="ANALYSIS_CACHE_ENABLED")
+    analysis_cache_ttl_seconds: int = Field(
+        default=3600, alias="ANALYSIS_CACHE_TTL_SECONDS"
+    )
+    analysis_cache_max_entries: int = Field(
+        default=1000, alias="ANALYSIS_CACHE_MAX_ENTRIES"
+    )
+    analysis_cache_max_bytes: int = Field(
+        default=50 * 1024 * 1024, alias="ANALYSIS_CACHE_MAX_BYTES"
+    )
+    analysis_cache_use_redis: bool = Field(
+        default=True, alias="ANALYSIS_CACHE_USE_REDIS"
+    )  # only effective when REDIS_URL is set
+    analysis_cache_hits_count_usage: bool = Field(
+        default=False, alias="ANALYSIS_CACHE_HITS_COUNT_USAGE"
+    )
+
+    # Asynchronous Analysis Jobs
+    job_queue_backend: str = Field(
+        default="memory", alias="JOB_QUEUE_BACKEND"
+    )  # memory or redis (redis shares the queue across instances)
+    job_workers: int = Field(default=4, alias="JOB_WORKERS")
+    job_queue_max_size: int = Field(default=1000, alias="JOB_QUEUE_MAX_SIZE")
+    job_result_ttl_seconds: int = Field(default=3600, alias="JOB_RESULT_TTL_SECONDS")
+    job_max_wait_seconds: int = Field(
+        default=30, alias="JOB_MAX_WAIT_SECONDS"
+    )  # upper bound for long-polling a job
+    job_max_attempts: int = Field(
+        default=3, alias="JOB_MAX_ATTEMPTS"
+    )  # jobs recovered from stopped workers are failed after this many attempts
+    job_heartbeat_interval_seconds: int = Field(
+        default=20, alias="JOB_HEARTBEAT_INTERVAL_SECONDS"
+    )  # a worker is presumed dead after three missed heartbeats
+
+    # Bulk Jobs (Message Batches API)
+    batch_max_requests: int = Field(
+        default=100, alias="BATCH_MAX_REQUESTS"
+    )  # bulk jobs per batch submission
+    batch_flush_interval_seconds: int = Field(
+        default=60, alias="BATCH_FLUSH_INTERVAL_SECONDS"
+    )  # submit a partial batch once its oldest job waited this long
+    batch_poll_interval_seconds: int = Field(
+        default=30, alias="BATCH_POLL_INTERVAL_SECONDS"
+    )
+
     # MySQL Database Configuration
     mysql_host: str = Field(default="localhost", alias="MYSQL_HOST")
     mysql_port: int = Field(default=3306, alias="MYSQL_PORT")
     mysql_user: str = Field(default="root", alias="MYSQL_USER")
     mysql_password: str = Field(default="", alias="MYSQL_PASSWORD")
     mysql_database: str = Field(default="twitter_scanner", alias="MYSQL_DATABASE")
+    schema_check: str = Field(default="warn", alias="SCHEMA_CHECK")
+    export_max_concurrency: int = Field(
+        default=2, alias="EXPORT_MAX_CONCURRENCY"
+    )  # each running export holds one pooled connection until it finishes
+
+    # Usage Statistics Recorder (write-behind batches)
+    usage_recorder_queue_size: int = Field(
+        default=10000, alias="USAGE_RECORDER_QUEUE_SIZE"
+    )
+    usage_recorder_batch_size: int = Field(
+        default=500, alias="USAGE_RECORDER_BATCH_SIZE"
+    )
+    usage_recorder_flush_interval: float = Field(
+        default=1.0, alias="USAGE_RECORDER_FLUSH_INTERVAL"
+    )
+    usage_recorder_overflow: str = Field(
+        default="drop", alias="USAGE_RECORDER_OVERFLOW"
+    )
+    usage_recorder_max_retries: int = Field(
+        default=3, alias="USAGE_RECORDER_MAX_RETRIES"
+    )
+    usage_recorder_retry_base_delay: float = Field(
+        default=0.5, alias="USAGE_RECORDER_RETRY_BASE_DELAY"
+    )
+    usage_recorder_retry_max_delay: float = Field(
+        default=10.0, alias="USAGE_RECORDER_RETRY_MAX_DELAY"
+    )
+
+    # Usage Statistics Partitioning and Retention
+    usage_retention_months: int = Field(
+        default=12, alias="USAGE_RETENTION_MONTHS"
+    )  # raw rows older than this are archived and their partition dropped
+    usage_archive_dir: str = Field(
+        default="data/archive", alias="USAGE_ARCHIVE_DIR"
+    )
+    partition_precreate_months: int = Field(
+        default=3, alias="PARTITION_PRECREATE_MONTHS"
+    )
+    partition_maintenance_enabled: bool = Field(
+        default=True, alias="PARTITION_MAINTENANCE_ENABLED"
+    )
+    partition_maintenance_interval_hours: float = Field(
+        default=24.0, alias="PARTITION_MAINTENANCE_INTERVAL_HOURS"
+    )
 
     # Logging
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
@@ -58,6 +336,34 @@ class Settings(BaseSettings):
             return v
         return ["*"]
 
+    @validator("rate_limit_algorithm")
+    def validate_rate_limit_algorithm(cls, v):
+        """Only the implemented in-process algorithms are accepted."""
+        if v not in ("sliding_window", "gcra"):
+            raise ValueError("RATE_LIMIT_ALGORITHM must be 'sliding_window' or 'gcra'")
+        return v
+
+    @validator("rate_limit_failure_mode")
+    def validate_rate_limit_failure_mode(cls, v):
+        """Only fail-open and fail-closed are supported."""
+        if v not in ("open", "closed"):
+            raise ValueError("RATE_LIMIT_FAILURE_MODE must be 'open' or 'closed'")
+        return v
+
+    @validator("schema_check")
+    def validate_schema_check(cls, v):
+        """Startup either warns about or refuses an outdated schema."""
+        if v not in ("warn", "refuse"):
+            raise ValueError("SCHEMA_CHECK must be 'warn' or 'refuse'")
+        return v
+
+    @validator("usage_recorder_overflow")
+    def validate_usage_recorder_overflow(cls, v):
+        """Only dropping or blocking on a full queue is supported."""
+        if v not in ("drop", "block"):
+            raise ValueError("USAGE_RECORDER_OVERFLOW must be 'drop' or 'block'")
+        return v
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -1,8 +1,13 @@
-"""Database setup and models for Twitter Scanner Backend using MySQL."""
+"""Database pool and queries for Twitter Scanner Backend using MySQL.
 
+The schema is managed by versioned migrations (see core/migrations.py).
+"""
+
+import asyncio
+import random
 import aiomysql
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, AsyncIterator
 from contextlib import asynccontextmanager
 
 from core.config import settings
@@ -10,6 +15,164 @@ from core.logging_config import get_logger
 
 logger = get_logger("database")
 
+# usage_statistics.outcome values
+OUTCOME_SUCCESS = "success"
+OUTCOME_ERROR = "error"
+OUTCOME_CANCELLED = "cancelled"  # client disconnected before the result
+OUTCOME_DEADLINE_EXCEEDED = "deadline_exceeded"  # client deadline passed
+
+# usage_statistics columns returned by record queries and exports
+USAGE_RECORD_COLUMNS = (
+    "id",
+    "user_id",
+    "client_ip",
+    "user_agent",
+    "success",
+    "outcome",
+    "twitter_count",
+    "content_length",
+    "processing_time_ms",
+    "created_at",
+)
+# Rows per fetch when streaming records through an unbuffered cursor
+STREAM_CHUNK_ROWS = 5000
+
+# Rollup tables: (name, bucket column type); user_id '' stands for no user
+ROLLUP_HOURLY = "usage_rollup_hourly"
+ROLLUP_DAILY = "usage_rollup_daily"
+ROLLUP_TABLES = ((ROLLUP_HOURLY, "DATETIME"), (ROLLUP_DAILY, "DATE"))
+
+# Concurrent batches upserting the same rollup keys can still deadlock (gap
+# locks on new keys); InnoDB rolls one back with this error and it is retried
+ER_LOCK_DEADLOCK = 1213
+DEADLOCK_RETRIES = 3
+
+ROLLUP_UPSERT = """
+    INSERT INTO {table}
+    (bucket, client_ip, user_id, outcome, requests, tweets, content_length, processing_time_ms, first_access, last_access)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        requests = requests + VALUES(requests),
+        tweets = tweets + VALUES(tweets),
+        content_length = content_length + VALUES(content_length),
+        processing_time_ms = processing_time_ms + VALUES(processing_time_ms),
+        first_access = LEAST(COALESCE(first_access, VALUES(first_access)), VALUES(first_access)),
+        last_access = GREATEST(COALESCE(last_access, VALUES(last_access)), VALUES(last_access))
+"""
+
+# Aggregates over rollup rows, in the key order of UserStatsResponse
+ROLLUP_TOTALS = """
+    SUM(requests),
+    SUM(CASE WHEN outcome = 'success' THEN requests ELSE 0 END),
+    SUM(CASE WHEN outcome <> 'success' THEN requests ELSE 0 END),
+    SUM(CASE WHEN outcome IN ('cancelled', 'deadline_exceeded') THEN requests ELSE 0 END),
+    SUM(tweets),
+    SUM(processing_time_ms) / NULLIF(SUM(requests), 0),
+    MIN(first_access),
+    MAX(last_access)
+"""
+
+
+def rollup_rows(records: List[Dict[str, Any]], hourly: bool) -> List[tuple]:
+    """
+    Aggregate usage records into rollup rows.
+
+    Args:
+        records: Usage records as written by add_usage_records
+        hourly: Bucket by hour (else by day)
+
+    Returns:
+        Parameter tuples for ROLLUP_UPSERT, one per key, sorted by primary
+        key so concurrent batches lock shared rows in the same order
+    """
+    groups: Dict[tuple, List[Any]] = {}
+    for record in records:
+        created_at = record["created_at"]
+        bucket = (
+            created_at.replace(minute=0, second=0, microsecond=0)
+            if hourly
+            else created_at.date()
+        )
+        key = (bucket, record["client_ip"], record.get("user_id") or "", record["outcome"])
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [1, record["twitter_count"], record["content_length"],
+                           record["processing_time_ms"], created_at, created_at]
+        else:
+            group[0] += 1
+            group[1] += record["twitter_count"]
+            group[2] += record["content_length"]
+            group[3] += record["processing_time_ms"]
+            group[4] = min(group[4], created_at)
+            group[5] = max(group[5], created_at)
+    return [key + tuple(groups[key]) for key in sorted(groups)]
+
+
+def format_rollup_totals(row: tuple) -> Dict[str, Any]:
+    """Map a ROLLUP_TOTALS row onto UserStatsResponse fields."""
+    return {
+        "total_requests": int(row[0] or 0),
+        "successful_requests": int(row[1] or 0),
+        "failed_requests": int(row[2] or 0),
+        "cancelled_requests": int(row[3] or 0),
+        "total_tweets_analyzed": int(row[4] or 0),
+        "avg_processing_time": round(float(row[5] or 0), 2),
+        "first_access": row[6].isoformat() if row[6] else None,
+        "last_access": row[7].isoformat() if row[7] else None,
+    }
+
+
+def format_usage_record(row: tuple) -> Dict[str, Any]:
+    """Map a USAGE_RECORD_COLUMNS row onto UsageStatsRecord fields."""
+    return {
+        "id": row[0],
+        "user_id": row[1],
+        "client_ip": row[2],
+        "user_agent": row[3],
+        "success": bool(row[4]),
+        "outcome": row[5],
+        "twitter_count": row[6],
+        "content_length": row[7],
+        "processing_time_ms": row[8],
+        "created_at": row[9].isoformat() if row[9] else None,
+    }
+
+
+def record_filters(
+    user_id: Optional[str] = None,
+    client_ip: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+) -> tuple:
+    """
+    Build the WHERE clause shared by record pages and exports.
+
+    Returns:
+        (where_clause, params); where_clause is empty without filters
+    """
+    conditions = []
+    params: List[Any] = []
+    # Equality on the leading column of (user_id, id) / (client_ip, id)
+    if user_id:
+        conditions.append("user_id = %s")
+        params.append(user_id)
+    elif client_ip:
+        conditions.append("client_ip = %s")
+        params.append(client_ip)
+    if start:
+        conditions.append("created_at >= %s")
+        params.append(start)
+    if end:
+        conditions.append("created_at < %s")
+        params.append(end)
+    if before_id is not None:
+        conditions.append("id < %s")
+        params.append(before_id)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where_clause, params
+
+
 class DatabasePool:
     """MySQL database connection pool manager."""
     
@@ -54,163 +217,134 @@ class DatabasePool:
 # Global database pool instance
 db_pool = DatabasePool()
 
-async def init_database():
-    """Initialize the database and create tables."""
-    if not db_pool.pool:
-        await db_pool.create_pool()
-    
-    async with db_pool.get_connection() as conn:
-        async with conn.cursor() as cursor:
-            # Create usage_statistics table
-            await cursor.execute("""
-                CREATE TABLE IF NOT EXISTS usage_statistics (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    user_id VARCHAR(36),
-                    client_ip VARCHAR(45) NOT NULL,
-                    user_agent TEXT,
-                    success BOOLEAN NOT NULL,
-                    twitter_count INT NOT NULL,
-                    content_length INT NOT NULL,
-                    processing_time_ms INT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    INDEX idx_user_id (user_id),
-                    INDEX idx_client_ip (client_ip),
-                    INDEX idx_created_at (created_at)
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """)
-            
-            # Add user_id column if it doesn't exist (for existing tables)
-            try:
-                # Check if column exists
-                await cursor.execute("""
-                    SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS 
-                    WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'usage_statistics' AND COLUMN_NAME = 'user_id'
-                """, (cursor.connection.db.decode('utf-8'),))
-                
-                column_exists = await cursor.fetchone()
-                
-                if not column_exists:
-                    await cursor.execute("""
-                        ALTER TABLE usage_statistics 
-                        ADD COLUMN user_id VARCHAR(36) AFTER id
-                    """)
-                    logger.info("Added user_id column to usage_statistics table")
-                else:
-                    # Check if column length is correct and update if necessary
-                    await cursor.execute("""
-                        SELECT CHARACTER_MAXIMUM_LENGTH FROM INFORMATION_SCHEMA.COLUMNS 
-                        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'usage_statistics' AND COLUMN_NAME = 'user_id'
-                    """, (cursor.connection.db.decode('utf-8'),))
-                    
-                    column_info = await cursor.fetchone()
-                    if column_info and column_info[0] < 36:
-                        await cursor.execute("""
-                            ALTER TABLE usage_statistics 
-                            MODIFY COLUMN user_id VARCHAR(36)
-                        """)
-                        logger.info("Updated user_id column length to VARCHAR(36)")
-                
-                # Add index for user_id if it doesn't exist
-                await cursor.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_user_id ON usage_statistics (user_id)
-                """)
-                
-            except Exception as e:
-                logger.error(f"Error setting up user_id column: {e}")
-                # Try alternative approach for older MySQL versions
-                try:
-                    await cursor.execute("""
-                        ALTER TABLE usage_statistics 
-                        ADD COLUMN user_id VARCHAR(36)
-                    """)
-                    logger.info("Added user_id column using alternative method")
-                except Exception as e2:
-                    if "Duplicate column name" not in str(e2):
-                        logger.error(f"Failed to add user_id column: {e2}")
-                        
-                try:
-                    await cursor.execute("""
-                        CREATE INDEX idx_user_id ON usage_statistics (user_id)
-                    """)
-                except Exception as e3:
-                    if "Duplicate key name" not in str(e3):
-                        logger.error(f"Failed to create index: {e3}")
-            
-            logger.info("Database tables initialized successfully")
-
 class UsageStatsDB:
     """Database operations for usage statistics."""
     
     @staticmethod
-    async def add_usage_record(
-        client_ip: str,
-        success: bool,
-        twitter_count: int,
-        content_length: int,
-        processing_time_ms: int,
-        user_agent: Optional[str] = None,
-        user_id: Optional[str] = None
+    async def add_usage_records(records: List[Dict[str, Any]]) -> int:
+        """
+        Insert a batch of usage records with one multi-row INSERT.
+
+        The rollup tables are updated in the same transaction; a transaction
+        rolled back by a deadlock is retried up to DEADLOCK_RETRIES times.
+
+        Args:
+            records: Dicts with the usage_statistics columns, including
+                created_at (the time the request finished, not the flush)
+
+        Returns:
+            Number of rows inserted
+        """
+        if not records:
+            return 0
+        for record in records:
+            if not record.get("outcome"):
+                record["outcome"] = OUTCOME_SUCCESS if record["success"] else OUTCOME_ERROR
+        rows = [
+            (
+                record.get("user_id"),
+                record["client_ip"],
+                record.get("user_agent"),
+                record["success"],
+                record["outcome"],
+                record["twitter_count"],
+                record["content_length"],
+                record["processing_time_ms"],
+                record["created_at"],
+            )
+            for record in records
+        ]
+        rollups = [
+            (table, rollup_rows(records, hourly=table == ROLLUP_HOURLY))
+            for table, _ in ROLLUP_TABLES
+        ]
+        for attempt in range(1, DEADLOCK_RETRIES + 1):
+            try:
+                return await UsageStatsDB._write_usage_records(rows, rollups)
+            except aiomysql.OperationalError as e:
+                if e.args[0] != ER_LOCK_DEADLOCK or attempt == DEADLOCK_RETRIES:
+                    raise
+                logger.warning(
+                    "Deadlock writing usage records, retrying",
+                    attempt=attempt,
+                    records=len(rows),
+                )
+                await asyncio.sleep(random.uniform(0.01, 0.05) * attempt)
+
+    @staticmethod
+    async def _write_usage_records(
+        rows: List[tuple], rollups: List[tuple]
     ) -> int:
-        """Add a usage record to the database."""
-        
-        logger.info(
-            "开始录入数据信息",
-            user_id=user_id,
-            client_ip=client_ip,
-            success=success,
-            twitter_count=twitter_count,
-            content_length=content_length,
-            processing_time_ms=processing_time_ms,
-            user_agent=user_agent[:100] if user_agent else None,
-            timestamp=datetime.now().isoformat()
-        )
-        
+        """Insert raw rows and upsert their rollups in one transaction."""
         async with db_pool.get_connection() as conn:
-            async with conn.cursor() as cursor:
-                try:
-                    await cursor.execute("""
+            # Raw rows and their rollups are committed together
+            await conn.begin()
+            try:
+                async with conn.cursor() as cursor:
+                    # aiomysql rewrites INSERT ... VALUES into one multi-row statement
+                    await cursor.executemany("""
                         INSERT INTO usage_statistics 
-                        (user_id, client_ip, user_agent, success, twitter_count, content_length, processing_time_ms)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """, (user_id, client_ip, user_agent, success, twitter_count, content_length, processing_time_ms))
-                    
-                    record_id = cursor.lastrowid
-                    
-                    logger.info(
-                        "数据录入成功",
-                        record_id=record_id,
-                        user_id=user_id,
-                        client_ip=client_ip,
-                        success=success,
-                        twitter_count=twitter_count,
-                        content_length=content_length,
-                        processing_time_ms=processing_time_ms,
-                        database_operation="INSERT",
-                        affected_rows=cursor.rowcount,
-                        completion_time=datetime.now().isoformat()
-                    )
-                    
-                    return record_id
-                    
-                except Exception as db_error:
-                    logger.error(
-                        "数据录入失败",
-                        user_id=user_id,
-                        client_ip=client_ip,
-                        success=success,
-                        twitter_count=twitter_count,
-                        content_length=content_length,
-                        processing_time_ms=processing_time_ms,
-                        error=str(db_error),
-                        error_type=type(db_error).__name__,
-                        database_operation="INSERT",
-                        failure_time=datetime.now().isoformat()
+                        (user_id, client_ip, user_agent, success, outcome, twitter_count, content_length, processing_time_ms, created_at)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """, rows)
+                    inserted = cursor.rowcount
+                    for table, table_rows in rollups:
+                        await cursor.executemany(
+                            ROLLUP_UPSERT.format(table=table), table_rows
+                        )
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+            return inserted
+
+    @staticmethod
+    async def rebuild_rollups(start: datetime, end: datetime) -> int:
+        """
+        Recompute rollups for [start, end) from raw usage_statistics rows.
+
+        Used to backfill history recorded before the rollup tables existed,
+        or to repair them; start and end should fall on day boundaries.
+
+        Returns:
+            Number of raw rows aggregated
+        """
+        async with db_pool.get_connection() as conn:
+            await conn.begin()
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        "SELECT COUNT(*) FROM usage_statistics WHERE created_at >= %s AND created_at < %s",
+                        (start, end),
                     )
-                    raise
+                    raw_rows = (await cursor.fetchone())[0]
+                    for table, bucket in (
+                        (ROLLUP_HOURLY, "DATE_FORMAT(created_at, '%%Y-%%m-%%d %%H:00:00')"),
+                        (ROLLUP_DAILY, "DATE(created_at)"),
+                    ):
+                        await cursor.execute(
+                            f"DELETE FROM {table} WHERE bucket >= %s AND bucket < %s",
+                            (start, end),
+                        )
+                        await cursor.execute(f"""
+                            INSERT INTO {table}
+                            (bucket, client_ip, user_id, outcome, requests, tweets, content_length, processing_time_ms, first_access, last_access)
+                            SELECT {bucket}, client_ip, COALESCE(user_id, ''), outcome,
+                                   COUNT(*), SUM(twitter_count), SUM(content_length),
+                                   SUM(processing_time_ms), MIN(created_at), MAX(created_at)
+                            FROM usage_statistics
+                            WHERE created_at >= %s AND created_at < %s
+                            GROUP BY 1, client_ip, COALESCE(user_id, ''), outcome
+                        """, (start, end))
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+        return raw_rows
     
     @staticmethod
     async def get_user_stats(client_ip: str = None, user_id: str = None, date: Optional[str] = None) -> Dict[str, Any]:
-        """Get usage statistics for a specific user by client_ip or user_id."""
+        """Get usage statistics for a specific user by client_ip or user_id (from the daily rollup)."""
         if not client_ip and not user_id:
             raise ValueError("Either client_ip or user_id must be provided")
         async with db_pool.get_connection() as conn:
@@ -227,21 +361,14 @@ class UsageStatsDB:
                     params.append(client_ip)
                 
                 if date:
-                    where_conditions.append("DATE(created_at) = %s")
+                    where_conditions.append("bucket = %s")
                     params.append(date)
                 
                 where_clause = " AND ".join(where_conditions)
                 
                 await cursor.execute(f"""
-                    SELECT 
-                        COUNT(*) as total_requests,
-                        SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as successful_requests,
-                        SUM(CASE WHEN success = 0 THEN 1 ELSE 0 END) as failed_requests,
-                        SUM(twitter_count) as total_tweets_analyzed,
-                        AVG(processing_time_ms) as avg_processing_time,
-                        MIN(created_at) as first_access,
-                        MAX(created_at) as last_access
-                    FROM usage_statistics 
+                    SELECT {ROLLUP_TOTALS}
+                    FROM {ROLLUP_DAILY}
                     WHERE {where_clause}
                 """, params)
                 
@@ -250,74 +377,145 @@ class UsageStatsDB:
                 return {
                     "user_id": user_id,
                     "client_ip": client_ip,
-                    "total_requests": row[0] or 0,
-                    "successful_requests": row[1] or 0,
-                    "failed_requests": row[2] or 0,
-                    "total_tweets_analyzed": row[3] or 0,
-                    "avg_processing_time": round(row[4] or 0, 2),
-                    "first_access": row[5].isoformat() if row[5] else None,
-                    "last_access": row[6].isoformat() if row[6] else None
+                    **format_rollup_totals(row),
                 }
     
     @staticmethod
-    async def get_daily_stats(date: str) -> List[Dict[str, Any]]:
-        """Get daily statistics for all users."""
+    async def get_daily_stats(date: str, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get daily statistics for all users, or one user_id (from the daily rollup)."""
+        where_clause = "bucket = %s"
+        params = [date]
+        if user_id:
+            where_clause += " AND user_id = %s"
+            params.append(user_id)
         async with db_pool.get_connection() as conn:
             async with conn.cursor() as cursor:
-                await cursor.execute("""
-                    SELECT 
-                        client_ip,
-                        COUNT(*) as requests,
-                        SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as successful,
-                        SUM(CASE WHEN success = 0 THEN 1 ELSE 0 END) as failed,
-                        SUM(twitter_count) as tweets_analyzed,
-                        AVG(processing_time_ms) as avg_processing_time
-                    FROM usage_statistics 
-                    WHERE date = %s
+                await cursor.execute(f"""
+                    SELECT client_ip, {ROLLUP_TOTALS}
+                    FROM {ROLLUP_DAILY}
+                    WHERE {where_clause}
                     GROUP BY client_ip
-                    ORDER BY requests DESC
-                """, (date,))
+                    ORDER BY SUM(requests) DESC
+                """, params)
                 
                 results = await cursor.fetchall()
                 
                 return [
-                    {
-                        "client_ip": row[0],
-                        "requests": row[1],
-                        "successful": row[2],
-                        "failed": row[3],
-                        "tweets_analyzed": row[4],
-                        "avg_processing_time": round(row[5], 2)
-                    }
+                    {"client_ip": row[0], "user_id": user_id, **format_rollup_totals(row[1:])}
                     for row in results
                 ]
-    
+
     @staticmethod
-    async def get_recent_records(limit: int = 100) -> List[Dict[str, Any]]:
-        """Get recent usage records."""
+    async def get_daily_summary(date: str) -> Dict[str, Any]:
+        """Get totals for one day across all users (from the daily rollup)."""
         async with db_pool.get_connection() as conn:
             async with conn.cursor() as cursor:
-                await cursor.execute("""
-                    SELECT id, user_id, client_ip, user_agent, success, 
-                           twitter_count, content_length, processing_time_ms, created_at
-                    FROM usage_statistics 
-                    ORDER BY created_at DESC 
-                    LIMIT %s
-                """, (limit,))
-                
+                await cursor.execute(f"""
+                    SELECT COUNT(DISTINCT client_ip), {ROLLUP_TOTALS}
+                    FROM {ROLLUP_DAILY}
+                    WHERE bucket = %s
+                """, (date,))
+                row = await cursor.fetchone()
+                return {"active_users": row[0] or 0, **format_rollup_totals(row[1:])}
+
+    @staticmethod
+    async def get_hourly_stats(date: str) -> List[Dict[str, Any]]:
+        """Get per-hour totals for one day (from the hourly rollup)."""
+        day = datetime.strptime(date, "%Y-%m-%d")
+        async with db_pool.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(f"""
+                    SELECT bucket, COUNT(DISTINCT client_ip), {ROLLUP_TOTALS}
+                    FROM {ROLLUP_HOURLY}
+                    WHERE bucket >= %s AND bucket < %s
+                    GROUP BY bucket
+                    ORDER BY bucket
+                """, (day, day + timedelta(days=1)))
                 results = await cursor.fetchall()
-                
                 return [
                     {
-                        "id": row[0],
-                        "user_id": row[1],
-                        "client_ip": row[2],
-                        "user_agent": row[3],
-                        "success": bool(row[4]),
-                        "twitter_count": row[5],
-                        "content_length": row[6],
-                        "processing_time_ms": row[7],
-                        "created_at": row[8].isoformat() if row[8] else None
+                        "hour": row[0].isoformat(),
+                        "active_users": row[1] or 0,
+                        **format_rollup_totals(row[2:]),
                     }
                     for row in results
-                ]
\ No newline at end of file
+                ]
+    
+    @staticmethod
+    async def get_recent_records(
+        limit: int = 100,
+        user_id: Optional[str] = None,
+        client_ip: Optional[str] = None,
+        before_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get usage records newest first, optionally for one user_id or client_ip.
+
+        Pages are keyed on id (keyset pagination): pass the smallest id of
+        the previous page as before_id. Each page is one index range scan,
+        however deep into the history it is.
+        """
+        where_clause, params = record_filters(
+            user_id=user_id, client_ip=client_ip, before_id=before_id
+        )
+        params.append(limit)
+        async with db_pool.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(f"""
+                    SELECT {', '.join(USAGE_RECORD_COLUMNS)}
+                    FROM usage_statistics
+                    {where_clause}
+                    ORDER BY id DESC
+                    LIMIT %s
+                """, params)
+                return [format_usage_record(row) for row in await cursor.fetchall()]
+
+    @staticmethod
+    async def stream_records(
+        user_id: Optional[str] = None,
+        client_ip: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        partition: Optional[str] = None,
+        chunk_size: int = STREAM_CHUNK_ROWS,
+    ) -> AsyncIterator[List[tuple]]:
+        """
+        Stream usage_statistics rows (USAGE_RECORD_COLUMNS) in chunks.
+
+        Uses an unbuffered server-side cursor, so memory use depends on
+        chunk_size only, not on the number of rows. Rows are not sorted.
+
+        Args:
+            user_id: Only rows for this user ID
+            client_ip: Only rows for this client IP (ignored with user_id)
+            start: Only rows created at or after this time
+            end: Only rows created before this time
+            partition: Only rows in this partition of the table
+            chunk_size: Rows per yielded chunk
+        """
+        where_clause, params = record_filters(
+            user_id=user_id, client_ip=client_ip, start=start, end=end
+        )
+        table = f"usage_statistics PARTITION ({partition})" if partition else "usage_statistics"
+        async with db_pool.get_connection() as conn:
+            cursor = await conn.cursor(aiomysql.SSCursor)
+            finished = False
+            try:
+                await cursor.execute(
+                    f"SELECT {', '.join(USAGE_RECORD_COLUMNS)} FROM {table} {where_clause}",
+                    params,
+                )
+                while True:
+                    rows = await cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield rows
+                finished = True
+            finally:
+                if finished:
+                    await cursor.close()
+                else:
+                    # Abandoned (client gone or error): closing the cursor
+                    # would read the rest of the result, so drop the
+                    # connection instead; the pool does not reuse it
+                    conn.close()
@@ -0,0 +1,227 @@
+"""Versioned schema migrations for the MySQL database."""
+
+import importlib.util
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from core.config import settings
+from core.database import db_pool
+from core.logging_config import get_logger
+
+logger = get_logger("migrations")
+
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"
+)
+# Migration files: NNNN_description.py defining `async def upgrade(cursor)`
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.py$")
+# Named lock so concurrent deploys do not run migrations twice
+MIGRATION_LOCK = "twitter_scanner_schema_migrations"
+MIGRATION_LOCK_TIMEOUT = 60
+
+
+class SchemaOutdatedError(Exception):
+    """Raised when the database schema is behind the code and SCHEMA_CHECK=refuse."""
+
+
+class Migration:
+    """One migration file."""
+
+    def __init__(self, version: int, name: str, path: str):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def load(self):
+        """Import the migration module."""
+        spec = importlib.util.spec_from_file_location(
+            f"migrations.m{self.version:04d}_{self.name}", self.path
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+
+def discover_migrations() -> List[Migration]:
+    """
+    List migration files in version order.
+
+    Raises:
+        ValueError: If two files share a version number
+    """
+    migrations: Dict[int, Migration] = {}
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version:04d}: {filename}")
+        migrations[version] = Migration(
+            version, match.group(2), os.path.join(MIGRATIONS_DIR, filename)
+        )
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def latest_version() -> int:
+    """Highest migration version shipped with the code."""
+    migrations = discover_migrations()
+    return migrations[-1].version if migrations else 0
+
+
+# Helpers for migrations that must be idempotent against existing schemas
+
+async def column_exists(cursor, table: str, column: str) -> bool:
+    """Whether a column exists in the current database."""
+    await cursor.execute("""
+        SELECT 1 FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return await cursor.fetchone() is not None
+
+
+async def index_names(cursor, table: str) -> Set[str]:
+    """Names of the indexes on a table in the current database."""
+    await cursor.execute("""
+        SELECT DISTINCT INDEX_NAME FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return {row[0] for row in await cursor.fetchall()}
+
+
+async def _ensure_version_table(cursor):
+    await cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT NOT NULL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_ms INT NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """)
+
+
+async def _applied_versions(cursor) -> Set[int]:
+    await cursor.execute("SELECT version FROM schema_version")
+    return {row[0] for row in await cursor.fetchall()}
+
+
+async def get_current_version() -> int:
+    """Highest applied migration version (0 before any migration ran)."""
+    async with db_pool.get_connection() as conn:
+        async with conn.cursor() as cursor:
+            try:
+                await cursor.execute("SELECT MAX(version) FROM schema_version")
+            except Exception as e:
+                # 1146: table doesn't exist
+                if getattr(e, "args", (None,))[0] == 1146:
+                    return 0
+                raise
+            row = await cursor.fetchone()
+            return row[0] or 0
+
+
+async def get_schema_status() -> Dict[str, Any]:
+    """Applied and pending migrations."""
+    migrations = discover_migrations()
+    async with db_pool.get_connection() as conn:
+        async with conn.cursor() as cursor:
+            await _ensure_version_table(cursor)
+            applied = await _applied_versions(cursor)
+    return {
+        "current": max(applied, default=0),
+        "latest": migrations[-1].version if migrations else 0,
+        "pending": [
+            f"{migration.version:04d}_{migration.name}"
+            for migration in migrations
+            if migration.version not in applied
+        ],
+    }
+
+
+async def migrate(target: Optional[int] = None) -> List[Migration]:
+    """
+    Apply pending migrations in order, up to target (default: all).
+
+    Each migration is recorded in schema_version once it succeeds. DDL is
+    not transactional in MySQL, so migrations are written to be safe to
+    re-run after a partial failure.
+
+    Returns:
+        Migrations applied
+
+    Raises:
+        RuntimeError: If another process holds the migration lock
+    """
+    migrations = discover_migrations()
+    applied_now: List[Migration] = []
+    async with db_pool.get_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                "SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT)
+            )
+            if (await cursor.fetchone())[0] != 1:
+                raise RuntimeError("Another process is running migrations")
+            try:
+                await _ensure_version_table(cursor)
+                applied = await _applied_versions(cursor)
+                for migration in migrations:
+                    if migration.version in applied:
+                        continue
+                    if target is not None and migration.version > target:
+                        break
+                    started = time.perf_counter()
+                    logger.info(
+                        "Applying migration",
+                        version=migration.version,
+                        name=migration.name,
+                    )
+                    await migration.load().upgrade(cursor)
+                    duration_ms = int((time.perf_counter() - started) * 1000)
+                    await cursor.execute(
+                        "INSERT INTO schema_version (version, name, duration_ms) VALUES (%s, %s, %s)",
+                        (migration.version, migration.name, duration_ms),
+                    )
+                    applied_now.append(migration)
+                    logger.info(
+                        "Migration applied",
+                        version=migration.version,
+                        name=migration.name,
+                        duration_ms=duration_ms,
+                    )
+            finally:
+                await cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+    return applied_now
+
+
+async def check_schema() -> int:
+    """
+    Startup check: compare the applied schema version with the code.
+
+    One indexed query; migrations themselves run before deploy through
+    scripts/migrate.py.
+
+    Returns:
+        Current schema version
+
+    Raises:
+        SchemaOutdatedError: If the schema is behind and SCHEMA_CHECK=refuse
+    """
+    current = await get_current_version()
+    latest = latest_version()
+    if current < latest:
+        message = (
+            f"Database schema is at version {current}, code expects {latest}; "
+            "run `python scripts/migrate.py upgrade`"
+        )
+        if settings.schema_check == "refuse":
+            raise SchemaOutdatedError(message)
+        logger.warning(message, current_version=current, expected_version=latest)
+    elif current > latest:
+        logger.warning(
+            "Database schema is newer than the code",
+            current_version=current,
+            expected_version=latest,
+        )
+    return current
@@ -1,6 +1,6 @@
 """Data models for Twitter Scanner Backend."""
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -25,14 +25,24 @@ class AnalyzeRequest(BaseModel):
     user_id: Optional[str] = Field(
         None, description="Unique user identifier (UUID)"
     )
+    mode: str = Field(
+        "auto",
+        pattern="^(auto|single|chunked)$",
+        description="Analysis mode: auto, single or chunked (map-reduce)",
+    )
+    template_id: Optional[str] = Field(
+        None,
+        max_length=64,
+        description="Prompt template identifier, used to pick the model tier",
+    )
 
 
 class UsageInfo(BaseModel):
     """Usage information model."""
 
-    current: int = Field(..., description="Current usage count")
-    limit: int = Field(..., description="Usage limit")
-    remaining: int = Field(..., description="Remaining usage")
+    current: float = Field(..., description="Usage in cost units")
+    limit: float = Field(..., description="Usage limit in cost units")
+    remaining: float = Field(..., description="Remaining cost units")
 
 
 class AnalyzeResponse(BaseModel):
@@ -42,6 +52,40 @@ class AnalyzeResponse(BaseModel):
     analysis: str = Field(..., description="Analysis result")
     usage: UsageInfo = Field(..., description="Usage information")
     processingTime: int = Field(..., description="Processing time in milliseconds")
+    cacheStatus: str = Field(
+        "miss",
+        description="Result cache status (hit, miss, bypass, or shared for a coalesced duplicate request)",
+    )
+    upstreamUsage: Optional[Dict[str, int]] = Field(
+        None,
+        description="Claude token usage, including prompt cache reads and writes",
+    )
+    tokensSaved: int = Field(
+        0, description="Estimated input tokens removed by tweet compaction"
+    )
+    model: Optional[str] = Field(None, description="Claude model that produced the analysis")
+    partial: bool = Field(
+        False,
+        description="Whether some chunks failed and the digest covers only part of the batch (not cached)",
+    )
+
+
+class AnalyzeJobResponse(BaseModel):
+    """Status of an asynchronous analysis job."""
+
+    jobId: str = Field(..., description="Job identifier")
+    status: str = Field(
+        ..., description="Job status (queued, running, succeeded or failed)"
+    )
+    createdAt: str = Field(..., description="Submission time")
+    startedAt: Optional[str] = Field(None, description="Time a worker picked the job up")
+    finishedAt: Optional[str] = Field(None, description="Completion time")
+    result: Optional[AnalyzeResponse] = Field(
+        None, description="Analysis result once the job succeeded"
+    )
+    error: Optional[Dict[str, Any]] = Field(
+        None, description="Error details once the job failed"
+    )
 
 
 class ErrorResponse(BaseModel):
@@ -64,10 +108,10 @@ class HealthResponse(BaseModel):
 class UsageResponse(BaseModel):
     """Usage stats response model."""
 
-    usage: int = Field(..., description="Current usage count")
-    limit: int = Field(..., description="Usage limit")
-    remaining: int = Field(..., description="Remaining usage")
-    reset_time: str = Field(..., description="Next reset time")
+    usage: float = Field(..., description="Usage in cost units")
+    limit: float = Field(..., description="Usage limit in cost units")
+    remaining: float = Field(..., description="Remaining cost units")
+    reset_time: str = Field(..., description="When this client's usage window resets")
 
 
 class UsageStatsRecord(BaseModel):
@@ -78,12 +122,25 @@ class UsageStatsRecord(BaseModel):
     client_ip: str = Field(..., description="Client IP address")
     user_agent: Optional[str] = Field(None, description="Browser user agent string")
     success: bool = Field(..., description="Whether the request was successful")
+    outcome: Optional[str] = Field(
+        None,
+        description="Request outcome (success, error, cancelled or deadline_exceeded)",
+    )
     twitter_count: int = Field(..., description="Number of tweets analyzed")
     content_length: int = Field(..., description="Total content length in characters")
     processing_time_ms: int = Field(..., description="Processing time in milliseconds")
     created_at: Optional[str] = Field(None, description="Record creation timestamp")
 
 
+class UsageRecordsPage(BaseModel):
+    """One page of usage records, newest first."""
+
+    records: List[UsageStatsRecord] = Field(..., description="Records on this page")
+    next_cursor: Optional[int] = Field(
+        None, description="Pass as cursor to get the next page (null on the last page)"
+    )
+
+
 class UserStatsResponse(BaseModel):
     """User statistics response model."""
 
@@ -92,6 +149,9 @@ class UserStatsResponse(BaseModel):
     total_requests: int = Field(..., description="Total number of requests")
     successful_requests: int = Field(..., description="Number of successful requests")
     failed_requests: int = Field(..., description="Number of failed requests")
+    cancelled_requests: int = Field(
+        0, description="Failed requests abandoned by the client (disconnect or deadline)"
+    )
     total_tweets_analyzed: int = Field(..., description="Total tweets analyzed")
     avg_processing_time: float = Field(..., description="Average processing time in ms")
     first_access: Optional[str] = Field(None, description="First access timestamp")
@@ -103,3 +163,27 @@ class DailyStatsResponse(BaseModel):
 
     date: str = Field(..., description="Date (YYYY-MM-DD)")
     users: List[UserStatsResponse] = Field(..., description="User statistics for the day")
+
+
+class HourlyStats(BaseModel):
+    """Statistics for one hour."""
+
+    hour: str = Field(..., description="Start of the hour")
+    active_users: int = Field(..., description="Distinct client IPs in the hour")
+    total_requests: int = Field(..., description="Total number of requests")
+    successful_requests: int = Field(..., description="Number of successful requests")
+    failed_requests: int = Field(..., description="Number of failed requests")
+    cancelled_requests: int = Field(
+        0, description="Failed requests abandoned by the client (disconnect or deadline)"
+    )
+    total_tweets_analyzed: int = Field(..., description="Total tweets analyzed")
+    avg_processing_time: float = Field(..., description="Average processing time in ms")
+    first_access: Optional[str] = Field(None, description="First access timestamp")
+    last_access: Optional[str] = Field(None, description="Last access timestamp")
+
+
+class HourlyStatsResponse(BaseModel):
+    """Hourly statistics response model."""
+
+    date: str = Field(..., description="Date (YYYY-MM-DD)")
+    hours: List[HourlyStats] = Field(..., description="Statistics per hour with traffic")
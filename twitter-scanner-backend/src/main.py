@@ -13,8 +13,16 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.config import settings
 from core.logging_config import setup_logging, get_logger
-from core.database import init_database, db_pool
-from api.routes import health, usage, analyze, stats
+from core.database import db_pool
+from core.migrations import SchemaOutdatedError, check_schema
+from services.analysis_cache import analysis_cache
+from services.claude_client import claude_client
+from services.batch_collector import batch_collector
+from services.job_queue import job_worker_pool
+from services.partition_maintenance import partition_maintenance
+from services.usage_recorder import usage_recorder
+from utils.rate_limiter import rate_limit_manager
+from api.routes import health, usage, analyze, jobs, stats
 from api.middleware.logging import LoggingMiddleware
 from api.middleware.exceptions import ExceptionHandlerMiddleware
 
@@ -59,6 +67,7 @@ if settings.environment == "production":
 app.include_router(health.router, tags=["health"])
 app.include_router(usage.router, tags=["usage"])
 app.include_router(analyze.router, tags=["analysis"])
+app.include_router(jobs.router, tags=["analysis"])
 app.include_router(stats.router, tags=["statistics"])
 
 
@@ -66,7 +75,9 @@ app.include_router(stats.router, tags=["statistics"])
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Handle HTTP exceptions with consistent error format."""
-    return JSONResponse(status_code=exc.status_code, content=exc.detail)
+    return JSONResponse(
+        status_code=exc.status_code, content=exc.detail, headers=exc.headers
+    )
 
 
 # 404 handler
@@ -87,20 +98,42 @@ async def catch_all(request: Request, path: str):
 @app.on_event("startup")
 async def startup_event():
     """Initialize application on startup."""
-    # Initialize database
+    # Connect to the database and check the schema version (migrations run
+    # before deploy: python scripts/migrate.py upgrade)
     try:
-        await init_database()
-        logger.info("Database initialized successfully")
+        await db_pool.create_pool()
+        schema_version = await check_schema()
+        logger.info("Database initialized successfully", schema_version=schema_version)
+    except SchemaOutdatedError as e:
+        logger.error(str(e))
+        raise
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         # Continue startup even if database fails (for graceful degradation)
+
+    # Start writing queued usage records in batches
+    await usage_recorder.start()
+
+    # Pre-create upcoming usage_statistics partitions, archive expired ones
+    if settings.partition_maintenance_enabled:
+        await partition_maintenance.start()
+
+    # Restore usage windows saved before the last shutdown
+    await rate_limit_manager.start()
+
+    # Open the shared Claude HTTP connection pool
+    await claude_client.start()
+
+    # Start the background workers for asynchronous analysis jobs
+    await job_worker_pool.start()
+    await batch_collector.start()
     
     logger.info(
         "Twitter Scanner Backend starting up",
         port=settings.port,
         environment=settings.environment,
         rate_limit=f"{settings.max_requests_per_ip} requests per {settings.rate_limit_window_ms / 60000} minutes",
-        usage_limit=f"{settings.max_free_usage_per_ip} requests per {settings.usage_reset_interval_hours} hours",
+        usage_limit=f"{settings.max_free_usage_per_ip} units per {settings.usage_reset_interval_hours} hours",
         timestamp=datetime.now().isoformat(),
     )
 
@@ -109,6 +142,43 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown."""
+    # Stop job workers first; jobs in progress are requeued
+    try:
+        await batch_collector.stop()
+        await job_worker_pool.stop()
+    except Exception as e:
+        logger.error(f"Error stopping job workers: {e}")
+
+    # Close the shared Claude HTTP connection pool
+    try:
+        await claude_client.close()
+    except Exception as e:
+        logger.error(f"Error closing Claude HTTP client: {e}")
+
+    # Save usage windows and close the shared rate limiter connection
+    try:
+        await rate_limit_manager.close()
+    except Exception as e:
+        logger.error(f"Error closing rate limiter: {e}")
+
+    # Close analysis cache connections
+    try:
+        await analysis_cache.close()
+    except Exception as e:
+        logger.error(f"Error closing analysis cache: {e}")
+
+    # Stop partition maintenance before the database pool closes
+    try:
+        await partition_maintenance.stop()
+    except Exception as e:
+        logger.error(f"Error stopping partition maintenance: {e}")
+
+    # Write the usage records still queued
+    try:
+        await usage_recorder.stop()
+    except Exception as e:
+        logger.error(f"Error flushing usage records: {e}")
+
     # Close database connection pool
     try:
         await db_pool.close_pool()
@@ -0,0 +1,49 @@
+"""Create usage_statistics, bringing tables from older releases up to date."""
+
+from core.migrations import column_exists
+
+
+async def upgrade(cursor):
+    await cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usage_statistics (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id VARCHAR(36),
+            client_ip VARCHAR(45) NOT NULL,
+            user_agent TEXT,
+            success BOOLEAN NOT NULL,
+            outcome VARCHAR(20) NOT NULL DEFAULT 'success',
+            twitter_count INT NOT NULL,
+            content_length INT NOT NULL,
+            processing_time_ms INT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_user_id (user_id),
+            INDEX idx_client_ip (client_ip),
+            INDEX idx_created_at (created_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """)
+
+    # Tables created before user_id existed, or with a shorter column
+    if not await column_exists(cursor, "usage_statistics", "user_id"):
+        await cursor.execute("""
+            ALTER TABLE usage_statistics ADD COLUMN user_id VARCHAR(36) AFTER id
+        """)
+    else:
+        await cursor.execute("""
+            SELECT CHARACTER_MAXIMUM_LENGTH FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'usage_statistics' AND COLUMN_NAME = 'user_id'
+        """)
+        column_info = await cursor.fetchone()
+        if column_info and column_info[0] < 36:
+            await cursor.execute("""
+                ALTER TABLE usage_statistics MODIFY COLUMN user_id VARCHAR(36)
+            """)
+
+    # Tables created before outcome existed
+    if not await column_exists(cursor, "usage_statistics", "outcome"):
+        await cursor.execute("""
+            ALTER TABLE usage_statistics
+            ADD COLUMN outcome VARCHAR(20) NOT NULL DEFAULT 'success' AFTER success
+        """)
+        await cursor.execute("""
+            UPDATE usage_statistics SET outcome = 'error' WHERE success = 0
+        """)
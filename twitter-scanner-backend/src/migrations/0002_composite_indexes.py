@@ -0,0 +1,29 @@
+"""Replace single-column usage_statistics indexes with composite ones.
+
+Raw-table queries use half-open created_at ranges (never
+DATE(created_at) = ...) or equality on the leading column, so each one
+runs on one of these indexes.
+"""
+
+from core.migrations import index_names
+
+INDEXES = {
+    "idx_created_client": "(created_at, client_ip)",
+    "idx_client_created": "(client_ip, created_at)",
+    "idx_user_created": "(user_id, created_at)",
+}
+# Prefixes of the composites above
+REPLACED_INDEXES = ("idx_created_at", "idx_client_ip", "idx_user_id")
+
+
+async def upgrade(cursor):
+    existing = await index_names(cursor, "usage_statistics")
+    changes = [
+        f"ADD INDEX {name} {columns}"
+        for name, columns in INDEXES.items()
+        if name not in existing
+    ] + [f"DROP INDEX {name}" for name in REPLACED_INDEXES if name in existing]
+    if changes:
+        await cursor.execute(
+            f"ALTER TABLE usage_statistics {', '.join(changes)}, ALGORITHM=INPLACE, LOCK=NONE"
+        )
@@ -0,0 +1,27 @@
+"""Create the hourly and daily rollup tables read by the stats API.
+
+Backfill existing history with scripts/rebuild_rollups.py.
+"""
+
+from core.database import ROLLUP_TABLES
+
+
+async def upgrade(cursor):
+    for table, bucket_type in ROLLUP_TABLES:
+        await cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket {bucket_type} NOT NULL,
+                client_ip VARCHAR(45) NOT NULL,
+                user_id VARCHAR(36) NOT NULL DEFAULT '',
+                outcome VARCHAR(20) NOT NULL,
+                requests INT NOT NULL DEFAULT 0,
+                tweets BIGINT NOT NULL DEFAULT 0,
+                content_length BIGINT NOT NULL DEFAULT 0,
+                processing_time_ms BIGINT NOT NULL DEFAULT 0,
+                first_access TIMESTAMP NULL,
+                last_access TIMESTAMP NULL,
+                PRIMARY KEY (bucket, client_ip, user_id, outcome),
+                INDEX idx_client_ip_bucket (client_ip, bucket),
+                INDEX idx_user_id_bucket (user_id, bucket)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """)
@@ -0,0 +1,44 @@
+"""Partition usage_statistics by month on created_at.
+
+MySQL requires the partitioning column in every unique key, so the
+primary key becomes (id, created_at); id stays AUTO_INCREMENT and unique
+in practice. Partitioning rebuilds the table (a table copy), so run this
+in a maintenance window on large tables. Later months are pre-created and
+expired ones archived and dropped by services.partition_maintenance.
+"""
+
+from datetime import date
+
+from core.config import settings
+from services.partition_maintenance import (
+    TABLE,
+    add_months,
+    list_partitions,
+    month_start,
+    partition_clause,
+)
+
+
+async def upgrade(cursor):
+    if await list_partitions(cursor):
+        return
+
+    await cursor.execute(f"SELECT MIN(created_at) FROM {TABLE}")
+    oldest = (await cursor.fetchone())[0]
+    current_month = month_start(date.today())
+    first_month = month_start(oldest) if oldest else current_month
+
+    # The partitioning column must be NOT NULL to be part of the primary key
+    await cursor.execute(f"UPDATE {TABLE} SET created_at = NOW() WHERE created_at IS NULL")
+    await cursor.execute(f"""
+        ALTER TABLE {TABLE}
+        MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        DROP PRIMARY KEY,
+        ADD PRIMARY KEY (id, created_at)
+    """)
+    await cursor.execute(
+        f"ALTER TABLE {TABLE} "
+        + partition_clause(
+            first_month, add_months(current_month, settings.partition_precreate_months)
+        )
+    )
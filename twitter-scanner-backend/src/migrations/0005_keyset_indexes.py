@@ -0,0 +1,29 @@
+"""Key the per-user and per-client usage_statistics indexes on id.
+
+Record pages filter on user_id or client_ip and walk id downwards
+(keyset pagination), which (user_id, id) and (client_ip, id) serve
+without a sort. The primary key is (id, created_at), so these indexes
+still carry created_at for date-range filters.
+"""
+
+from core.migrations import index_names
+
+INDEXES = {
+    "idx_client_id": "(client_ip, id)",
+    "idx_user_id_id": "(user_id, id)",
+}
+# Only used by record queries, which now order by id
+REPLACED_INDEXES = ("idx_client_created", "idx_user_created")
+
+
+async def upgrade(cursor):
+    existing = await index_names(cursor, "usage_statistics")
+    changes = [
+        f"ADD INDEX {name} {columns}"
+        for name, columns in INDEXES.items()
+        if name not in existing
+    ] + [f"DROP INDEX {name}" for name in REPLACED_INDEXES if name in existing]
+    if changes:
+        await cursor.execute(
+            f"ALTER TABLE usage_statistics {', '.join(changes)}, ALGORITHM=INPLACE, LOCK=NONE"
+        )
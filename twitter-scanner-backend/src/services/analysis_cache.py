@@ -0,0 +1,229 @@
+"""Content-addressed result cache for tweet analyses."""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import sys
+import os
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from core.logging_config import get_logger
+from core.models import Tweet
+
+logger = get_logger("analysis_cache")
+
+
+class MemoryCacheTier:
+    """Bounded in-memory LRU cache with TTL and byte-size accounting."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, value, size_bytes), oldest first
+        self.entries: "OrderedDict[str, Tuple[float, str, int]]" = OrderedDict()
+        self.current_bytes = 0
+        self.evictions = 0
+
+    def _remove(self, key: str):
+        """Remove an entry and release its bytes."""
+        _, _, size = self.entries.pop(key)
+        self.current_bytes -= size
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached value, dropping it if expired."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value, _ = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        """Store a value, evicting least recently used entries to stay in bounds."""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            logger.debug("Cache value too large for memory tier", size_bytes=size)
+            return
+
+        if key in self.entries:
+            self._remove(key)
+
+        while self.entries and (
+            len(self.entries) >= self.max_entries
+            or self.current_bytes + size > self.max_bytes
+        ):
+            oldest_key = next(iter(self.entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+        self.entries[key] = (time.time() + self.ttl_seconds, value, size)
+        self.current_bytes += size
+
+    def clear(self):
+        """Drop all entries."""
+        self.entries.clear()
+        self.current_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get memory tier statistics."""
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class RedisCacheTier:
+    """Optional shared cache tier backed by Redis."""
+
+    def __init__(self, redis_url: str, ttl_seconds: int, prefix: str = "analysis:"):
+        self.redis_url = redis_url
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.errors = 0
+        self._redis = None
+
+    def _get_redis(self):
+        """Create the Redis client lazily."""
+        if self._redis is None:
+            import redis.asyncio as redis_asyncio
+
+            self._redis = redis_asyncio.from_url(
+                self.redis_url, decode_responses=True
+            )
+        return self._redis
+
+    async def get(self, key: str) -> Optional[str]:
+        """Get a cached value; Redis errors are treated as a miss."""
+        try:
+            return await self._get_redis().get(self.prefix + key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Redis cache read failed", error=str(e))
+            return None
+
+    async def set(self, key: str, value: str):
+        """Store a value with TTL; Redis errors are logged and ignored."""
+        try:
+            await self._get_redis().set(self.prefix + key, value, ex=self.ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Redis cache write failed", error=str(e))
+
+    async def close(self):
+        """Close the Redis connection pool."""
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+class AnalysisCache:
+    """Two-tier (memory + optional Redis) cache for analysis results."""
+
+    def __init__(self):
+        self.enabled = settings.analysis_cache_enabled
+        self.memory = MemoryCacheTier(
+            max_entries=settings.analysis_cache_max_entries,
+            max_bytes=settings.analysis_cache_max_bytes,
+            ttl_seconds=settings.analysis_cache_ttl_seconds,
+        )
+        self.redis: Optional[RedisCacheTier] = None
+        if settings.redis_url and settings.analysis_cache_use_redis:
+            self.redis = RedisCacheTier(
+                redis_url=settings.redis_url,
+                ttl_seconds=settings.analysis_cache_ttl_seconds,
+            )
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_tweets(tweets: List[Tweet]) -> List[Dict[str, str]]:
+        """Normalize tweets so that whitespace noise does not change the key."""
+        return [
+            {
+                "author": tweet.author.strip(),
+                "content": " ".join(tweet.content.split()),
+                "timestamp": tweet.timestamp.strip(),
+                "url": (tweet.url or "").strip(),
+            }
+            for tweet in tweets
+        ]
+
+    @classmethod
+    def make_key(
+        cls, tweets: List[Tweet], system_prompt: str, model_params: Dict[str, Any]
+    ) -> str:
+        """Build a stable content hash for an analysis request."""
+        payload = json.dumps(
+            {
+                "tweets": cls.normalize_tweets(tweets),
+                "system": system_prompt,
+                "params": model_params,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Look up an analysis, promoting Redis hits into the memory tier."""
+        if not self.enabled:
+            return None
+
+        value = self.memory.get(key)
+        if value is None and self.redis is not None:
+            value = await self.redis.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, analysis: str):
+        """Store an analysis in all tiers."""
+        if not self.enabled:
+            return
+
+        self.memory.set(key, analysis)
+        if self.redis is not None:
+            await self.redis.set(key, analysis)
+
+    async def close(self):
+        """Release tier resources."""
+        if self.redis is not None:
+            await self.redis.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+            "memory": self.memory.get_stats(),
+            "redis_enabled": self.redis is not None,
+            "redis_errors": self.redis.errors if self.redis else 0,
+        }
+
+
+# Global analysis cache instance
+analysis_cache = AnalysisCache()
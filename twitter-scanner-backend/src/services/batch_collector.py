@@ -0,0 +1,325 @@
+"""Bulk job collection and result polling for the Message Batches API."""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+import sys
+import os
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from core.logging_config import get_logger
+from services.claude_client import ClaudeAPIError, ClaudeClient, claude_client
+from services.job_queue import (
+    FINISHED_STATES,
+    JOB_FAILED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    JobFailedError,
+    JobQueueFullError,
+    job_store,
+)
+
+logger = get_logger("batch_collector")
+
+BatchPrepare = Callable[[Dict[str, Any]], Dict[str, Any]]
+BatchFinish = Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[Dict[str, Any]]]
+BatchAbandon = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class BatchCollector:
+    """
+    Group bulk jobs into Message Batches submissions and collect the results.
+
+    Jobs wait in a pending list until max_requests are collected or the
+    oldest has waited flush_interval seconds. Submitted batches are polled
+    every poll_interval seconds; when a batch has ended its results are
+    written back to the job store. Pending jobs and submitted batches are
+    also recorded in the job store, so after a restart (or, with the Redis
+    store, when another instance stopped) they are resumed instead of
+    being stuck with their usage reserved.
+    """
+
+    def __init__(
+        self,
+        store,
+        client: ClaudeClient,
+        max_requests: int = 100,
+        flush_interval: float = 60.0,
+        poll_interval: float = 30.0,
+        max_pending: int = 1000,
+    ):
+        self.store = store
+        self.client = client
+        self.max_requests = max_requests
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self.max_pending = max_pending
+        self.handlers: Dict[
+            str, Tuple[BatchPrepare, BatchFinish, Optional[BatchAbandon]]
+        ] = {}
+
+        self.pending: Deque[Tuple[str, float]] = deque()  # (job_id, queued_at)
+        self.in_flight: Dict[str, Dict[str, Any]] = {}
+        self.next_flush_at = 0.0
+        self.next_claim_at = 0.0
+        self.task: Optional[asyncio.Task] = None
+
+        self.batches_submitted = 0
+        self.requests_submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def register(
+        self,
+        kind: str,
+        prepare: BatchPrepare,
+        finish: BatchFinish,
+        abandon: Optional[BatchAbandon] = None,
+    ):
+        """
+        Register how jobs of one kind are turned into batch requests and back.
+
+        Args:
+            kind: Job kind
+            prepare: Builds the batch request entry (custom_id must be the job
+                id); fields it adds to job["context"] are saved with the job
+            finish: Turns a result entry into the job result, or raises
+                JobFailedError
+            abandon: Called for every job that fails (including failures
+                raised by finish), e.g. to release resources held for it
+        """
+        self.handlers[kind] = (prepare, finish, abandon)
+
+    async def submit(self, job: Dict[str, Any]):
+        """
+        Store a bulk job and add it to the next batch.
+
+        Raises:
+            JobQueueFullError: If too many bulk jobs are already pending
+        """
+        if len(self.pending) >= self.max_pending:
+            raise JobQueueFullError("Bulk job queue is full")
+        queued_at = time.time()
+        await self.store.save(job)
+        await self.store.save_bulk_pending(job["id"], queued_at)
+        self.pending.append((job["id"], queued_at))
+
+    async def start(self):
+        """Resume persisted bulk jobs and start the background flush/poll loop."""
+        if self.task is None:
+            try:
+                await self.resume()
+            except Exception as e:
+                logger.error("Resuming bulk jobs failed, will retry", error=str(e))
+            self.next_claim_at = time.time() + self.poll_interval
+            self.task = asyncio.create_task(self._run())
+
+    async def resume(self):
+        """Pick up pending jobs and batches recorded in the job store."""
+        pending, batches = await self.store.claim_bulk()
+        known = {job_id for job_id, _ in self.pending}
+        added = [
+            (job_id, queued_at)
+            for job_id, queued_at in pending.items()
+            if job_id not in known
+        ]
+        if added:
+            self.pending = deque(sorted([*self.pending, *added], key=lambda item: item[1]))
+
+        resumed = 0
+        for batch_id, batch in batches.items():
+            if batch_id not in self.in_flight:
+                self.in_flight[batch_id] = {**batch, "next_poll_at": time.time()}
+                resumed += 1
+
+        if added or resumed:
+            logger.info(
+                "Resumed bulk jobs", pending_jobs=len(added), in_flight_batches=resumed
+            )
+
+    async def stop(self):
+        """Stop the background loop."""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        if self.pending or self.in_flight:
+            logger.warning(
+                "Batch collector stopped with unfinished bulk jobs, they resume on the next start",
+                pending_jobs=len(self.pending),
+                in_flight_batches=len(self.in_flight),
+            )
+
+    async def _run(self):
+        """Flush and poll once per second until cancelled."""
+        while True:
+            await asyncio.sleep(1)
+            try:
+                await self._tick()
+            except Exception as e:
+                logger.error("Batch collector tick failed", error=str(e))
+
+    async def _tick(self):
+        """Submit a batch if one is due and poll batches that are due."""
+        now = time.time()
+        if now >= self.next_claim_at:
+            self.next_claim_at = now + self.poll_interval
+            await self.resume()
+
+        if self.pending and now >= self.next_flush_at and (
+            len(self.pending) >= self.max_requests
+            or now - self.pending[0][1] >= self.flush_interval
+        ):
+            await self.flush()
+
+        for batch_id, batch in list(self.in_flight.items()):
+            if now >= batch["next_poll_at"]:
+                await self.poll(batch_id)
+
+    async def _fail(self, job: Dict[str, Any], error: Dict[str, Any]):
+        """Mark one job failed and run its kind's abandon handler."""
+        self.failed += 1
+        await self.store.update(
+            job["id"], status=JOB_FAILED, finished_at=time.time(), error=error
+        )
+        abandon = self.handlers.get(job["kind"], (None, None, None))[2]
+        if abandon is not None:
+            try:
+                await abandon(job)
+            except Exception as e:
+                logger.error("Bulk job abandon handler failed", job_id=job["id"], error=str(e))
+
+    async def flush(self):
+        """Submit up to max_requests pending jobs as one batch."""
+        taken = [
+            self.pending.popleft()
+            for _ in range(min(self.max_requests, len(self.pending)))
+        ]
+        requests: List[Dict[str, Any]] = []
+        jobs: List[Dict[str, Any]] = []
+        dropped: List[str] = []
+        for job_id, _ in taken:
+            job = await self.store.get(job_id)
+            if job is None:
+                dropped.append(job_id)
+                continue
+            try:
+                prepare = self.handlers[job["kind"]][0]
+                requests.append(prepare(job))
+                jobs.append(job)
+            except Exception as e:
+                await self._fail(job, {"error": str(e) or type(e).__name__})
+                dropped.append(job_id)
+        await self.store.delete_bulk_pending(dropped)
+
+        if not requests:
+            return
+
+        try:
+            batch = await self.client.create_message_batch(requests)
+        except ClaudeAPIError as e:
+            if e.status_code and 400 <= e.status_code < 500 and e.status_code != 429:
+                # The submission itself is invalid; retrying will not help
+                for job in jobs:
+                    await self._fail(job, {"error": e.message, "status_code": 400})
+                await self.store.delete_bulk_pending([job["id"] for job in jobs])
+                return
+            logger.warning(
+                "Batch submission failed, will retry",
+                error=e.message,
+                job_count=len(jobs),
+                retry_in_seconds=self.flush_interval,
+            )
+            requeued = {job["id"] for job in jobs}
+            self.pending.extendleft(
+                item for item in reversed(taken) if item[0] in requeued
+            )
+            self.next_flush_at = time.time() + self.flush_interval
+            return
+
+        batch_id = batch["id"]
+        record = {"job_ids": [job["id"] for job in jobs], "submitted_at": time.time()}
+        self.in_flight[batch_id] = {**record, "next_poll_at": time.time() + self.poll_interval}
+        await self.store.save_bulk_batch(batch_id, record)
+        self.batches_submitted += 1
+        self.requests_submitted += len(requests)
+        for job in jobs:
+            await self.store.update(
+                job["id"],
+                status=JOB_RUNNING,
+                started_at=time.time(),
+                context={**job["context"], "batch_id": batch_id},
+            )
+
+    async def poll(self, batch_id: str):
+        """Check one batch and write its results back once it has ended."""
+        batch_info = self.in_flight[batch_id]
+        batch_info["next_poll_at"] = time.time() + self.poll_interval
+        try:
+            batch = await self.client.get_message_batch(batch_id)
+            if batch.get("processing_status") != "ended":
+                return
+            results = await self.client.get_message_batch_results(batch)
+        except ClaudeAPIError as e:
+            logger.warning("Batch poll failed", batch_id=batch_id, error=e.message)
+            return
+
+        entries = {entry.get("custom_id"): entry for entry in results}
+        for job_id in batch_info["job_ids"]:
+            job = await self.store.get(job_id)
+            if job is None or job["status"] in FINISHED_STATES:
+                # Already collected before a restart interrupted this batch
+                continue
+            entry = entries.get(job_id)
+            if entry is None:
+                await self._fail(job, {"error": "Missing from batch results"})
+                continue
+            finish = self.handlers[job["kind"]][1]
+            try:
+                result = await finish(job, entry)
+            except JobFailedError as e:
+                await self._fail(job, e.details)
+                continue
+            except Exception as e:
+                await self._fail(job, {"error": str(e) or type(e).__name__})
+                continue
+            self.succeeded += 1
+            await self.store.update(
+                job_id, status=JOB_SUCCEEDED, finished_at=time.time(), result=result
+            )
+
+        await self.store.delete_bulk_batch(batch_id)
+        del self.in_flight[batch_id]
+        logger.info(
+            "Message batch collected",
+            batch_id=batch_id,
+            job_count=len(batch_info["job_ids"]),
+            duration_ms=round((time.time() - batch_info["submitted_at"]) * 1000, 2),
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get bulk batching statistics."""
+        return {
+            "pending_jobs": len(self.pending),
+            "in_flight_batches": len(self.in_flight),
+            "batches_submitted": self.batches_submitted,
+            "requests_submitted": self.requests_submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
+
+
+# Global batch collector for bulk analysis jobs
+batch_collector = BatchCollector(
+    job_store,
+    claude_client,
+    max_requests=settings.batch_max_requests,
+    flush_interval=settings.batch_flush_interval_seconds,
+    poll_interval=settings.batch_poll_interval_seconds,
+    max_pending=settings.job_queue_max_size,
+)
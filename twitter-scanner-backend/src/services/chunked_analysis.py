@@ -0,0 +1,254 @@
+"""Map-reduce analysis of large tweet batches."""
+
+import asyncio
+import time
+from typing import List, Optional
+import sys
+import os
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from core.logging_config import get_logger
+from core.models import Tweet
+from services.claude_client import (
+    ClaudeClient,
+    ClaudeAPIError,
+    UpstreamUnavailableError,
+    claude_client,
+)
+from utils.tokens import estimate_tokens
+
+logger = get_logger("chunked_analysis")
+
+
+CHUNK_USER_PROMPT = """This is part {index} of {total} of a larger batch of tweets. Extract the valuable insights from this part only, following the curation criteria. Keep author links and original tweet links exactly as given, and be concise - your notes will be merged with the other parts into one digest.
+
+{tweets}"""
+
+MERGE_USER_PROMPT = """The tweets were analyzed in {total} parts. Below are the notes for each part. Merge them into a single curated digest: group related topics across parts, remove duplicates, keep all author and tweet links, and follow the output format requirements.
+
+{notes}"""
+
+PARTIAL_NOTICE = "> ⚠️ {failed}/{total} 批推文分析超时或失败，以下摘要可能不完整。"
+
+
+class AnalysisResult:
+    """Digest of an analysis and how much of the batch it covers."""
+
+    def __init__(
+        self,
+        text: str,
+        analyzed_tweets: int,
+        failed_chunks: int = 0,
+        total_chunks: int = 1,
+    ):
+        self.text = text
+        self.analyzed_tweets = analyzed_tweets
+        self.failed_chunks = failed_chunks
+        self.total_chunks = total_chunks
+
+    @property
+    def partial(self) -> bool:
+        """Whether some chunks failed, so the digest misses part of the batch."""
+        return self.failed_chunks > 0
+
+
+class ChunkedAnalyzer:
+    """Split large batches into token-bounded chunks, analyze them concurrently and merge."""
+
+    def __init__(self, client: ClaudeClient):
+        self.client = client
+
+    def estimate_prompt_tokens(self, tweets: List[Tweet]) -> int:
+        """Estimate the token size of the single-call user prompt."""
+        return estimate_tokens(self.client.build_user_prompt(tweets))
+
+    def should_chunk(self, tweets: List[Tweet], mode: str = "auto") -> bool:
+        """Decide whether a request should use chunked analysis."""
+        if mode == "single":
+            return False
+        if mode == "chunked":
+            return len(tweets) > 1
+        return self.estimate_prompt_tokens(tweets) > settings.analysis_chunk_threshold_tokens
+
+    def split_into_chunks(self, tweets: List[Tweet]) -> List[List[Tweet]]:
+        """Split tweets into consecutive chunks that each fit the chunk token budget."""
+        max_tokens = settings.analysis_chunk_max_tokens
+        chunks: List[List[Tweet]] = []
+        current: List[Tweet] = []
+        current_tokens = 0
+
+        for tweet in tweets:
+            tweet_tokens = estimate_tokens(self.client.format_tweet(tweet))
+            if current and current_tokens + tweet_tokens > max_tokens:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(tweet)
+            current_tokens += tweet_tokens
+
+        if current:
+            chunks.append(current)
+
+        # Explicit chunked mode on a small batch still benefits from fan-out
+        if len(chunks) == 1 and len(tweets) > 1:
+            fan_out = min(settings.analysis_chunk_concurrency, len(tweets))
+            size = -(-len(tweets) // fan_out)
+            chunks = [tweets[i : i + size] for i in range(0, len(tweets), size)]
+
+        return chunks
+
+    async def _analyze_chunk(
+        self,
+        semaphore: asyncio.Semaphore,
+        system_prompt: str,
+        chunk: List[Tweet],
+        index: int,
+        total: int,
+        model: Optional[str] = None,
+    ) -> Optional[str]:
+        """Analyze one chunk; returns None if it failed or timed out."""
+        async with semaphore:
+            chunk_start = time.time()
+            user_prompt = CHUNK_USER_PROMPT.format(
+                index=index,
+                total=total,
+                tweets="\n".join(self.client.format_tweet(tweet) for tweet in chunk),
+            )
+            try:
+                notes = await asyncio.wait_for(
+                    self.client.complete(
+                        system_prompt,
+                        user_prompt,
+                        tweet_count=len(chunk),
+                        max_tokens=settings.analysis_chunk_output_tokens,
+                        max_retries=1,
+                        model=model,
+                    ),
+                    timeout=settings.analysis_chunk_timeout,
+                )
+                logger.info(
+                    "Chunk analysis completed",
+                    chunk=index,
+                    total_chunks=total,
+                    tweet_count=len(chunk),
+                    duration_ms=round((time.time() - chunk_start) * 1000, 2),
+                )
+                return notes
+            except UpstreamUnavailableError:
+                # Fail the whole request fast instead of degrading
+                raise
+            except (asyncio.TimeoutError, ClaudeAPIError) as e:
+                logger.warning(
+                    "Chunk analysis failed, continuing without it",
+                    chunk=index,
+                    total_chunks=total,
+                    tweet_count=len(chunk),
+                    error=str(e) or type(e).__name__,
+                    duration_ms=round((time.time() - chunk_start) * 1000, 2),
+                )
+                return None
+
+    async def analyze(
+        self,
+        tweets: List[Tweet],
+        system_prompt: Optional[str] = None,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+    ) -> AnalysisResult:
+        """
+        Analyze a large batch with concurrent chunk passes and one merge pass.
+
+        Args:
+            tweets: List of tweets to analyze
+            system_prompt: Custom system prompt (optional)
+            model: Model to use (defaults to the client setting)
+            max_tokens: Output token limit of the merge pass
+
+        Returns:
+            AnalysisResult with the merged markdown digest; it is partial
+            (and starts with PARTIAL_NOTICE) if some chunks failed
+
+        Raises:
+            ClaudeAPIError: If every chunk failed
+        """
+        final_system_prompt = system_prompt or self.client.get_default_system_prompt()
+        chunks = self.split_into_chunks(tweets)
+        if len(chunks) == 1:
+            text = await self.client.analyze_tweets(
+                tweets, system_prompt, max_tokens=max_tokens, model=model
+            )
+            return AnalysisResult(text, len(tweets))
+
+        start_time = time.time()
+        semaphore = asyncio.Semaphore(max(1, settings.analysis_chunk_concurrency))
+        tasks = [
+            asyncio.create_task(
+                self._analyze_chunk(
+                    semaphore, final_system_prompt, chunk, index, len(chunks), model
+                )
+            )
+            for index, chunk in enumerate(chunks, start=1)
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # One chunk failed the request (upstream unavailable); stop the
+            # others instead of letting them spend quota on a lost request
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        notes = [(index, text) for index, text in enumerate(results, start=1) if text]
+        failed = len(chunks) - len(notes)
+        analyzed_tweets = sum(
+            len(chunk) for chunk, text in zip(chunks, results) if text
+        )
+        if not notes:
+            raise ClaudeAPIError(f"All {len(chunks)} analysis chunks failed")
+
+        notice = PARTIAL_NOTICE.format(failed=failed, total=len(chunks)) if failed else ""
+
+        # Merge pass (reduce)
+        merge_prompt = MERGE_USER_PROMPT.format(
+            total=len(chunks),
+            notes="\n\n".join(f"## Part {index}\n\n{text}" for index, text in notes),
+        )
+        try:
+            digest = await self.client.complete(
+                final_system_prompt,
+                merge_prompt,
+                tweet_count=len(tweets),
+                max_tokens=max_tokens,
+                max_retries=1,
+                model=model,
+            )
+        except ClaudeAPIError as e:
+            logger.warning(
+                "Merge pass failed, returning concatenated chunk notes",
+                error=e.message,
+                chunk_count=len(chunks),
+            )
+            digest = "\n\n---\n\n".join(text for _, text in notes)
+
+        logger.info(
+            "Chunked analysis completed",
+            tweet_count=len(tweets),
+            chunk_count=len(chunks),
+            failed_chunks=failed,
+            duration_ms=round((time.time() - start_time) * 1000, 2),
+        )
+
+        return AnalysisResult(
+            f"{notice}\n\n{digest}" if notice else digest,
+            analyzed_tweets,
+            failed_chunks=failed,
+            total_chunks=len(chunks),
+        )
+
+
+# Global chunked analyzer instance
+chunked_analyzer = ChunkedAnalyzer(claude_client)
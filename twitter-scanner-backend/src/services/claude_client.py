@@ -1,8 +1,11 @@
 """Claude API client for tweet analysis."""
 
 import asyncio
+import json
 import time
-from typing import List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import httpx
 import sys
 import os
@@ -14,9 +17,85 @@ sys.path.append(
 from core.config import settings
 from core.logging_config import get_logger
 from core.models import Tweet
+from utils.tokens import estimate_tokens
+from services.concurrency_limiter import (
+    AdmissionRejectedError,
+    claude_concurrency_limiter,
+)
+from services.hedging import claude_hedging_policy
+from services.upstream_pool import NoUpstreamAvailableError, UpstreamPool
+from services.retry_policy import (
+    CircuitOpenError,
+    claude_circuit_breaker,
+    claude_retry_policy,
+    parse_retry_after,
+)
 
 logger = get_logger("claude_client")
 
+# Statuses that mean the upstream as a whole is overloaded and shrink the
+# shared concurrency limit. A 429 is specific to the key that got it; the
+# key pool cools that key down instead.
+OVERLOAD_STATUSES = (503, 529)
+
+# Token usage fields reported by the messages API
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+# Upstream token usage accumulated for the current request, see track_usage()
+_request_usage: ContextVar[Optional[Dict[str, int]]] = ContextVar(
+    "request_usage", default=None
+)
+
+
+# Absolute deadline (time.monotonic()) of the current client request, see request_deadline()
+_request_deadline: ContextVar[Optional[float]] = ContextVar(
+    "request_deadline", default=None
+)
+
+
+@contextmanager
+def request_deadline(timeout: Optional[float]):
+    """
+    Bound all Claude calls made in this context by a client deadline.
+
+    Retries that cannot start before the deadline are skipped and each
+    attempt's read timeout is clamped to the time left. Tasks created
+    inside the context inherit the deadline.
+
+    Args:
+        timeout: Seconds from now, or None for no client deadline
+    """
+    deadline_at = time.monotonic() + timeout if timeout else None
+    current = _request_deadline.get()
+    if current is not None and (deadline_at is None or current < deadline_at):
+        deadline_at = current
+    token = _request_deadline.set(deadline_at)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+@contextmanager
+def track_usage():
+    """
+    Accumulate upstream token usage of all Claude calls made in this context.
+
+    Yields:
+        Dict of USAGE_FIELDS totals, filled in as calls complete
+    """
+    usage = {field: 0 for field in USAGE_FIELDS}
+    token = _request_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _request_usage.reset(token)
+
 
 class ClaudeAPIError(Exception):
     """Claude API specific error."""
@@ -33,17 +112,165 @@ class ClaudeAPIError(Exception):
         super().__init__(self.message)
 
 
+class UpstreamUnavailableError(ClaudeAPIError):
+    """Claude API is not accepting calls right now (circuit open or overloaded)."""
+
+    def __init__(self, message: str, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(message, status_code=503)
+
+
 class ClaudeClient:
     """Claude API client with retry mechanism."""
 
-    def __init__(self):
-        self.api_key = settings.claude_api_key
-        self.api_url = settings.claude_api_url
-        self.max_retries = 3
-        self.retry_delay = 2.0  # seconds
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        # Keys/endpoints to balance across; the primary one serves batch calls
+        self.upstream_pool = UpstreamPool.from_settings()
+        self.api_key = self.upstream_pool.primary.api_key
+        self.api_url = self.upstream_pool.primary.api_url
+        self.batches_url = settings.claude_batches_url
+        self.model = settings.claude_model
+        self.max_tokens = settings.claude_max_tokens
+        self.retry_policy = claude_retry_policy
+        self.circuit_breaker = claude_circuit_breaker
+        self.concurrency_limiter = claude_concurrency_limiter
+        self.hedging = claude_hedging_policy
+
+        # Process-wide upstream token usage, including prompt cache reads/writes
+        self.usage_totals: Dict[str, int] = {field: 0 for field in USAGE_FIELDS}
+        self.usage_totals["requests"] = 0
+
+        # Shared connection pool, opened by start() and closed by close()
+        self.transport = transport
+        self.http_client: Optional[httpx.AsyncClient] = None
+
+    def _create_http_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client used for all Claude API calls."""
+        http2 = settings.claude_http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("h2 package not installed, falling back to HTTP/1.1")
+                http2 = False
+
+        return httpx.AsyncClient(
+            http2=http2,
+            transport=self.transport,
+            timeout=httpx.Timeout(
+                connect=settings.claude_connect_timeout,
+                read=settings.claude_read_timeout,
+                write=settings.claude_write_timeout,
+                pool=settings.claude_pool_timeout,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.claude_max_connections,
+                max_keepalive_connections=settings.claude_max_keepalive_connections,
+                keepalive_expiry=settings.claude_keepalive_expiry,
+            ),
+        )
+
+    async def start(self):
+        """Open the shared HTTP client (called on application startup)."""
+        if self.http_client is None or self.http_client.is_closed:
+            self.http_client = self._create_http_client()
+            logger.info(
+                "Claude HTTP client started",
+                http2=settings.claude_http2,
+                max_connections=settings.claude_max_connections,
+                max_keepalive_connections=settings.claude_max_keepalive_connections,
+            )
+
+    async def close(self):
+        """Close the shared HTTP client (called on application shutdown)."""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+            logger.info("Claude HTTP client closed")
+
+    def get_http_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it lazily if start() was not called."""
+        if self.http_client is None or self.http_client.is_closed:
+            self.http_client = self._create_http_client()
+        return self.http_client
+
+    def get_headers(self, api_key: Optional[str] = None) -> Dict[str, str]:
+        """Get the HTTP headers for Claude API requests (primary key by default)."""
+        return {
+            "Content-Type": "application/json",
+            "x-api-key": api_key or self.api_key,
+            "anthropic-version": "2023-06-01",
+            "anthropic-dangerous-direct-browser-access": "true",
+        }
+
+    def build_system_blocks(self, system_prompt: str) -> List[Dict[str, Any]]:
+        """
+        Build the system prompt as content blocks marked for prompt caching.
+
+        The system prompt is the stable prefix of every request (tweets only
+        appear in the user message), so it is the cache breakpoint. Prompts
+        shorter than the model's minimum cacheable length are simply
+        processed without caching.
+        """
+        block: Dict[str, Any] = {"type": "text", "text": system_prompt}
+        if settings.claude_prompt_caching:
+            block["cache_control"] = {"type": "ephemeral"}
+        return [block]
+
+    def build_user_message(self, user_prompt: str) -> Dict[str, Any]:
+        """
+        Build the user message holding the tweets, marked for prompt caching.
+
+        Caching the tweet block lets retries, hedged duplicates and repeated
+        analyses of the same batch read it from the cache after the system
+        prompt, instead of processing it again.
+        """
+        block: Dict[str, Any] = {"type": "text", "text": user_prompt}
+        if settings.claude_prompt_caching:
+            block["cache_control"] = {"type": "ephemeral"}
+        return {"role": "user", "content": [block]}
+
+    def record_usage(self, usage: Dict[str, Any]):
+        """Record token usage reported by the API for one call."""
+        self.usage_totals["requests"] += 1
+        request_usage = _request_usage.get()
+        for field in USAGE_FIELDS:
+            value = usage.get(field) or 0
+            self.usage_totals[field] += value
+            if request_usage is not None:
+                request_usage[field] += value
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get upstream usage statistics."""
+        cacheable_input = (
+            self.usage_totals["cache_read_input_tokens"]
+            + self.usage_totals["cache_creation_input_tokens"]
+            + self.usage_totals["input_tokens"]
+        )
+        return {
+            "circuit_breaker": self.circuit_breaker.get_stats(),
+            "concurrency": self.concurrency_limiter.get_stats(),
+            "upstreams": self.upstream_pool.get_stats(),
+            "hedging": self.hedging.get_stats(),
+            "usage": dict(self.usage_totals),
+            "prompt_cache_read_ratio": (
+                round(
+                    self.usage_totals["cache_read_input_tokens"] / cacheable_input * 100,
+                    2,
+                )
+                if cacheable_input
+                else 0
+            ),
+        }
 
-        if not self.api_key:
-            raise ValueError("CLAUDE_API_KEY environment variable is not set")
+    def get_model_params(
+        self, model: Optional[str] = None, max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Get the model parameters for a request (client defaults unless routed)."""
+        return {
+            "model": model or self.model,
+            "max_tokens": max_tokens or self.max_tokens,
+        }
 
     def get_default_system_prompt(self) -> str:
         """Get the default system prompt for tweet analysis."""
@@ -80,8 +307,22 @@ Example format:
 
 Provide a comprehensive analysis with proper markdown formatting, including clickable links to authors and original tweets."""
 
+    @staticmethod
+    def format_tweet(tweet: Tweet) -> str:
+        """Format a single tweet for the analysis prompt (one header line, then content)."""
+        return f"Author: {tweet.author} | Time: {tweet.timestamp} | URL: {tweet.url or 'N/A'}\n{tweet.content}\n---"
+
+    def build_user_prompt(self, tweets: List[Tweet]) -> str:
+        """Build the user prompt containing all tweets."""
+        tweet_texts = [self.format_tweet(tweet) for tweet in tweets]
+        return f"Please analyze the following tweets and provide a curated summary of the most valuable insights:\n\n{chr(10).join(tweet_texts)}"
+
     async def analyze_tweets(
-        self, tweets: List[Tweet], system_prompt: Optional[str] = None
+        self,
+        tweets: List[Tweet],
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        model: Optional[str] = None,
     ) -> str:
         """
         Analyze tweets using Claude API with retry mechanism.
@@ -89,6 +330,8 @@ Provide a comprehensive analysis with proper markdown formatting, including clic
         Args:
             tweets: List of tweets to analyze
             system_prompt: Custom system prompt (optional)
+            max_tokens: Output token limit (defaults to the client setting)
+            model: Model to use (defaults to the client setting)
 
         Returns:
             Analysis result from Claude
@@ -98,194 +341,689 @@ Provide a comprehensive analysis with proper markdown formatting, including clic
         """
         final_system_prompt = system_prompt or self.get_default_system_prompt()
 
-        # Format tweets for analysis
-        tweet_texts = []
-        for tweet in tweets:
-            tweet_text = f"Author: {tweet.author}\nContent: {tweet.content}\nTime: {tweet.timestamp}\nURL: {tweet.url or 'N/A'}\n---"
-            tweet_texts.append(tweet_text)
-
-        user_prompt = f"Please analyze the following tweets and provide a curated summary of the most valuable insights:\n\n{chr(10).join(tweet_texts)}"
-
-        request_body = {
-            "model": "claude-sonnet-4-20250514",
-            "max_tokens": 4000,
-            "system": final_system_prompt,
-            "messages": [{"role": "user", "content": user_prompt}],
-        }
+        return await self.complete(
+            final_system_prompt,
+            self.build_user_prompt(tweets),
+            tweet_count=len(tweets),
+            max_tokens=max_tokens,
+            model=model,
+        )
 
-        # Retry mechanism
-        for attempt in range(1, self.max_retries + 2):
-            try:
-                logger.info(
-                    "开始调用Claude API",
-                    attempt=attempt,
-                    max_retries=self.max_retries + 1,
-                    tweet_count=len(tweets),
-                )
+    async def complete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        tweet_count: int = 0,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        model: Optional[str] = None,
+    ) -> str:
+        """
+        Send a single-turn message to Claude API and return the text reply.
 
-                api_call_start = time.time()
-
-                async with httpx.AsyncClient(timeout=60.0) as client:
-                    response = await client.post(
-                        self.api_url,
-                        headers={
-                            "Content-Type": "application/json",
-                            "x-api-key": self.api_key,
-                            "anthropic-version": "2023-06-01",
-                            "anthropic-dangerous-direct-browser-access": "true",
-                        },
-                        json=request_body,
-                    )
+        Args:
+            system_prompt: System prompt
+            user_prompt: User message content
+            tweet_count: Number of tweets in the prompt (for logging)
+            max_tokens: Output token limit (defaults to the client setting)
+            timeout: Read timeout in seconds (defaults to the pool setting)
+            max_retries: Retry budget (defaults to the retry policy)
+            model: Model to use (defaults to the client setting)
 
-                api_call_duration = time.time() - api_call_start
+        Returns:
+            Text of the first content block
 
-                if not response.is_success:
-                    error_text = response.text
-                    error_data = {}
-                    try:
-                        error_data = response.json()
-                    except Exception:
-                        pass
-
-                    error_message = f"API request failed: {response.status_code} - {error_data.get('error', {}).get('message', error_text or 'Unknown error')}"
-
-                    # Check if this is a retryable error (429, 529, or 5xx)
-                    is_retryable_error = (
-                        response.status_code == 429
-                        or response.status_code == 529
-                        or response.status_code >= 500
-                    )
+        Raises:
+            ClaudeAPIError: If API call fails after retries
+        """
+        request_body = {
+            **self.get_model_params(model, max_tokens),
+            "system": self.build_system_blocks(system_prompt),
+            "messages": [self.build_user_message(user_prompt)],
+        }
+        read_timeout = timeout or self.get_read_timeout(tweet_count)
+        retry_state = self._start_retry_state(max_retries)
+        estimated_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
 
-                    if is_retryable_error and attempt < self.max_retries + 1:
-                        logger.warning(
-                            "API call failed, preparing to retry",
-                            status=response.status_code,
-                            attempt=attempt,
-                            retry_delay=self.retry_delay,
-                        )
-                        await asyncio.sleep(self.retry_delay)
-                        continue  # Try again
-                    else:
-                        logger.error(
-                            "API call failed, not retrying",
-                            status=response.status_code,
-                            attempt=attempt,
-                            error=error_message,
-                        )
-                        raise ClaudeAPIError(
-                            error_message, response.status_code, attempt
-                        )
+        while True:
+            self._check_circuit()
+            attempt = retry_state.next_attempt()
+            retry_after = None
+            status_code = None
 
-                data = response.json()
+            logger.info(
+                "开始调用Claude API",
+                attempt=attempt,
+                max_attempts=retry_state.max_attempts,
+                tweet_count=tweet_count,
+            )
 
-                # 成功响应日志
-                logger.info(
-                    "Claude API调用成功",
-                    attempt=attempt,
-                    duration_ms=round(api_call_duration * 1000, 2),
-                    response_length=(
-                        len(data.get("content", [{}])[0].get("text", ""))
-                        if data.get("content")
-                        else 0
-                    ),
+            api_call_start = time.time()
+            try:
+                response = await self._post_hedged(
+                    request_body,
+                    self._build_timeout(read_timeout, retry_state),
+                    retry_state.remaining_time(),
+                    estimated_tokens,
                 )
 
-                if (
-                    data.get("content")
-                    and data["content"][0]
-                    and data["content"][0].get("text")
-                ):
-                    return data["content"][0]["text"]
-                else:
-                    logger.error("Claude API returned invalid format")
-                    raise ClaudeAPIError("Invalid response format from Claude API")
+            except NoUpstreamAvailableError as e:
+                raise self._no_upstream_available(e)
+
+            except AdmissionRejectedError as e:
+                raise self._admission_rejected(e)
 
             except httpx.TimeoutException as e:
-                timeout_duration = time.time() - api_call_start
+                self.circuit_breaker.record_failure()
+                error_message = "API request timeout"
                 logger.error(
                     "Claude API超时",
                     attempt=attempt,
-                    timeout_duration_ms=round(timeout_duration * 1000, 2),
-                    tweet_count=len(tweets),
-                    timeout_setting=60.0,
+                    timeout_duration_ms=round((time.time() - api_call_start) * 1000, 2),
+                    tweet_count=tweet_count,
+                    timeout_setting=read_timeout,
                     error_detail=str(e),
                 )
-                if attempt == self.max_retries + 1:
-                    logger.error(
-                        "Claude API超时 - 最终失败",
-                        total_attempts=self.max_retries + 1,
-                        final_timeout_duration_ms=round(timeout_duration * 1000, 2),
-                    )
-                    raise ClaudeAPIError(
-                        f"API request timeout after {self.max_retries + 1} attempts"
-                    )
-
-                logger.info(
-                    "Claude API超时 - 准备重试",
-                    attempt=attempt,
-                    remaining_attempts=self.max_retries + 1 - attempt,
-                    retry_delay_seconds=self.retry_delay,
-                )
-                await asyncio.sleep(self.retry_delay)
 
             except httpx.RequestError as e:
-                network_error_duration = time.time() - api_call_start
+                self.circuit_breaker.record_failure()
+                error_message = f"Network error: {str(e)}"
                 logger.error(
                     "Claude API network error",
                     attempt=attempt,
                     error=str(e),
                     error_type=type(e).__name__,
-                    error_duration_ms=round(network_error_duration * 1000, 2),
-                    api_url=self.api_url,
+                    error_duration_ms=round((time.time() - api_call_start) * 1000, 2),
                 )
-                if attempt == self.max_retries + 1:
+
+            else:
+                api_call_duration = time.time() - api_call_start
+                status_code = response.status_code
+
+                if response.is_success:
+                    self.circuit_breaker.record_success()
+                    return self._parse_message_response(
+                        response, attempt, api_call_duration
+                    )
+
+                error_message = self._format_error_message(response)
+                if not self._is_retryable_status(status_code):
+                    # Upstream is healthy, it rejected this particular request
+                    self.circuit_breaker.record_success()
                     logger.error(
-                        "Claude API网络错误 - 最终失败",
-                        total_attempts=self.max_retries + 1,
-                        final_error=str(e),
-                        error_type=type(e).__name__,
+                        "API call failed, not retrying",
+                        status=status_code,
+                        attempt=attempt,
+                        error=error_message,
+                    )
+                    raise ClaudeAPIError(error_message, status_code, attempt)
+
+                if status_code == 429:
+                    self.circuit_breaker.record_success()
+                    # The throttled key is ejected; retry at once on another key
+                    retry_after = self.upstream_pool.time_until_available(estimated_tokens)
+                else:
+                    self.circuit_breaker.record_failure()
+                    retry_after = parse_retry_after(response.headers)
+                logger.warning(
+                    "API call failed with retryable status",
+                    status=status_code,
+                    attempt=attempt,
+                    retry_after=retry_after,
+                )
+
+            delay = retry_state.next_delay(retry_after)
+            if delay is None:
+                logger.error(
+                    "Claude API调用失败 - 最终失败",
+                    total_attempts=attempt,
+                    status=status_code,
+                    final_error=error_message,
+                    remaining_time_s=round(retry_state.remaining_time(), 2),
+                )
+                raise ClaudeAPIError(
+                    f"{error_message} (after {attempt} attempts)", status_code, attempt
+                )
+
+            logger.info(
+                "Claude API调用失败 - 准备重试",
+                attempt=attempt,
+                remaining_attempts=retry_state.max_attempts - attempt,
+                retry_delay_seconds=round(delay, 2),
+            )
+            await asyncio.sleep(delay)
+
+    async def _post_message(
+        self,
+        request_body: Dict[str, Any],
+        timeout: httpx.Timeout,
+        queue_timeout: float,
+        estimated_tokens: int,
+    ) -> httpx.Response:
+        """Send one messages API request through the key pool and concurrency limiter."""
+        # Queue for a slot before picking an endpoint, so the endpoint's
+        # budgets and in-flight count only cover calls that are actually sent
+        async with self.concurrency_limiter.acquire(timeout=queue_timeout) as slot:
+            with self.upstream_pool.lease(estimated_tokens) as lease:
+                started_at = time.monotonic()
+                try:
+                    response = await self.get_http_client().post(
+                        lease.endpoint.api_url,
+                        headers=self.get_headers(lease.endpoint.api_key),
+                        json=request_body,
+                        timeout=timeout,
+                    )
+                except httpx.TimeoutException:
+                    slot.record_overload()
+                    lease.record_failure("timeout")
+                    raise
+                except httpx.RequestError:
+                    lease.record_failure("network_error")
+                    raise
+                if response.status_code in OVERLOAD_STATUSES:
+                    slot.record_overload()
+                elif response.is_success:
+                    slot.record_success(self._output_tokens(response))
+                lease.record_response(
+                    response.status_code,
+                    response.headers,
+                    parse_retry_after(response.headers),
+                )
+                if response.is_success:
+                    self.hedging.latency.record(time.monotonic() - started_at)
+                return response
+
+    async def _post_hedged(
+        self,
+        request_body: Dict[str, Any],
+        timeout: httpx.Timeout,
+        queue_timeout: float,
+        estimated_tokens: int,
+    ) -> httpx.Response:
+        """
+        Send a request, hedging it with an identical second one if it stalls.
+
+        The first successful response wins and the other request is
+        cancelled; if both fail, the primary's outcome is returned.
+        """
+        hedge_delay = self.hedging.hedge_delay()
+        if hedge_delay is None:
+            return await self._post_message(
+                request_body, timeout, queue_timeout, estimated_tokens
+            )
+
+        primary_started_at = time.monotonic()
+        primary = asyncio.ensure_future(
+            self._post_message(request_body, timeout, queue_timeout, estimated_tokens)
+        )
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+            overloaded = (
+                self.circuit_breaker.state != self.circuit_breaker.CLOSED
+                or bool(self.concurrency_limiter.waiters)
+            )
+            if done or not self.hedging.allow_hedge(overloaded):
+                return await primary
+
+            logger.info(
+                "Primary request slow, sending hedged request",
+                hedge_delay_ms=round(hedge_delay * 1000, 2),
+            )
+            hedge = asyncio.ensure_future(
+                self._post_message(request_body, timeout, queue_timeout, estimated_tokens)
+            )
+            tasks.append(hedge)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None and task.result().is_success:
+                        if task is hedge:
+                            self.hedging.record_hedge_win(primary_started_at)
+                        return task.result()
+            return await primary
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                # Losing requests' errors are expected; mark them retrieved
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def _check_circuit(self):
+        """Fail fast while the upstream circuit is open."""
+        try:
+            self.circuit_breaker.before_call()
+        except CircuitOpenError as e:
+            raise UpstreamUnavailableError(
+                "Claude API is temporarily unavailable", retry_after=e.retry_after
+            )
+
+    @staticmethod
+    def _no_upstream_available(error: NoUpstreamAvailableError) -> UpstreamUnavailableError:
+        """Translate an exhausted key pool into a 503-style error."""
+        logger.warning(
+            "No Claude API key available, all ejected or out of budget",
+            retry_after=error.retry_after,
+        )
+        return UpstreamUnavailableError(
+            "Claude API rate limit reached, please retry later",
+            retry_after=error.retry_after,
+        )
+
+    @staticmethod
+    def _admission_rejected(error: AdmissionRejectedError) -> UpstreamUnavailableError:
+        """Translate a concurrency limiter rejection into a 503-style error."""
+        logger.warning(
+            "Claude API call rejected by concurrency limiter",
+            reason=error.reason,
+            retry_after=error.retry_after,
+        )
+        return UpstreamUnavailableError(
+            "Server is busy, please retry later", retry_after=error.retry_after
+        )
+
+    @staticmethod
+    def _is_retryable_status(status_code: int) -> bool:
+        """Rate limits (429), overload (529) and server errors are retryable."""
+        return status_code == 429 or status_code == 529 or status_code >= 500
+
+    @staticmethod
+    def get_read_timeout(tweet_count: int) -> float:
+        """Read timeout sized from the batch, capped at CLAUDE_READ_TIMEOUT."""
+        if not tweet_count:
+            return settings.claude_read_timeout
+        return min(
+            settings.claude_read_timeout,
+            settings.claude_read_timeout_base
+            + settings.claude_read_timeout_per_tweet * tweet_count,
+        )
+
+    def _start_retry_state(self, max_retries: Optional[int] = None):
+        """Start retry tracking, bounded by the client deadline if one is set."""
+        deadline = None
+        deadline_at = _request_deadline.get()
+        if deadline_at is not None:
+            deadline = min(
+                self.retry_policy.deadline, max(0.0, deadline_at - time.monotonic())
+            )
+        return self.retry_policy.start(max_retries=max_retries, deadline=deadline)
+
+    @staticmethod
+    def _build_timeout(read_timeout: float, retry_state) -> httpx.Timeout:
+        """Per-attempt timeout that never outlives the request deadline."""
+        return httpx.Timeout(
+            connect=settings.claude_connect_timeout,
+            read=max(1.0, min(read_timeout, retry_state.remaining_time())),
+            write=settings.claude_write_timeout,
+            pool=settings.claude_pool_timeout,
+        )
+
+    @staticmethod
+    def _output_tokens(response: httpx.Response) -> int:
+        """Output token count of a successful messages response (0 if unknown)."""
+        try:
+            return int(response.json().get("usage", {}).get("output_tokens", 0))
+        except (ValueError, TypeError, AttributeError):
+            return 0
+
+    @staticmethod
+    def _format_error_message(response: httpx.Response) -> str:
+        """Build an error message from a failed API response."""
+        error_data = {}
+        try:
+            error_data = response.json()
+        except Exception:
+            pass
+        detail = (
+            error_data.get("error", {}).get("message")
+            if isinstance(error_data, dict)
+            else None
+        )
+        return f"API request failed: {response.status_code} - {detail or response.text or 'Unknown error'}"
+
+    def _parse_message_response(
+        self, response: httpx.Response, attempt: int, api_call_duration: float
+    ) -> str:
+        """Extract the text reply from a successful response (never retried)."""
+        try:
+            data = response.json()
+        except ValueError:
+            logger.error("Claude API returned invalid JSON", attempt=attempt)
+            raise ClaudeAPIError(
+                "Invalid JSON response from Claude API", response.status_code, attempt
+            )
+
+        usage = data.get("usage") or {}
+        self.record_usage(usage)
+
+        # 成功响应日志
+        logger.info(
+            "Claude API调用成功",
+            attempt=attempt,
+            duration_ms=round(api_call_duration * 1000, 2),
+            response_length=(
+                len(data.get("content", [{}])[0].get("text", ""))
+                if data.get("content")
+                else 0
+            ),
+            input_tokens=usage.get("input_tokens"),
+            output_tokens=usage.get("output_tokens"),
+            cache_read_tokens=usage.get("cache_read_input_tokens"),
+            cache_write_tokens=usage.get("cache_creation_input_tokens"),
+        )
+
+        if data.get("content") and data["content"][0] and data["content"][0].get("text"):
+            return data["content"][0]["text"]
+
+        logger.error("Claude API returned invalid format")
+        raise ClaudeAPIError("Invalid response format from Claude API", attempt=attempt)
+
+    @staticmethod
+    async def _iter_sse_events(
+        response: httpx.Response,
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Parse a server-sent event stream into (event, data) pairs.
+
+        Raises:
+            ClaudeAPIError: If an event's data is not valid JSON (handled
+                like an error event in the stream)
+        """
+        event_type = "message"
+        data_lines: List[str] = []
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event_type = line[len("event:") :].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[len("data:") :].strip())
+            elif not line and data_lines:
+                data = "\n".join(data_lines)
+                try:
+                    payload = json.loads(data)
+                except json.JSONDecodeError as e:
+                    logger.error(
+                        "Claude stream sent invalid event data",
+                        event_type=event_type,
+                        error=str(e),
+                        data=data[:200],
                     )
                     raise ClaudeAPIError(
-                        f"Network error after {self.max_retries + 1} attempts: {str(e)}"
+                        f"Stream error: invalid {event_type} event data"
                     )
+                yield event_type, payload
+                event_type, data_lines = "message", []
+
+    async def _relay_stream(
+        self, response: httpx.Response, attempt: int, api_call_start: float
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Translate a successful messages stream into text and done events."""
+        usage: Dict[str, Any] = {}
+        stop_reason = None
+        first_token = True
+        async for event_type, data in self._iter_sse_events(response):
+            if event_type == "message_start":
+                usage.update(data.get("message", {}).get("usage", {}))
+            elif event_type == "content_block_delta":
+                delta = data.get("delta", {})
+                if delta.get("type") == "text_delta" and delta.get("text"):
+                    if first_token:
+                        first_token = False
+                        logger.info(
+                            "Claude流式API首个token",
+                            attempt=attempt,
+                            time_to_first_token_ms=round(
+                                (time.time() - api_call_start) * 1000, 2
+                            ),
+                        )
+                    yield {"type": "text", "text": delta["text"]}
+            elif event_type == "message_delta":
+                usage.update(data.get("usage", {}))
+                stop_reason = data.get("delta", {}).get("stop_reason")
+            elif event_type == "error":
+                error = data.get("error", {})
+                raise ClaudeAPIError(
+                    f"Stream error: {error.get('type', 'unknown')} - {error.get('message', '')}",
+                    attempt=attempt,
+                )
+
+        self.record_usage(usage)
+        logger.info(
+            "Claude流式API调用成功",
+            attempt=attempt,
+            duration_ms=round((time.time() - api_call_start) * 1000, 2),
+            stop_reason=stop_reason,
+            usage=usage,
+        )
+        yield {"type": "done", "usage": usage, "stop_reason": stop_reason}
 
+    async def stream_tweets_analysis(
+        self,
+        tweets: List[Tweet],
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyze tweets using Claude API streaming.
+
+        Failures before the first byte of the stream are retried like
+        complete(); once text has started flowing errors are raised as-is.
+
+        Args:
+            tweets: List of tweets to analyze
+            system_prompt: Custom system prompt (optional)
+            max_tokens: Output token limit (defaults to the client setting)
+            model: Model to use (defaults to the client setting)
+
+        Yields:
+            {"type": "text", "text": ...} for each text delta, then a final
+            {"type": "done", "usage": {...}, "stop_reason": ...}
+
+        Raises:
+            ClaudeAPIError: If the API call or the stream fails
+        """
+        request_body = {
+            **self.get_model_params(model, max_tokens),
+            "system": self.build_system_blocks(
+                system_prompt or self.get_default_system_prompt()
+            ),
+            "messages": [self.build_user_message(self.build_user_prompt(tweets))],
+            "stream": True,
+        }
+
+        read_timeout = self.get_read_timeout(len(tweets))
+        retry_state = self._start_retry_state()
+        estimated_tokens = estimate_tokens(
+            request_body["system"][0]["text"]
+        ) + estimate_tokens(request_body["messages"][0]["content"][0]["text"])
+
+        while True:
+            self._check_circuit()
+            attempt = retry_state.next_attempt()
+            api_call_start = time.time()
+            started = False
+            retry_after = None
+            status_code = None
+            error_message = None
+            try:
                 logger.info(
-                    "Claude API网络错误 - 准备重试",
+                    "开始调用Claude流式API",
                     attempt=attempt,
-                    remaining_attempts=self.max_retries + 1 - attempt,
-                    retry_delay_seconds=self.retry_delay,
-                    error_type=type(e).__name__,
+                    max_attempts=retry_state.max_attempts,
+                    tweet_count=len(tweets),
                 )
-                await asyncio.sleep(self.retry_delay)
 
-            except Exception as e:
-                unknown_error_duration = time.time() - api_call_start
+                client = self.get_http_client()
+                async with self.concurrency_limiter.acquire(
+                    timeout=retry_state.remaining_time()
+                ) as slot:
+                    with self.upstream_pool.lease(estimated_tokens) as lease:
+                        try:
+                            async with client.stream(
+                                "POST",
+                                lease.endpoint.api_url,
+                                headers=self.get_headers(lease.endpoint.api_key),
+                                json=request_body,
+                                timeout=self._build_timeout(read_timeout, retry_state),
+                            ) as response:
+                                lease.record_response(
+                                    response.status_code,
+                                    response.headers,
+                                    parse_retry_after(response.headers),
+                                )
+                                if not response.is_success:
+                                    if response.status_code in OVERLOAD_STATUSES:
+                                        slot.record_overload()
+                                    await response.aread()
+                                    retry_after = parse_retry_after(response.headers)
+                                    status_code = response.status_code
+                                    error_message = self._format_error_message(response)
+                                else:
+                                    self.circuit_breaker.record_success()
+                                    async for event in self._relay_stream(
+                                        response, attempt, api_call_start
+                                    ):
+                                        started = True
+                                        if event["type"] == "done":
+                                            slot.record_success(
+                                                event["usage"].get("output_tokens", 0)
+                                            )
+                                        yield event
+                                    return
+                        except httpx.TimeoutException:
+                            slot.record_overload()
+                            lease.record_failure("timeout")
+                            raise
+                        except httpx.RequestError:
+                            lease.record_failure("network_error")
+                            raise
+
+            except NoUpstreamAvailableError as e:
+                raise self._no_upstream_available(e)
+
+            except AdmissionRejectedError as e:
+                raise self._admission_rejected(e)
+
+            except (httpx.TimeoutException, httpx.RequestError) as e:
+                self.circuit_breaker.record_failure()
                 logger.error(
-                    "Claude API unknown error",
+                    "Claude streaming API network error",
                     attempt=attempt,
                     error=str(e),
                     error_type=type(e).__name__,
-                    error_duration_ms=round(unknown_error_duration * 1000, 2),
+                    started=started,
+                    error_duration_ms=round((time.time() - api_call_start) * 1000, 2),
                 )
-                if attempt == self.max_retries + 1:
-                    logger.error(
-                        "Claude API未知错误 - 最终失败",
-                        total_attempts=self.max_retries + 1,
-                        final_error=str(e),
-                        error_type=type(e).__name__,
-                    )
+                delay = None if started else retry_state.next_delay()
+                if delay is None:
                     raise ClaudeAPIError(
-                        f"Unexpected error after {self.max_retries + 1} attempts: {str(e)}"
+                        f"Streaming request failed: {type(e).__name__}", attempt=attempt
                     )
 
-                logger.info(
-                    "Claude API未知错误 - 准备重试",
+            else:
+                # Error response: decide outside the slot, lease and
+                # response, so the backoff does not hold any of them
+                if not self._is_retryable_status(status_code):
+                    self.circuit_breaker.record_success()
+                    raise ClaudeAPIError(error_message, status_code, attempt)
+                if status_code == 429:
+                    self.circuit_breaker.record_success()
+                    retry_after = self.upstream_pool.time_until_available(estimated_tokens)
+                else:
+                    self.circuit_breaker.record_failure()
+                delay = retry_state.next_delay(retry_after)
+                if delay is None:
+                    raise ClaudeAPIError(error_message, status_code, attempt)
+                logger.warning(
+                    "Streaming API call failed, preparing to retry",
+                    status=status_code,
                     attempt=attempt,
-                    remaining_attempts=self.max_retries + 1 - attempt,
-                    retry_delay_seconds=self.retry_delay,
-                    error_type=type(e).__name__,
+                    retry_delay=round(delay, 2),
                 )
-                await asyncio.sleep(self.retry_delay)
 
-        # This should never be reached, but just in case
-        raise ClaudeAPIError("Maximum retries exceeded")
+            await asyncio.sleep(delay)
+
+    def build_batch_request(
+        self,
+        custom_id: str,
+        tweets: List[Tweet],
+        system_prompt: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        model: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Build one Message Batches request entry for a tweet analysis."""
+        params = {
+            **self.get_model_params(model, max_tokens),
+            "system": self.build_system_blocks(
+                system_prompt or self.get_default_system_prompt()
+            ),
+            "messages": [self.build_user_message(self.build_user_prompt(tweets))],
+        }
+        return {"custom_id": custom_id, "params": params}
+
+    async def _batches_call(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Call the Message Batches API, raising ClaudeAPIError on failure."""
+        try:
+            response = await self.get_http_client().request(
+                method, url, headers=self.get_headers(), **kwargs
+            )
+        except (httpx.TimeoutException, httpx.RequestError) as e:
+            raise ClaudeAPIError(f"Batch request failed: {type(e).__name__}")
+        if not response.is_success:
+            raise ClaudeAPIError(
+                self._format_error_message(response), response.status_code
+            )
+        return response
+
+    async def create_message_batch(self, requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Submit analyses as one Message Batches job.
+
+        Args:
+            requests: Entries built with build_batch_request
+
+        Returns:
+            Batch object (id, processing_status, ...)
+
+        Raises:
+            ClaudeAPIError: If the submission failed
+        """
+        response = await self._batches_call(
+            "POST", self.batches_url, json={"requests": requests}
+        )
+        batch = response.json()
+        logger.info(
+            "Message batch created", batch_id=batch.get("id"), request_count=len(requests)
+        )
+        return batch
+
+    async def get_message_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Get the current state of a message batch."""
+        response = await self._batches_call("GET", f"{self.batches_url}/{batch_id}")
+        return response.json()
+
+    async def get_message_batch_results(self, batch: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Download the results of an ended batch.
+
+        Succeeded entries have their token usage recorded like regular calls.
+
+        Returns:
+            One {"custom_id": ..., "result": {...}} entry per request
+        """
+        results_url = batch.get("results_url") or f"{self.batches_url}/{batch['id']}/results"
+        response = await self._batches_call("GET", results_url)
+        results = [json.loads(line) for line in response.text.splitlines() if line.strip()]
+        for entry in results:
+            result = entry.get("result") or {}
+            if result.get("type") == "succeeded":
+                self.record_usage(result.get("message", {}).get("usage") or {})
+        return results
+
+
+# Global Claude client instance
+claude_client = ClaudeClient()
@@ -0,0 +1,250 @@
+"""Adaptive (AIMD) concurrency limiter for upstream API calls."""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+import sys
+import os
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("concurrency_limiter")
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a call cannot be admitted (queue full or queue timeout)."""
+
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Upstream admission rejected ({reason})")
+
+
+def size_bucket(output_tokens: int) -> int:
+    """Latency bucket of a call: output tokens rounded up to a power of two."""
+    return max(0, output_tokens - 1).bit_length()
+
+
+class LimiterSlot:
+    """Handle for one admitted call, used to report its outcome."""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.overloaded = False
+        self.output_tokens: Optional[int] = None
+        self.finished_at: Optional[float] = None
+
+    def record_overload(self):
+        """Report a 529/503 or timeout from the upstream."""
+        self.overloaded = True
+
+    def record_success(self, output_tokens: int):
+        """Report a completed call; only these are used as latency samples."""
+        self.output_tokens = output_tokens
+        self.finished_at = time.monotonic()
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Admission control with an AIMD-adjusted concurrency limit.
+
+    The limit grows by 1/limit per healthy call and is multiplied by
+    backoff_ratio when the upstream signals overload (529/503, timeouts)
+    or latency rises well above its moving baseline. Call latency grows
+    with the output, so baselines are kept per output size bucket and a
+    call is only compared with calls of similar size. Failed or cancelled
+    calls carry no latency signal and leave the limit and baselines
+    alone. Calls beyond the limit wait in a bounded FIFO queue.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        max_queue_size: int = 50,
+        queue_timeout: float = 30.0,
+        latency_tolerance: float = 3.0,
+        backoff_ratio: float = 0.5,
+        decrease_cooldown: float = 1.0,
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue_size = max_queue_size
+        self.queue_timeout = queue_timeout
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.decrease_cooldown = decrease_cooldown
+
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.baseline_latency: Optional[float] = None  # EWMA of healthy latencies
+        self.bucket_baselines: Dict[int, float] = {}  # same, per size_bucket
+        self.last_decrease = 0.0
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_queue_timeout = 0
+
+    def _retry_after(self) -> float:
+        """Estimate when capacity should be available again."""
+        latency = self.baseline_latency or 10.0
+        return max(1.0, math.ceil(latency * (len(self.waiters) / max(self.limit, 1) + 1)))
+
+    def _wake_waiters(self):
+        """Hand free slots to queued callers in FIFO order."""
+        while self.waiters and self.in_flight < int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def _acquire(self, timeout: Optional[float]):
+        """Take a slot, waiting in the queue if necessary."""
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            return
+
+        if len(self.waiters) >= self.max_queue_size:
+            self.rejected_queue_full += 1
+            raise AdmissionRejectedError("queue_full", self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.queued += 1
+        wait_timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        try:
+            done, _ = await asyncio.wait({waiter}, timeout=wait_timeout)
+        except BaseException:
+            # Cancelled while queued: give back a slot we may have been handed
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+        if not done:
+            waiter.cancel()
+            self.rejected_queue_timeout += 1
+            raise AdmissionRejectedError("queue_timeout", self._retry_after())
+
+    def _release(self):
+        """Return a slot and admit the next waiter."""
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _on_sample(self, slot: LimiterSlot):
+        """Adjust the limit from one finished call (AIMD)."""
+        latency = (slot.finished_at or time.monotonic()) - slot.started_at
+        if slot.overloaded:
+            self._decrease(slot, latency)
+            return
+        if slot.output_tokens is None:
+            # Failed, cancelled or rejected: says nothing about congestion
+            return
+
+        bucket = size_bucket(slot.output_tokens)
+        baseline = self.bucket_baselines.get(bucket)
+        if baseline is not None and latency > baseline * self.latency_tolerance:
+            self._decrease(slot, latency)
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            self._wake_waiters()
+
+        self.bucket_baselines[bucket] = (
+            latency if baseline is None else baseline * 0.9 + latency * 0.1
+        )
+        self.baseline_latency = (
+            latency
+            if self.baseline_latency is None
+            else self.baseline_latency * 0.9 + latency * 0.1
+        )
+
+    def _decrease(self, slot: LimiterSlot, latency: float):
+        """Multiplicative decrease, at most once per cooldown."""
+        now = time.monotonic()
+        if now - self.last_decrease < self.decrease_cooldown:
+            return
+        previous = self.limit
+        self.limit = max(float(self.min_limit), self.limit * self.backoff_ratio)
+        self.last_decrease = now
+        logger.warning(
+            "Upstream concurrency limit decreased",
+            limiter=self.name,
+            previous_limit=round(previous, 2),
+            new_limit=round(self.limit, 2),
+            overloaded=slot.overloaded,
+            latency_ms=round(latency * 1000, 2),
+            output_tokens=slot.output_tokens,
+        )
+
+    @asynccontextmanager
+    async def acquire(self, timeout: Optional[float] = None):
+        """
+        Admit one upstream call.
+
+        Args:
+            timeout: Maximum time to wait in the queue (capped by queue_timeout)
+
+        Yields:
+            LimiterSlot to report the outcome on (record_success with the
+            output size, or record_overload)
+
+        Raises:
+            AdmissionRejectedError: If the queue is full or the wait timed out
+        """
+        await self._acquire(timeout)
+        self.admitted += 1
+        slot = LimiterSlot()
+        try:
+            yield slot
+        finally:
+            self._on_sample(slot)
+            self._release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter statistics for monitoring."""
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": len(self.waiters),
+            "max_queue_size": self.max_queue_size,
+            "baseline_latency_ms": (
+                round(self.baseline_latency * 1000, 2) if self.baseline_latency else None
+            ),
+            "baseline_latency_ms_by_output_tokens": {
+                f"<={2 ** bucket}": round(latency * 1000, 2)
+                for bucket, latency in sorted(self.bucket_baselines.items())
+            },
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_queue_timeout": self.rejected_queue_timeout,
+        }
+
+
+# Global limiter for Claude API calls
+claude_concurrency_limiter = AdaptiveConcurrencyLimiter(
+    "claude_api",
+    initial_limit=settings.upstream_concurrency_initial,
+    min_limit=settings.upstream_concurrency_min,
+    max_limit=settings.upstream_concurrency_max,
+    max_queue_size=settings.upstream_queue_size,
+    queue_timeout=settings.upstream_queue_timeout,
+    latency_tolerance=settings.upstream_latency_tolerance,
+)
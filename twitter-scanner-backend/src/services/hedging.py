@@ -0,0 +1,164 @@
+"""Hedged requests: latency tracking and a global hedge budget."""
+
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import sys
+import os
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("hedging")
+
+
+class LatencyTracker:
+    """Rolling window of recent upstream latencies."""
+
+    def __init__(self, window_size: int = 500):
+        self.samples: Deque[float] = deque(maxlen=window_size)
+
+    def record(self, latency: float):
+        """Record the latency (seconds) of one successful call."""
+        self.samples.append(latency)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Latency at the given percentile (0-100), or None without samples."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(percentile / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def expected_latency_beyond(self, elapsed: float) -> Optional[float]:
+        """Mean latency of past calls that took longer than elapsed."""
+        tail = [latency for latency in self.samples if latency > elapsed]
+        return sum(tail) / len(tail) if tail else None
+
+
+class HedgeBudget:
+    """Token bucket allowing hedges for at most `ratio` of requests."""
+
+    def __init__(self, ratio: float, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = 0.0
+
+    def on_request(self):
+        """Earn budget for one primary request."""
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Spend budget for one hedge if available."""
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class HedgingPolicy:
+    """
+    Decide when to send a second, identical upstream request.
+
+    A hedge is sent when the primary has not responded after the tracked
+    latency percentile, the budget allows it, and the upstream shows no
+    sign of overload (circuit closed, no admission queue).
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        percentile: float,
+        budget_ratio: float,
+        min_delay: float,
+        min_samples: int,
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.latency = LatencyTracker()
+        self.budget = HedgeBudget(budget_ratio)
+
+        self.requests = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+        self.hedges_denied = 0
+        self.latency_saved = 0.0
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Register a primary request and get the delay before hedging it.
+
+        Returns:
+            Seconds to wait for the primary, or None if hedging is off or
+            there are not enough latency samples yet
+        """
+        if not self.enabled:
+            return None
+        self.requests += 1
+        self.budget.on_request()
+        if len(self.latency.samples) < self.min_samples:
+            return None
+        return max(self.min_delay, self.latency.percentile(self.percentile))
+
+    def allow_hedge(self, overloaded: bool) -> bool:
+        """Check overload signals and spend budget for one hedge."""
+        if overloaded or not self.budget.try_spend():
+            self.hedges_denied += 1
+            return False
+        self.hedges_sent += 1
+        return True
+
+    def record_hedge_win(self, primary_started_at: float):
+        """Record that the hedge answered first; estimate the latency saved."""
+        self.hedge_wins += 1
+        elapsed = time.monotonic() - primary_started_at
+        expected = self.latency.expected_latency_beyond(elapsed)
+        saved = max(0.0, expected - elapsed) if expected else 0.0
+        self.latency_saved += saved
+        logger.info(
+            "Hedged request won",
+            primary_elapsed_ms=round(elapsed * 1000, 2),
+            estimated_saved_ms=round(saved * 1000, 2),
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedging statistics."""
+        hedge_delay = (
+            self.latency.percentile(self.percentile)
+            if len(self.latency.samples) >= self.min_samples
+            else None
+        )
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "hedges_sent": self.hedges_sent,
+            "hedges_denied": self.hedges_denied,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": (
+                round(self.hedges_sent / self.requests * 100, 2) if self.requests else 0
+            ),
+            "estimated_latency_saved_ms": round(self.latency_saved * 1000, 2),
+            "hedge_delay_ms": (
+                round(max(self.min_delay, hedge_delay) * 1000, 2)
+                if hedge_delay is not None
+                else None
+            ),
+            "latency_samples": len(self.latency.samples),
+        }
+
+
+# Global hedging policy for Claude API calls
+claude_hedging_policy = HedgingPolicy(
+    enabled=settings.claude_hedging_enabled,
+    percentile=settings.claude_hedge_percentile,
+    budget_ratio=settings.claude_hedge_budget_ratio,
+    min_delay=settings.claude_hedge_min_delay,
+    min_samples=settings.claude_hedge_min_samples,
+)
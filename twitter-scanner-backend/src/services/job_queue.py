@@ -0,0 +1,606 @@
+"""Job store, queue and in-process worker pool for asynchronous analyses."""
+
+import asyncio
+import json
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import sys
+import os
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("job_queue")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+
+class JobQueueFullError(Exception):
+    """Raised when the job queue cannot accept more jobs."""
+
+
+class JobFailedError(Exception):
+    """Raised by a job handler to fail a job with structured error details."""
+
+    def __init__(self, details: Dict[str, Any]):
+        self.details = details
+        super().__init__(details.get("error", "Job failed"))
+
+
+def new_job(kind: str, payload: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Create a job record.
+
+    Args:
+        kind: Job type (selects how the worker processes it)
+        payload: Job input (e.g. the serialized analyze request)
+        context: Request context captured at submission (client key, IP, ...)
+
+    Returns:
+        JSON-serializable job record in the queued state
+    """
+    return {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": JOB_QUEUED,
+        "payload": payload,
+        "context": context,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "attempts": 0,
+        "result": None,
+        "error": None,
+    }
+
+
+class MemoryJobStore:
+    """Single-process job store with an asyncio queue."""
+
+    def __init__(self, max_queue_size: int, result_ttl: int):
+        self.max_queue_size = max_queue_size
+        self.result_ttl = result_ttl
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self.events: Dict[str, asyncio.Event] = {}
+        self.bulk_pending: Dict[str, float] = {}
+        self.bulk_batches: Dict[str, Dict[str, Any]] = {}
+
+    def _purge_expired(self):
+        """Forget finished jobs older than the result TTL."""
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job["status"] in FINISHED_STATES and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+            self.events.pop(job_id, None)
+
+    async def save(self, job: Dict[str, Any]):
+        """Store a new job without queueing it."""
+        self._purge_expired()
+        self.jobs[job["id"]] = job
+        self.events[job["id"]] = asyncio.Event()
+
+    async def submit(self, job: Dict[str, Any]):
+        """Store a new job and put it on the queue."""
+        if self.queue.qsize() >= self.max_queue_size:
+            raise JobQueueFullError("Job queue is full")
+        await self.save(job)
+        self.queue.put_nowait(job["id"])
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job record."""
+        return self.jobs.get(job_id)
+
+    async def update(self, job_id: str, **fields) -> Optional[Dict[str, Any]]:
+        """Update fields of a job, waking long-pollers when it finishes."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        job.update(fields)
+        if job["status"] in FINISHED_STATES and job_id in self.events:
+            self.events[job_id].set()
+        return job
+
+    async def dequeue(self, timeout: float) -> Optional[str]:
+        """Take the next job id, or None after timeout."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def ack(self, job_id: str):
+        """Nothing to acknowledge; dequeued jobs live and die with the process."""
+
+    async def requeue(self, job_id: str):
+        """Put an interrupted job back on the queue."""
+        await self.update(job_id, status=JOB_QUEUED, started_at=None)
+        self.queue.put_nowait(job_id)
+
+    async def heartbeat(self):
+        """Nothing to report for the memory store."""
+
+    async def reap_stale(self, max_attempts: int) -> int:
+        """Jobs cannot outlive their worker in the memory store."""
+        return 0
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait until a job finishes or the timeout passes, then return it."""
+        event = self.events.get(job_id)
+        if event is not None and timeout > 0:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return await self.get(job_id)
+
+    async def queue_depth(self) -> int:
+        """Number of jobs waiting to be picked up."""
+        return self.queue.qsize()
+
+    async def save_bulk_pending(self, job_id: str, queued_at: float):
+        """Record a bulk job waiting to be submitted in a batch."""
+        self.bulk_pending[job_id] = queued_at
+
+    async def delete_bulk_pending(self, job_ids: List[str]):
+        """Forget bulk jobs that left the pending list without a batch."""
+        for job_id in job_ids:
+            self.bulk_pending.pop(job_id, None)
+
+    async def save_bulk_batch(self, batch_id: str, batch: Dict[str, Any]):
+        """Record a submitted batch; its jobs are no longer pending."""
+        await self.delete_bulk_pending(batch["job_ids"])
+        self.bulk_batches[batch_id] = batch
+
+    async def delete_bulk_batch(self, batch_id: str):
+        """Forget a batch whose results were collected."""
+        self.bulk_batches.pop(batch_id, None)
+
+    async def claim_bulk(self) -> Tuple[Dict[str, float], Dict[str, Dict[str, Any]]]:
+        """Bulk state of this process (nothing outlives it in the memory store)."""
+        return dict(self.bulk_pending), dict(self.bulk_batches)
+
+    async def close(self):
+        """Nothing to release for the memory store."""
+
+
+class RedisJobStore:
+    """
+    Job store shared across instances via Redis (JSON records and a list queue).
+
+    Dequeued job ids move atomically (BLMOVE) into this process's
+    processing list and leave it only when the job is finished or
+    requeued, so a crashed process cannot lose jobs. Each process
+    refreshes a heartbeat key; reap_stale() hands the processing lists of
+    processes whose heartbeat expired back to the queue, failing jobs
+    that already used up their attempts.
+
+    Bulk jobs waiting for a Message Batches submission and submitted
+    batches (batch id and job ids) are kept in per-process hashes;
+    claim_bulk() takes over those of processes whose heartbeat expired.
+    """
+
+    poll_interval = 0.5
+
+    def __init__(
+        self,
+        redis_url: str,
+        max_queue_size: int,
+        result_ttl: int,
+        heartbeat_ttl: int = 60,
+        prefix: str = "jobs:",
+    ):
+        self.redis_url = redis_url
+        self.max_queue_size = max_queue_size
+        self.result_ttl = result_ttl
+        self.heartbeat_ttl = heartbeat_ttl
+        self.prefix = prefix
+        self.queue_key = f"{prefix}queue"
+        self.workers_key = f"{prefix}workers"
+        self.reaper_lock_key = f"{prefix}reaper"
+        self.bulk_owners_key = f"{prefix}bulk_owners"
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.processing_key = self._processing_key(self.worker_id)
+        self._redis = None
+
+    def _get_redis(self):
+        """Create the Redis client lazily."""
+        if self._redis is None:
+            import redis.asyncio as redis_asyncio
+
+            self._redis = redis_asyncio.from_url(
+                self.redis_url, decode_responses=True
+            )
+        return self._redis
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}job:{job_id}"
+
+    def _processing_key(self, worker_id: str) -> str:
+        return f"{self.prefix}processing:{worker_id}"
+
+    def _heartbeat_key(self, worker_id: str) -> str:
+        return f"{self.prefix}heartbeat:{worker_id}"
+
+    def _bulk_pending_key(self, worker_id: str) -> str:
+        return f"{self.prefix}bulk_pending:{worker_id}"
+
+    def _bulk_batches_key(self, worker_id: str) -> str:
+        return f"{self.prefix}bulk_batches:{worker_id}"
+
+    async def save(self, job: Dict[str, Any]):
+        """Write a job record; unfinished jobs expire only as a safety net."""
+        ttl = self.result_ttl if job["status"] in FINISHED_STATES else self.result_ttl * 24
+        await self._get_redis().set(
+            self._job_key(job["id"]), json.dumps(job, ensure_ascii=False), ex=ttl
+        )
+
+    async def submit(self, job: Dict[str, Any]):
+        """Store a new job and push it onto the shared queue."""
+        redis = self._get_redis()
+        if await redis.llen(self.queue_key) >= self.max_queue_size:
+            raise JobQueueFullError("Job queue is full")
+        await self.save(job)
+        await redis.rpush(self.queue_key, job["id"])
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job record."""
+        raw = await self._get_redis().get(self._job_key(job_id))
+        return json.loads(raw) if raw else None
+
+    async def update(self, job_id: str, **fields) -> Optional[Dict[str, Any]]:
+        """Update fields of a job (last writer wins; each job has one worker)."""
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        job.update(fields)
+        await self.save(job)
+        return job
+
+    async def dequeue(self, timeout: float) -> Optional[str]:
+        """Move the next job id from the shared queue to this process's processing list."""
+        return await self._get_redis().blmove(
+            self.queue_key, self.processing_key, max(1, int(timeout)), "LEFT", "RIGHT"
+        )
+
+    async def ack(self, job_id: str):
+        """Drop a finished job from the processing list."""
+        await self._get_redis().lrem(self.processing_key, 1, job_id)
+
+    async def _return_to_queue(self, job_id: str, processing_key: str):
+        """Move a job id from a processing list back to the front of the queue."""
+        async with self._get_redis().pipeline(transaction=True) as pipe:
+            pipe.lrem(processing_key, 1, job_id)
+            pipe.lpush(self.queue_key, job_id)
+            await pipe.execute()
+
+    async def requeue(self, job_id: str):
+        """Put an interrupted job back at the front of the queue."""
+        await self.update(job_id, status=JOB_QUEUED, started_at=None)
+        await self._return_to_queue(job_id, self.processing_key)
+
+    async def heartbeat(self):
+        """Mark this process alive for heartbeat_ttl seconds."""
+        redis = self._get_redis()
+        await redis.sadd(self.workers_key, self.worker_id)
+        await redis.set(self._heartbeat_key(self.worker_id), int(time.time()), ex=self.heartbeat_ttl)
+
+    async def reap_stale(self, max_attempts: int) -> int:
+        """
+        Recover jobs held by processes whose heartbeat expired.
+
+        Jobs that already used max_attempts are failed instead of requeued.
+        One process reaps at a time.
+
+        Returns:
+            Number of jobs recovered
+        """
+        redis = self._get_redis()
+        if not await redis.set(self.reaper_lock_key, self.worker_id, nx=True, ex=self.heartbeat_ttl):
+            return 0
+
+        recovered = 0
+        try:
+            for worker_id in await redis.smembers(self.workers_key):
+                if await redis.exists(self._heartbeat_key(worker_id)):
+                    continue
+                processing_key = self._processing_key(worker_id)
+                for job_id in await redis.lrange(processing_key, 0, -1):
+                    job = await self.get(job_id)
+                    if job is None:
+                        await redis.lrem(processing_key, 1, job_id)
+                    elif job["attempts"] >= max_attempts:
+                        await self.update(
+                            job_id,
+                            status=JOB_FAILED,
+                            finished_at=time.time(),
+                            error={"error": "Worker stopped while running the job"},
+                        )
+                        await redis.lrem(processing_key, 1, job_id)
+                    else:
+                        await self.update(job_id, status=JOB_QUEUED, started_at=None)
+                        await self._return_to_queue(job_id, processing_key)
+                    recovered += 1
+                    logger.warning(
+                        "Recovered job from stopped worker",
+                        job_id=job_id,
+                        worker_id=worker_id,
+                        attempts=job["attempts"] if job else None,
+                    )
+                if not await redis.llen(processing_key):
+                    await redis.srem(self.workers_key, worker_id)
+        finally:
+            await redis.delete(self.reaper_lock_key)
+        return recovered
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Poll until a job finishes or the timeout passes, then return it."""
+        deadline = time.monotonic() + timeout
+        job = await self.get(job_id)
+        while job is not None and job["status"] not in FINISHED_STATES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(self.poll_interval, remaining))
+            job = await self.get(job_id)
+        return job
+
+    async def queue_depth(self) -> int:
+        """Number of jobs waiting to be picked up."""
+        return await self._get_redis().llen(self.queue_key)
+
+    async def save_bulk_pending(self, job_id: str, queued_at: float):
+        """Record a bulk job waiting to be submitted in a batch."""
+        redis = self._get_redis()
+        await redis.sadd(self.bulk_owners_key, self.worker_id)
+        await redis.hset(self._bulk_pending_key(self.worker_id), job_id, queued_at)
+
+    async def delete_bulk_pending(self, job_ids: List[str]):
+        """Forget bulk jobs that left the pending list without a batch."""
+        if job_ids:
+            await self._get_redis().hdel(self._bulk_pending_key(self.worker_id), *job_ids)
+
+    async def save_bulk_batch(self, batch_id: str, batch: Dict[str, Any]):
+        """Record a submitted batch; its jobs are no longer pending."""
+        async with self._get_redis().pipeline(transaction=True) as pipe:
+            pipe.sadd(self.bulk_owners_key, self.worker_id)
+            pipe.hset(self._bulk_batches_key(self.worker_id), batch_id, json.dumps(batch))
+            if batch["job_ids"]:
+                pipe.hdel(self._bulk_pending_key(self.worker_id), *batch["job_ids"])
+            await pipe.execute()
+
+    async def delete_bulk_batch(self, batch_id: str):
+        """Forget a batch whose results were collected."""
+        await self._get_redis().hdel(self._bulk_batches_key(self.worker_id), batch_id)
+
+    async def claim_bulk(self) -> Tuple[Dict[str, float], Dict[str, Dict[str, Any]]]:
+        """
+        Take over the bulk state of processes whose heartbeat expired.
+
+        Returns:
+            Tuple of (pending job id -> queued_at, batch id -> batch) now
+            owned by this process, including what it already owned
+        """
+        redis = self._get_redis()
+        # Claiming needs this process to look alive to the others
+        await self.heartbeat()
+        if await redis.set(self.reaper_lock_key, self.worker_id, nx=True, ex=self.heartbeat_ttl):
+            try:
+                for worker_id in await redis.smembers(self.bulk_owners_key):
+                    if worker_id == self.worker_id or await redis.exists(
+                        self._heartbeat_key(worker_id)
+                    ):
+                        continue
+                    pending = await redis.hgetall(self._bulk_pending_key(worker_id))
+                    batches = await redis.hgetall(self._bulk_batches_key(worker_id))
+                    async with redis.pipeline(transaction=True) as pipe:
+                        pipe.sadd(self.bulk_owners_key, self.worker_id)
+                        if pending:
+                            pipe.hset(self._bulk_pending_key(self.worker_id), mapping=pending)
+                        if batches:
+                            pipe.hset(self._bulk_batches_key(self.worker_id), mapping=batches)
+                        pipe.delete(
+                            self._bulk_pending_key(worker_id),
+                            self._bulk_batches_key(worker_id),
+                        )
+                        pipe.srem(self.bulk_owners_key, worker_id)
+                        await pipe.execute()
+                    if pending or batches:
+                        logger.warning(
+                            "Claimed bulk jobs of stopped worker",
+                            worker_id=worker_id,
+                            pending_jobs=len(pending),
+                            batches=len(batches),
+                        )
+            finally:
+                await redis.delete(self.reaper_lock_key)
+
+        pending = await redis.hgetall(self._bulk_pending_key(self.worker_id))
+        batches = await redis.hgetall(self._bulk_batches_key(self.worker_id))
+        return (
+            {job_id: float(queued_at) for job_id, queued_at in pending.items()},
+            {batch_id: json.loads(raw) for batch_id, raw in batches.items()},
+        )
+
+    async def close(self):
+        """Close the Redis connection pool."""
+        if self._redis is not None:
+            await self._redis.delete(self._heartbeat_key(self.worker_id))
+            await self._redis.close()
+            self._redis = None
+
+
+def create_job_store():
+    """Create the job store selected by JOB_QUEUE_BACKEND."""
+    if settings.job_queue_backend == "redis":
+        if not settings.redis_url:
+            raise ValueError("JOB_QUEUE_BACKEND=redis requires REDIS_URL")
+        return RedisJobStore(
+            settings.redis_url,
+            max_queue_size=settings.job_queue_max_size,
+            result_ttl=settings.job_result_ttl_seconds,
+            heartbeat_ttl=settings.job_heartbeat_interval_seconds * 3,
+        )
+    return MemoryJobStore(
+        max_queue_size=settings.job_queue_max_size,
+        result_ttl=settings.job_result_ttl_seconds,
+    )
+
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class JobWorkerPool:
+    """Fixed number of worker tasks draining the job store's queue."""
+
+    def __init__(
+        self, store, workers: int, max_attempts: int = 3, heartbeat_interval: float = 20
+    ):
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.heartbeat_interval = heartbeat_interval
+        self.handlers: Dict[str, JobHandler] = {}
+        self.tasks: List[asyncio.Task] = []
+        self.busy = 0
+        self.completed = 0
+        self.failed = 0
+        self.recovered = 0
+
+    def register(self, kind: str, handler: JobHandler):
+        """
+        Register the coroutine that processes jobs of one kind.
+
+        The handler returns the job result, or raises to fail the job
+        (JobFailedError carries the error details to store).
+        """
+        self.handlers[kind] = handler
+
+    async def start(self):
+        """Start the worker tasks."""
+        if self.tasks:
+            return
+        self.tasks = [
+            asyncio.create_task(self._worker(index)) for index in range(self.workers)
+        ]
+        self.tasks.append(asyncio.create_task(self._maintain()))
+        logger.info("Job workers started", workers=self.workers)
+
+    async def stop(self):
+        """Cancel the worker tasks; jobs in progress go back on the queue."""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        await self.store.close()
+
+    async def _maintain(self):
+        """Send heartbeats and recover jobs of stopped workers until cancelled."""
+        while True:
+            try:
+                await self.store.heartbeat()
+                self.recovered += await self.store.reap_stale(self.max_attempts)
+            except Exception as e:
+                logger.error("Job heartbeat or recovery failed", error=str(e))
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def _worker(self, index: int):
+        """Take jobs off the queue until cancelled."""
+        while True:
+            try:
+                job_id = await self.store.dequeue(timeout=5)
+            except Exception as e:
+                logger.error("Job dequeue failed", worker=index, error=str(e))
+                await asyncio.sleep(1)
+                continue
+
+            if job_id is not None:
+                await self._run(job_id, index)
+
+    async def _run(self, job_id: str, index: int):
+        """Process one job and store its outcome."""
+        job = await self.store.get(job_id)
+        if job is None:
+            await self.store.ack(job_id)
+            return
+        # Attempts are stored up front so recovery after a crash can see them
+        job = await self.store.update(
+            job_id,
+            status=JOB_RUNNING,
+            started_at=time.time(),
+            attempts=job["attempts"] + 1,
+        )
+        handler = self.handlers.get(job["kind"])
+
+        self.busy += 1
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job kind {job['kind']}")
+            result = await handler(job)
+            await self.store.update(
+                job_id,
+                status=JOB_SUCCEEDED,
+                finished_at=time.time(),
+                result=result,
+            )
+            await self.store.ack(job_id)
+            self.completed += 1
+        except asyncio.CancelledError:
+            await asyncio.shield(self.store.requeue(job_id))
+            logger.info("Job interrupted and requeued", job_id=job_id, worker=index)
+            raise
+        except Exception as e:
+            self.failed += 1
+            if isinstance(e, JobFailedError):
+                error = e.details
+            else:
+                error = {"error": str(e) or type(e).__name__}
+            await self.store.update(
+                job_id,
+                status=JOB_FAILED,
+                finished_at=time.time(),
+                error=error,
+            )
+            await self.store.ack(job_id)
+            logger.warning("Job failed", job_id=job_id, worker=index, error=error)
+        finally:
+            self.busy -= 1
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get worker pool statistics."""
+        try:
+            queue_depth = await self.store.queue_depth()
+        except Exception:
+            queue_depth = None
+        return {
+            "backend": settings.job_queue_backend,
+            "workers": len(self.tasks),
+            "busy": self.busy,
+            "queue_depth": queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "recovered": self.recovered,
+        }
+
+
+# Global job store and worker pool
+job_store = create_job_store()
+job_worker_pool = JobWorkerPool(
+    job_store,
+    workers=settings.job_workers,
+    max_attempts=settings.job_max_attempts,
+    heartbeat_interval=settings.job_heartbeat_interval_seconds,
+)
@@ -0,0 +1,210 @@
+"""Model tiering: pick the Claude model and output budget per request."""
+
+from typing import Any, Dict, List, Optional
+import sys
+import os
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from core.logging_config import get_logger
+from core.models import Tweet
+
+logger = get_logger("model_router")
+
+DEFAULT_ROUTE = "default"
+SMALL_ROUTE = "small"
+
+
+class ModelRoute:
+    """Model and output token ceiling chosen for one request."""
+
+    def __init__(self, name: str, model: str, max_tokens: int):
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+
+
+class RouteStats:
+    """Latency and token counters for one route."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.requests = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.total_tweets = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the counters with per-request averages."""
+        successes = self.requests - self.failures
+        return {
+            "model": self.model,
+            "requests": self.requests,
+            "failures": self.failures,
+            "avg_latency_ms": (
+                round(self.total_latency / self.requests * 1000, 2)
+                if self.requests
+                else None
+            ),
+            "avg_tweets": (
+                round(self.total_tweets / self.requests, 2) if self.requests else None
+            ),
+            "avg_input_tokens": (
+                round(self.input_tokens / successes) if successes else None
+            ),
+            "avg_output_tokens": (
+                round(self.output_tokens / successes) if successes else None
+            ),
+        }
+
+
+def parse_template_rules(rules: str) -> Dict[str, ModelRoute]:
+    """
+    Parse MODEL_ROUTING_TEMPLATE_RULES.
+
+    Format: comma-separated template_id=model[:max_tokens] entries, e.g.
+    "daily-digest=claude-3-5-haiku-20241022:2000,deep-dive=claude-sonnet-4-20250514".
+    Entries without max_tokens use CLAUDE_MAX_TOKENS.
+
+    Raises:
+        ValueError: If an entry is malformed
+    """
+    routes: Dict[str, ModelRoute] = {}
+    for entry in rules.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        template_id, separator, target = entry.partition("=")
+        model, _, max_tokens = target.strip().partition(":")
+        if not separator or not template_id.strip() or not model:
+            raise ValueError(f"Invalid MODEL_ROUTING_TEMPLATE_RULES entry: {entry}")
+        routes[template_id.strip()] = ModelRoute(
+            name=f"template:{template_id.strip()}",
+            model=model,
+            max_tokens=int(max_tokens) if max_tokens else settings.claude_max_tokens,
+        )
+    return routes
+
+
+class ModelRouter:
+    """
+    Route analysis requests to a model tier.
+
+    Rules, first match wins:
+        template: the request's template_id has an explicit rule
+        small: few tweets and little content go to the faster, cheaper model
+        default: everything else uses CLAUDE_MODEL
+
+    With routing disabled every request takes the default route; stats
+    are still recorded so thresholds can be tuned before enabling it.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        default_route: ModelRoute,
+        small_route: ModelRoute,
+        small_max_tweets: int,
+        small_max_chars: int,
+        template_routes: Optional[Dict[str, ModelRoute]] = None,
+    ):
+        self.enabled = enabled
+        self.default_route = default_route
+        self.small_route = small_route
+        self.small_max_tweets = small_max_tweets
+        self.small_max_chars = small_max_chars
+        self.template_routes = template_routes or {}
+        self.stats: Dict[str, RouteStats] = {}
+
+    @classmethod
+    def from_settings(cls) -> "ModelRouter":
+        """Build the router from the CLAUDE_MODEL / MODEL_ROUTING_* settings."""
+        return cls(
+            enabled=settings.routing_enabled,
+            default_route=ModelRoute(
+                DEFAULT_ROUTE, settings.claude_model, settings.claude_max_tokens
+            ),
+            small_route=ModelRoute(
+                SMALL_ROUTE,
+                settings.routing_small_model,
+                settings.routing_small_max_tokens,
+            ),
+            small_max_tweets=settings.routing_small_max_tweets,
+            small_max_chars=settings.routing_small_max_chars,
+            template_routes=parse_template_rules(settings.routing_template_rules),
+        )
+
+    def route(self, tweets: List[Tweet], template_id: Optional[str] = None) -> ModelRoute:
+        """
+        Pick the route for a batch of tweets.
+
+        Args:
+            tweets: Tweets in the request (before compaction)
+            template_id: Prompt template identifier sent by the client
+
+        Returns:
+            Chosen ModelRoute
+        """
+        if not self.enabled:
+            return self.default_route
+        if template_id and template_id in self.template_routes:
+            return self.template_routes[template_id]
+        if (
+            len(tweets) <= self.small_max_tweets
+            and sum(len(tweet.content) for tweet in tweets) <= self.small_max_chars
+        ):
+            return self.small_route
+        return self.default_route
+
+    def record(
+        self,
+        route: ModelRoute,
+        tweet_count: int,
+        latency: float,
+        usage: Optional[Dict[str, Any]] = None,
+        success: bool = True,
+    ):
+        """
+        Record one upstream analysis served by a route.
+
+        Args:
+            route: Route used
+            tweet_count: Tweets sent after compaction
+            latency: Seconds spent on the Claude call(s)
+            usage: Token usage reported by the API
+            success: Whether the analysis succeeded
+        """
+        stats = self.stats.get(route.name)
+        if stats is None:
+            stats = self.stats[route.name] = RouteStats(route.model)
+        stats.requests += 1
+        stats.total_latency += latency
+        stats.total_tweets += tweet_count
+        if not success:
+            stats.failures += 1
+            return
+        usage = usage or {}
+        stats.input_tokens += (
+            (usage.get("input_tokens") or 0)
+            + (usage.get("cache_read_input_tokens") or 0)
+            + (usage.get("cache_creation_input_tokens") or 0)
+        )
+        stats.output_tokens += usage.get("output_tokens") or 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing configuration and per-route statistics."""
+        return {
+            "enabled": self.enabled,
+            "small_max_tweets": self.small_max_tweets,
+            "small_max_chars": self.small_max_chars,
+            "routes": {name: stats.get_stats() for name, stats in self.stats.items()},
+        }
+
+
+# Global model router
+model_router = ModelRouter.from_settings()
@@ -0,0 +1,294 @@
+"""Monthly partitions of usage_statistics: pre-creation, archival and retention."""
+
+import asyncio
+import gzip
+import json
+import os
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+import sys
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from core.database import USAGE_RECORD_COLUMNS, UsageStatsDB, db_pool
+from core.logging_config import get_logger
+
+logger = get_logger("partition_maintenance")
+
+TABLE = "usage_statistics"
+# Catch-all partition; new months are split off it while it is still empty
+FUTURE_PARTITION = "pfuture"
+MAINTENANCE_LOCK = "twitter_scanner_partition_maintenance"
+
+
+def month_start(value: date) -> date:
+    """First day of the month containing value."""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    """Shift a first-of-month date by a number of months."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the partition holding one month (pYYYYMM)."""
+    return f"p{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Month held by a pYYYYMM partition (None for other partitions)."""
+    try:
+        return datetime.strptime(name, "p%Y%m").date()
+    except ValueError:
+        return None
+
+
+def partition_definition(month: date) -> str:
+    """PARTITION clause for one month (rows before the next month starts)."""
+    return (
+        f"PARTITION {partition_name(month)} VALUES LESS THAN "
+        f"(UNIX_TIMESTAMP('{add_months(month, 1):%Y-%m-%d} 00:00:00'))"
+    )
+
+
+def partition_clause(first: date, last: date) -> str:
+    """PARTITION BY clause with monthly partitions first..last and the catch-all."""
+    definitions = []
+    month = first
+    while month <= last:
+        definitions.append(partition_definition(month))
+        month = add_months(month, 1)
+    definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+    return (
+        "PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (\n    "
+        + ",\n    ".join(definitions)
+        + "\n)"
+    )
+
+
+async def list_partitions(cursor) -> List[Tuple[str, int]]:
+    """Partitions of usage_statistics with their estimated row counts, in order."""
+    await cursor.execute("""
+        SELECT PARTITION_NAME, TABLE_ROWS FROM INFORMATION_SCHEMA.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (TABLE,))
+    return [(row[0], row[1] or 0) for row in await cursor.fetchall()]
+
+
+class PartitionMaintenance:
+    """
+    Keep usage_statistics partitioned by month.
+
+    Each run:
+        1. pre-creates partitions for the coming months by splitting them
+           off the (empty) catch-all partition
+        2. exports each partition older than the retention period to a
+           gzip NDJSON file in the archive directory
+        3. drops the exported partitions (O(1), no row-by-row DELETE)
+
+    Runs are serialized across processes with a MySQL named lock, so every
+    worker can run the loop.
+    """
+
+    def __init__(
+        self,
+        retention_months: int,
+        precreate_months: int,
+        archive_dir: str,
+        interval_hours: float,
+    ):
+        self.retention_months = retention_months
+        self.precreate_months = precreate_months
+        self.archive_dir = archive_dir
+        self.interval_hours = interval_hours
+        self.task: Optional[asyncio.Task] = None
+
+        self.runs = 0
+        self.partitions_created = 0
+        self.partitions_dropped = 0
+        self.rows_archived = 0
+        self.last_run_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    async def start(self):
+        """Start the periodic maintenance loop."""
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the maintenance loop."""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _run(self):
+        """Run maintenance now and then every interval until cancelled."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                logger.error("Partition maintenance failed", error=self.last_error)
+            await asyncio.sleep(self.interval_hours * 3600)
+
+    async def run_once(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Run one maintenance pass.
+
+        Args:
+            today: Reference date (defaults to today)
+
+        Returns:
+            Summary of partitions created, archived and dropped
+        """
+        current_month = month_start(today or date.today())
+        summary: Dict[str, Any] = {"created": [], "dropped": [], "rows_archived": 0}
+        async with db_pool.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT GET_LOCK(%s, 0)", (MAINTENANCE_LOCK,))
+                if (await cursor.fetchone())[0] != 1:
+                    summary["skipped"] = "another process is running maintenance"
+                    return summary
+                try:
+                    partitions = await list_partitions(cursor)
+                    if not partitions:
+                        summary["skipped"] = f"{TABLE} is not partitioned"
+                        return summary
+                    summary["created"] = await self._create_future(
+                        cursor, partitions, current_month
+                    )
+                    partitions = await list_partitions(cursor)
+                    cutoff = add_months(current_month, -self.retention_months)
+                    for name, _ in partitions:
+                        month = partition_month(name)
+                        if month is None or month >= cutoff:
+                            continue
+                        summary["rows_archived"] += await self._archive(name, month)
+                        await cursor.execute(f"ALTER TABLE {TABLE} DROP PARTITION {name}")
+                        summary["dropped"].append(name)
+                        logger.info("Expired partition dropped", partition=name)
+                finally:
+                    await cursor.execute("SELECT RELEASE_LOCK(%s)", (MAINTENANCE_LOCK,))
+
+        self.runs += 1
+        self.last_run_at = time.time()
+        self.last_error = None
+        self.partitions_created += len(summary["created"])
+        self.partitions_dropped += len(summary["dropped"])
+        self.rows_archived += summary["rows_archived"]
+        logger.info("Partition maintenance completed", **summary)
+        return summary
+
+    async def _create_future(
+        self, cursor, partitions: List[Tuple[str, int]], current_month: date
+    ) -> List[str]:
+        """Split partitions for the coming months off the catch-all partition."""
+        months = [partition_month(name) for name, _ in partitions]
+        months = [month for month in months if month is not None]
+        next_month = add_months(max(months), 1) if months else current_month
+        last_month = add_months(current_month, self.precreate_months)
+        if next_month > last_month:
+            return []
+
+        future_rows = dict(partitions).get(FUTURE_PARTITION, 0)
+        if future_rows:
+            # Reorganizing a non-empty catch-all copies its rows; still
+            # correct, but worth knowing about (maintenance fell behind)
+            logger.warning(
+                "Catch-all partition has rows, splitting it will copy them",
+                estimated_rows=future_rows,
+            )
+
+        definitions = []
+        month = next_month
+        while month <= last_month:
+            definitions.append(month)
+            month = add_months(month, 1)
+        await cursor.execute(
+            f"ALTER TABLE {TABLE} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ("
+            + ", ".join(partition_definition(month) for month in definitions)
+            + f", PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE)"
+        )
+        return [partition_name(month) for month in definitions]
+
+    async def _archive(self, name: str, month: date) -> int:
+        """
+        Export one partition to <archive_dir>/usage_statistics-YYYY-MM.ndjson.gz.
+
+        Rows are streamed with an unbuffered server-side cursor
+        (UsageStatsDB.stream_records) and the file is only moved into
+        place once complete.
+
+        Returns:
+            Number of rows exported
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{TABLE}-{month:%Y-%m}.ndjson.gz")
+        temp_path = f"{path}.partial"
+        rows = 0
+        started = time.perf_counter()
+
+        archive = await asyncio.to_thread(gzip.open, temp_path, "wt", encoding="utf-8")
+        try:
+            async for chunk in UsageStatsDB.stream_records(partition=name):
+                lines = "".join(
+                    json.dumps(
+                        dict(zip(USAGE_RECORD_COLUMNS, row)),
+                        default=lambda value: value.isoformat(),
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                    for row in chunk
+                )
+                await asyncio.to_thread(archive.write, lines)
+                rows += len(chunk)
+        except BaseException:
+            await asyncio.to_thread(archive.close)
+            os.remove(temp_path)
+            raise
+        await asyncio.to_thread(archive.close)
+        os.replace(temp_path, path)
+
+        logger.info(
+            "Partition archived",
+            partition=name,
+            path=path,
+            rows=rows,
+            bytes=os.path.getsize(path),
+            duration_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+        return rows
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get maintenance statistics."""
+        return {
+            "retention_months": self.retention_months,
+            "precreate_months": self.precreate_months,
+            "runs": self.runs,
+            "partitions_created": self.partitions_created,
+            "partitions_dropped": self.partitions_dropped,
+            "rows_archived": self.rows_archived,
+            "last_run_at": (
+                datetime.fromtimestamp(self.last_run_at).isoformat()
+                if self.last_run_at
+                else None
+            ),
+            "last_error": self.last_error,
+        }
+
+
+# Global partition maintenance job
+partition_maintenance = PartitionMaintenance(
+    retention_months=settings.usage_retention_months,
+    precreate_months=settings.partition_precreate_months,
+    archive_dir=settings.usage_archive_dir,
+    interval_hours=settings.partition_maintenance_interval_hours,
+)
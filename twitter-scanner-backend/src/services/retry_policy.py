@@ -0,0 +1,232 @@
+"""Retry policy and circuit breaker for upstream API calls."""
+
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+import sys
+import os
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("retry_policy")
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delay in seconds or HTTP date).
+
+    Returns:
+        Delay in seconds, or None if the header is missing or invalid
+    """
+    value = headers.get("retry-after")
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Decorrelated-jitter exponential backoff with a retry budget and deadline."""
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 20.0,
+        deadline: float = 150.0,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def start(
+        self, max_retries: Optional[int] = None, deadline: Optional[float] = None
+    ) -> "RetryState":
+        """Start tracking retries for one logical request."""
+        return RetryState(
+            self,
+            max_retries=self.max_retries if max_retries is None else max_retries,
+            deadline=self.deadline if deadline is None else deadline,
+        )
+
+
+class RetryState:
+    """Per-request retry state: attempts used, time spent and previous delay."""
+
+    def __init__(self, policy: RetryPolicy, max_retries: int, deadline: float):
+        self.policy = policy
+        self.max_retries = max_retries
+        self.deadline_at = time.monotonic() + deadline
+        self.attempt = 0
+        self.previous_delay = policy.base_delay
+
+    @property
+    def max_attempts(self) -> int:
+        """Total attempts allowed (first call plus retries)."""
+        return self.max_retries + 1
+
+    def next_attempt(self) -> int:
+        """Register the start of an attempt and return its 1-based number."""
+        self.attempt += 1
+        return self.attempt
+
+    def remaining_time(self) -> float:
+        """Seconds left before the request deadline."""
+        return max(0.0, self.deadline_at - time.monotonic())
+
+    def next_delay(self, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Compute the delay before the next attempt.
+
+        Args:
+            retry_after: Server-requested delay from a Retry-After header
+
+        Returns:
+            Delay in seconds, or None if the retry budget or deadline is exhausted
+        """
+        if self.attempt >= self.max_attempts:
+            return None
+
+        delay = min(
+            self.policy.max_delay,
+            random.uniform(self.policy.base_delay, self.previous_delay * 3),
+        )
+        self.previous_delay = delay
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        # Leave time for the next attempt to actually do something
+        if delay + 1.0 >= self.remaining_time():
+            return None
+        return delay
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker rejects a call."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Upstream circuit open, retry after {retry_after:.0f}s")
+
+
+class CircuitBreaker:
+    """Process-wide circuit breaker: closed -> open -> half-open -> closed."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_since = 0.0
+        self.half_open_calls = 0
+        self.rejected_calls = 0
+        self.times_opened = 0
+
+    def _transition(self, state: str):
+        """Change state and log the transition."""
+        if state != self.state:
+            logger.warning(
+                "Circuit breaker state changed",
+                circuit=self.name,
+                from_state=self.state,
+                to_state=state,
+                consecutive_failures=self.consecutive_failures,
+            )
+            self.state = state
+
+    def before_call(self):
+        """
+        Check whether a call may proceed.
+
+        Raises:
+            CircuitOpenError: If the circuit is open or half-open probes are in flight
+        """
+        if self.state == self.OPEN:
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.recovery_timeout:
+                self.rejected_calls += 1
+                raise CircuitOpenError(self.recovery_timeout - elapsed)
+            self._transition(self.HALF_OPEN)
+            self.half_open_since = time.monotonic()
+            self.half_open_calls = 0
+
+        if self.state == self.HALF_OPEN:
+            # Release probe slots held by calls that never reported back
+            if time.monotonic() - self.half_open_since >= self.recovery_timeout:
+                self.half_open_since = time.monotonic()
+                self.half_open_calls = 0
+            if self.half_open_calls >= self.half_open_max_calls:
+                self.rejected_calls += 1
+                raise CircuitOpenError(self.recovery_timeout)
+            self.half_open_calls += 1
+
+    def record_success(self):
+        """Record a healthy upstream response (any non-failure status)."""
+        self.consecutive_failures = 0
+        if self.state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def record_failure(self):
+        """Record an upstream failure (5xx, overload, timeout or network error)."""
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED
+            and self.consecutive_failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            self._transition(self.OPEN)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get circuit breaker statistics."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected_calls,
+        }
+
+
+# Global policy and circuit breaker for the Claude API
+claude_retry_policy = RetryPolicy(
+    max_retries=settings.claude_max_retries,
+    base_delay=settings.claude_retry_base_delay,
+    max_delay=settings.claude_retry_max_delay,
+    deadline=settings.claude_retry_deadline,
+)
+claude_circuit_breaker = CircuitBreaker(
+    "claude_api",
+    failure_threshold=settings.circuit_breaker_failure_threshold,
+    recovery_timeout=settings.circuit_breaker_recovery_timeout,
+    half_open_max_calls=settings.circuit_breaker_half_open_max_calls,
+)
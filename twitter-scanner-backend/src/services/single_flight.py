@@ -0,0 +1,141 @@
+"""Single-flight coalescing of duplicate concurrent calls."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+import sys
+import os
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("single_flight")
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """One in-flight call and the number of callers waiting on it."""
+
+    def __init__(self, task: asyncio.Task, retain: Optional[Callable[[Any], bool]] = None):
+        self.task = task
+        self.retain = retain
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time and share its outcome.
+
+    The call runs in its own task so that one caller going away does not
+    fail the others; it is cancelled only when every caller has left.
+    With result_ttl > 0, successful results stay retrievable by key for
+    that many seconds after completion.
+    """
+
+    def __init__(self, name: str, result_ttl: float = 0, max_results: int = 10000):
+        self.name = name
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self.flights: Dict[str, _Flight] = {}
+        self.results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.calls = 0
+        self.shared_calls = 0
+
+    def _get_result(self, key: str) -> Tuple[bool, Any]:
+        """Look up a retained result, dropping it if expired."""
+        entry = self.results.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self.results[key]
+            return False, None
+        return True, value
+
+    def _on_done(self, key: str, flight: _Flight, task: asyncio.Task):
+        """Forget a finished flight and retain its result if configured."""
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+        if task.cancelled() or task.exception() is not None or self.result_ttl <= 0:
+            return
+        if flight.retain is not None and not flight.retain(task.result()):
+            return
+
+        self.results[key] = (time.time() + self.result_ttl, task.result())
+        self.results.move_to_end(key)
+        while len(self.results) > self.max_results:
+            self.results.popitem(last=False)
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        reuse_result: bool = True,
+        retain: Optional[Callable[[T], bool]] = None,
+    ) -> Tuple[T, bool]:
+        """
+        Run fn once per key, or join the call already in flight.
+
+        Args:
+            key: Deduplication key
+            fn: Coroutine factory performing the actual work
+            reuse_result: Whether a retained completed result may be returned
+            retain: Decides whether a successful result may be retained
+                (default: always, when result_ttl > 0)
+
+        Returns:
+            Tuple of (result, shared) where shared is True if this caller
+            did not start the work itself
+        """
+        self.calls += 1
+        if self.result_ttl > 0 and reuse_result:
+            found, value = self._get_result(key)
+            if found:
+                self.shared_calls += 1
+                return value, True
+
+        flight = self.flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()), retain)
+            self.flights[key] = flight
+            flight.task.add_done_callback(
+                lambda task, key=key, flight=flight: self._on_done(key, flight, task)
+            )
+        else:
+            self.shared_calls += 1
+            logger.info("Joined in-flight call", flight_group=self.name, key=key[:32])
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics."""
+        return {
+            "in_flight": len(self.flights),
+            "retained_results": len(self.results),
+            "calls": self.calls,
+            "shared_calls": self.shared_calls,
+        }
+
+
+# Logical analyze requests per client, keyed by Idempotency-Key or content hash
+analysis_request_flights = SingleFlight(
+    "analysis_requests",
+    result_ttl=settings.idempotency_window_seconds,
+    max_results=settings.idempotency_max_entries,
+)
+
+# Upstream Claude calls shared across clients, keyed by content hash
+upstream_analysis_flights = SingleFlight("upstream_analyses")
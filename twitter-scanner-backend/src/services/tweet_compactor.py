@@ -0,0 +1,254 @@
+"""Token-budget compaction of tweets before prompt construction."""
+
+import re
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import sys
+import os
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from core.logging_config import get_logger
+from core.models import Tweet
+from services.claude_client import claude_client
+from utils.tokens import estimate_tokens
+
+logger = get_logger("tweet_compactor")
+
+_URL_PATTERN = re.compile(r"https?://[^\s<>\"')\]]+")
+_ZERO_WIDTH_PATTERN = re.compile("[\u200b-\u200f\u2060\ufeff]")
+_INLINE_SPACE_PATTERN = re.compile("[ \t\u00a0\u3000]+")
+_BLANK_LINES_PATTERN = re.compile(r"\s*\n\s*")
+_RETWEET_PREFIX_PATTERN = re.compile(r"^RT @\w+:\s*", re.IGNORECASE)
+
+# Query parameters that only carry tracking or share metadata
+_TRACKING_PARAMS = {"s", "t", "ref", "ref_src", "ref_url", "src", "si", "fbclid", "gclid"}
+
+
+class CompactionResult:
+    """Outcome of compacting one batch of tweets."""
+
+    def __init__(self, tweets: List[Tweet], max_tokens: int, stats: Dict[str, Any]):
+        self.tweets = tweets
+        self.max_tokens = max_tokens
+        self.stats = stats
+
+    @property
+    def tokens_saved(self) -> int:
+        """Estimated input tokens removed by compaction."""
+        return self.stats["tokens_saved"]
+
+
+class TweetCompactor:
+    """
+    Preprocessing pipeline run before the analysis prompt is built.
+
+    Steps (each measured in estimated tokens and milliseconds):
+        normalize: collapse whitespace and strip invisible characters
+        urls: drop tracking parameters, shorten and deduplicate URLs
+        dedupe: collapse exact duplicates and retweets of the same text
+        budget: trim long tweets and drop the tail to fit the input budget
+    """
+
+    def __init__(self, format_tweet):
+        self.format_tweet = format_tweet
+        self.requests = 0
+        self.total_tokens_before = 0
+        self.total_tokens_saved = 0
+
+    def _count(self, tweets: List[Tweet]) -> int:
+        """Estimate prompt tokens for a list of tweets."""
+        return sum(estimate_tokens(self.format_tweet(tweet)) for tweet in tweets)
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Collapse whitespace while keeping single line breaks."""
+        text = _ZERO_WIDTH_PATTERN.sub("", text)
+        text = _INLINE_SPACE_PATTERN.sub(" ", text)
+        return _BLANK_LINES_PATTERN.sub("\n", text).strip()
+
+    @staticmethod
+    def shorten_url(url: str) -> str:
+        """Drop tracking query parameters, fragments and the www. prefix."""
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return url
+        query = urlencode(
+            [
+                (key, value)
+                for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                if key.lower() not in _TRACKING_PARAMS and not key.lower().startswith("utm_")
+            ]
+        )
+        netloc = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+        return urlunsplit((parts.scheme, netloc, parts.path.rstrip("/") or "/", query, ""))
+
+    def _compact_urls(self, tweet: Tweet) -> Tweet:
+        """Shorten URLs and remove repeats (including the tweet's own URL) from content."""
+        tweet_url = self.shorten_url(tweet.url) if tweet.url else None
+        seen = {tweet_url} if tweet_url else set()
+
+        def replace(match: "re.Match") -> str:
+            url = self.shorten_url(match.group(0))
+            if url in seen:
+                return ""
+            seen.add(url)
+            return url
+
+        content = _URL_PATTERN.sub(replace, tweet.content)
+        return tweet.model_copy(
+            update={"content": _INLINE_SPACE_PATTERN.sub(" ", content).strip(), "url": tweet_url}
+        )
+
+    @staticmethod
+    def _dedupe(tweets: List[Tweet]) -> List[Tweet]:
+        """Keep the first of tweets whose text is identical once retweet prefixes are removed."""
+        seen = set()
+        unique = []
+        for tweet in tweets:
+            fingerprint = _RETWEET_PREFIX_PATTERN.sub("", tweet.content).casefold()
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            unique.append(tweet)
+        return unique
+
+    def _fit_budget(self, tweets: List[Tweet], budget: int, max_tweet_tokens: int) -> List[Tweet]:
+        """Truncate oversized tweets, then keep tweets in order until the budget is used."""
+        kept = []
+        used = 0
+        max_chars = max_tweet_tokens * 4
+        for tweet in tweets:
+            if estimate_tokens(tweet.content) > max_tweet_tokens:
+                tweet = tweet.model_copy(update={"content": tweet.content[:max_chars].rstrip() + "…"})
+            tokens = estimate_tokens(self.format_tweet(tweet))
+            if kept and used + tokens > budget:
+                break
+            kept.append(tweet)
+            used += tokens
+        return kept
+
+    @staticmethod
+    def pick_max_tokens(input_tokens: int, ceiling: int) -> int:
+        """Choose an output budget proportional to the input size."""
+        wanted = int(input_tokens * settings.compaction_output_ratio)
+        return max(min(settings.compaction_min_output_tokens, ceiling), min(ceiling, wanted))
+
+    def compact(
+        self,
+        tweets: List[Tweet],
+        max_output_tokens: int,
+        input_budget: Optional[int] = None,
+    ) -> CompactionResult:
+        """
+        Run all compaction steps on a batch.
+
+        Args:
+            tweets: Tweets as sent by the client
+            max_output_tokens: Upper bound for the adaptive output budget
+            input_budget: Input token budget (defaults to the configured budget)
+
+        Returns:
+            CompactionResult with the compacted tweets, chosen max_tokens and per-step stats
+        """
+        if not settings.compaction_enabled:
+            # Same stats shape as a compacted batch, so callers never special-case it
+            tokens = self._count(tweets)
+            return CompactionResult(
+                tweets,
+                max_output_tokens,
+                {
+                    "tokens_before": tokens,
+                    "tokens_after": tokens,
+                    "tokens_saved": 0,
+                    "tweets_before": len(tweets),
+                    "tweets_after": len(tweets),
+                    "max_tokens": max_output_tokens,
+                    "steps": {},
+                },
+            )
+
+        budget = input_budget or settings.compaction_input_token_budget
+        steps: Dict[str, Dict[str, Any]] = {}
+        tokens_before = self._count(tweets)
+        current = tweets
+
+        def measure(name: str, started: float):
+            steps[name] = {
+                "tokens": self._count(current),
+                "tweets": len(current),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            }
+
+        started = time.perf_counter()
+        current = [
+            tweet.model_copy(
+                update={
+                    "author": " ".join(tweet.author.split()),
+                    "content": self.normalize_text(tweet.content),
+                    "timestamp": tweet.timestamp.strip(),
+                }
+            )
+            for tweet in current
+        ]
+        measure("normalize", started)
+
+        started = time.perf_counter()
+        current = [self._compact_urls(tweet) for tweet in current]
+        measure("urls", started)
+
+        started = time.perf_counter()
+        current = self._dedupe(current)
+        measure("dedupe", started)
+
+        started = time.perf_counter()
+        current = self._fit_budget(current, budget, settings.compaction_max_tweet_tokens)
+        measure("budget", started)
+
+        tokens_after = steps["budget"]["tokens"]
+        max_tokens = self.pick_max_tokens(tokens_after, max_output_tokens)
+        stats = {
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "tokens_saved": tokens_before - tokens_after,
+            "tweets_before": len(tweets),
+            "tweets_after": len(current),
+            "max_tokens": max_tokens,
+            "steps": steps,
+        }
+
+        self.requests += 1
+        self.total_tokens_before += tokens_before
+        self.total_tokens_saved += stats["tokens_saved"]
+
+        logger.info(
+            "Tweets compacted",
+            tokens_before=tokens_before,
+            tokens_after=tokens_after,
+            tweets_before=len(tweets),
+            tweets_after=len(current),
+            max_tokens=max_tokens,
+        )
+        return CompactionResult(current, max_tokens, stats)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cumulative compaction statistics."""
+        return {
+            "requests": self.requests,
+            "tokens_before": self.total_tokens_before,
+            "tokens_saved": self.total_tokens_saved,
+            "saved_ratio": (
+                round(self.total_tokens_saved / self.total_tokens_before * 100, 2)
+                if self.total_tokens_before
+                else 0
+            ),
+        }
+
+
+# Global tweet compactor instance
+tweet_compactor = TweetCompactor(claude_client.format_tweet)
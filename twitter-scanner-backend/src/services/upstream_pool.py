@@ -0,0 +1,308 @@
+"""Pool of Claude API credentials/endpoints with per-key rate-limit tracking."""
+
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional
+import sys
+import os
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from core.logging_config import get_logger
+
+logger = get_logger("upstream_pool")
+
+RATE_LIMIT_HEADER_PREFIX = "anthropic-ratelimit-"
+
+
+class NoUpstreamAvailableError(Exception):
+    """Raised when every upstream endpoint is ejected or out of budget."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"No upstream available, retry after {retry_after:.0f}s")
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """Parse an RFC 3339 rate-limit reset header into epoch seconds."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class RateLimitBudget:
+    """Remaining budget of one rate limit, from headers plus local spending."""
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+
+    def update(self, headers: Mapping[str, str], name: str):
+        """Refresh from the anthropic-ratelimit-{name}-* response headers."""
+        remaining = headers.get(f"{RATE_LIMIT_HEADER_PREFIX}{name}-remaining")
+        if remaining is None:
+            return
+        try:
+            self.remaining = int(remaining)
+            self.limit = int(headers.get(f"{RATE_LIMIT_HEADER_PREFIX}{name}-limit", 0)) or None
+        except ValueError:
+            return
+        self.reset_at = _parse_reset(headers.get(f"{RATE_LIMIT_HEADER_PREFIX}{name}-reset"))
+
+    def current(self) -> Optional[int]:
+        """Remaining budget, or None if unknown or the window has reset."""
+        if self.remaining is None:
+            return None
+        if self.reset_at is not None and time.time() >= self.reset_at:
+            return None
+        return self.remaining
+
+    def spend(self, amount: int):
+        """Deduct locally until the next response reports the real value."""
+        if self.current() is not None:
+            self.remaining = max(0, self.remaining - amount)
+
+    def utilization(self) -> Optional[float]:
+        """Fraction of the limit used in the current window."""
+        current = self.current()
+        if current is None or not self.limit:
+            return None
+        return 1 - current / self.limit
+
+
+class UpstreamEndpoint:
+    """One API key + URL pair and its health and rate-limit state."""
+
+    def __init__(self, name: str, api_key: str, api_url: str):
+        self.name = name
+        self.api_key = api_key
+        self.api_url = api_url
+        self.requests_budget = RateLimitBudget()
+        self.tokens_budget = RateLimitBudget()
+
+        self.in_flight = 0
+        self.ejected_until = 0.0
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.throttled = 0
+        self.total_latency = 0.0
+
+    def is_ejected(self, now: float) -> bool:
+        """Whether the endpoint is out of rotation at monotonic time now."""
+        return now < self.ejected_until
+
+    def has_budget(self, estimated_tokens: int) -> bool:
+        """Whether the last known rate-limit budget covers one more call."""
+        requests_left = self.requests_budget.current()
+        tokens_left = self.tokens_budget.current()
+        return (requests_left is None or requests_left > 0) and (
+            tokens_left is None or tokens_left >= estimated_tokens
+        )
+
+    def available_in(self, now: float, estimated_tokens: int) -> float:
+        """Seconds until this endpoint can take a call again."""
+        wait = max(0.0, self.ejected_until - now)
+        if not self.has_budget(estimated_tokens):
+            resets = [
+                budget.reset_at
+                for budget in (self.requests_budget, self.tokens_budget)
+                if budget.reset_at
+            ]
+            wait = max(
+                wait,
+                min(resets) - time.time() if resets else settings.upstream_ejection_seconds,
+            )
+        return wait
+
+    def load(self) -> float:
+        """Selection score: in-flight calls weighted by rate-limit utilization."""
+        utilization = max(
+            self.requests_budget.utilization() or 0.0,
+            self.tokens_budget.utilization() or 0.0,
+        )
+        return (self.in_flight + 1) * (1 + utilization)
+
+    def eject(self, seconds: float, reason: str):
+        """Take the endpoint out of rotation for a while."""
+        self.ejected_until = max(self.ejected_until, time.monotonic() + seconds)
+        logger.warning(
+            "Upstream endpoint ejected",
+            endpoint=self.name,
+            reason=reason,
+            seconds=round(seconds, 2),
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get health and utilization of this endpoint."""
+        now = time.monotonic()
+        utilization = max(
+            self.requests_budget.utilization() or 0.0,
+            self.tokens_budget.utilization() or 0.0,
+        )
+        completed = self.successes + self.failures
+        return {
+            "name": self.name,
+            "api_url": self.api_url,
+            "healthy": not self.is_ejected(now),
+            "ejected_for_s": round(max(0.0, self.ejected_until - now), 2),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "throttled": self.throttled,
+            "requests_remaining": self.requests_budget.current(),
+            "requests_limit": self.requests_budget.limit,
+            "tokens_remaining": self.tokens_budget.current(),
+            "tokens_limit": self.tokens_budget.limit,
+            "utilization": round(utilization * 100, 2),
+            "avg_latency_ms": (
+                round(self.total_latency / completed * 1000, 2) if completed else None
+            ),
+        }
+
+
+class UpstreamLease:
+    """One call routed to an endpoint; reports the outcome back to it."""
+
+    def __init__(self, endpoint: UpstreamEndpoint):
+        self.endpoint = endpoint
+        self.started_at = time.monotonic()
+
+    def record_response(
+        self,
+        status_code: int,
+        headers: Mapping[str, str],
+        retry_after: Optional[float] = None,
+    ):
+        """Update budgets from the response and eject the key if it was throttled."""
+        endpoint = self.endpoint
+        endpoint.total_latency += time.monotonic() - self.started_at
+        endpoint.requests_budget.update(headers, "requests")
+        if f"{RATE_LIMIT_HEADER_PREFIX}input-tokens-remaining" in headers:
+            endpoint.tokens_budget.update(headers, "input-tokens")
+        else:
+            endpoint.tokens_budget.update(headers, "tokens")
+
+        if status_code == 429:
+            endpoint.throttled += 1
+            endpoint.failures += 1
+            endpoint.eject(
+                retry_after if retry_after is not None else settings.upstream_ejection_seconds,
+                "rate_limited",
+            )
+        elif status_code >= 500:
+            self.record_failure(f"status_{status_code}")
+        else:
+            endpoint.successes += 1
+            endpoint.consecutive_failures = 0
+
+    def record_failure(self, reason: str):
+        """Count a server error or network failure; eject after repeated failures."""
+        endpoint = self.endpoint
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures >= settings.upstream_ejection_failure_threshold:
+            endpoint.consecutive_failures = 0
+            endpoint.eject(settings.upstream_ejection_seconds, reason)
+
+
+class UpstreamPool:
+    """Route calls across API keys and endpoints, preferring the least loaded."""
+
+    def __init__(self, endpoints: List[UpstreamEndpoint]):
+        if not endpoints:
+            raise ValueError("CLAUDE_API_KEY environment variable is not set")
+        self.endpoints = endpoints
+
+    @classmethod
+    def from_settings(cls) -> "UpstreamPool":
+        """
+        Build the pool from CLAUDE_API_KEYS / CLAUDE_API_URLS.
+
+        Both are comma-separated and fall back to CLAUDE_API_KEY and
+        CLAUDE_API_URL. A single key or URL is shared by all entries of
+        the other list; otherwise keys and URLs are paired in order.
+        """
+        keys = [k.strip() for k in settings.claude_api_keys.split(",") if k.strip()]
+        urls = [u.strip() for u in settings.claude_api_urls.split(",") if u.strip()]
+        keys = keys or ([settings.claude_api_key] if settings.claude_api_key else [])
+        urls = urls or [settings.claude_api_url]
+
+        if len(keys) > 1 and len(urls) > 1 and len(keys) != len(urls):
+            raise ValueError("CLAUDE_API_URLS must list one URL or one URL per key")
+        count = max(len(keys), len(urls)) if keys else 0
+        endpoints = [
+            UpstreamEndpoint(
+                name=f"upstream_{i + 1} (...{keys[i % len(keys)][-4:]})",
+                api_key=keys[i % len(keys)],
+                api_url=urls[i % len(urls)],
+            )
+            for i in range(count)
+        ]
+        return cls(endpoints)
+
+    @property
+    def primary(self) -> UpstreamEndpoint:
+        """First configured endpoint (used for calls that must stick to one key)."""
+        return self.endpoints[0]
+
+    def time_until_available(self, estimated_tokens: int = 0) -> float:
+        """Seconds until at least one endpoint can take a call."""
+        now = time.monotonic()
+        return min(
+            endpoint.available_in(now, estimated_tokens) for endpoint in self.endpoints
+        )
+
+    def select(self, estimated_tokens: int = 0) -> UpstreamEndpoint:
+        """
+        Pick the least-loaded endpoint that is not ejected and has budget left.
+
+        Raises:
+            NoUpstreamAvailableError: If every endpoint is ejected or exhausted
+        """
+        now = time.monotonic()
+        candidates = [
+            endpoint
+            for endpoint in self.endpoints
+            if not endpoint.is_ejected(now) and endpoint.has_budget(estimated_tokens)
+        ]
+        if not candidates:
+            raise NoUpstreamAvailableError(
+                max(1.0, self.time_until_available(estimated_tokens))
+            )
+        return min(candidates, key=lambda endpoint: endpoint.load())
+
+    @contextmanager
+    def lease(self, estimated_tokens: int = 0):
+        """
+        Route one call to an endpoint.
+
+        Yields:
+            UpstreamLease whose endpoint supplies the key and URL
+
+        Raises:
+            NoUpstreamAvailableError: If every endpoint is ejected or exhausted
+        """
+        endpoint = self.select(estimated_tokens)
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        endpoint.requests_budget.spend(1)
+        endpoint.tokens_budget.spend(estimated_tokens)
+        try:
+            yield UpstreamLease(endpoint)
+        finally:
+            endpoint.in_flight -= 1
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Get per-endpoint health and utilization."""
+        return [endpoint.get_stats() for endpoint in self.endpoints]
@@ -0,0 +1,94 @@
+"""Usage cost model: free tier quota units per analysis."""
+
+from typing import Any, Dict, Optional
+import sys
+import os
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from services.tweet_compactor import CompactionResult
+from utils.tokens import estimate_tokens
+
+
+class UsageCostModel:
+    """
+    Price analyses in quota units instead of counting requests.
+
+    cost = base + per_tweet * tweets
+         + per_1k_input * input_tokens / 1000
+         + per_1k_output * output_tokens / 1000
+
+    Before the call the input tokens are estimated from the compacted
+    tweets' content and the output tokens are the output budget, so the
+    reservation is an upper bound; after the call the reservation is
+    reconciled against the tokens Claude reports.
+    """
+
+    def __init__(
+        self,
+        base: float,
+        per_tweet: float,
+        per_1k_input_tokens: float,
+        per_1k_output_tokens: float,
+    ):
+        self.base = base
+        self.per_tweet = per_tweet
+        self.per_1k_input_tokens = per_1k_input_tokens
+        self.per_1k_output_tokens = per_1k_output_tokens
+
+    def cost(self, tweet_count: int, input_tokens: int, output_tokens: int) -> float:
+        """Cost in quota units of one analysis."""
+        return round(
+            self.base
+            + self.per_tweet * tweet_count
+            + self.per_1k_input_tokens * input_tokens / 1000
+            + self.per_1k_output_tokens * output_tokens / 1000,
+            4,
+        )
+
+    def estimate(
+        self, compaction: CompactionResult, system_prompt: Optional[str] = None
+    ) -> float:
+        """
+        Units to reserve before calling Claude.
+
+        Args:
+            compaction: Compacted tweets with their token estimate and output budget
+            system_prompt: Custom system prompt, if any (counted as input)
+        """
+        input_tokens = compaction.stats["tokens_after"]
+        if system_prompt:
+            input_tokens += estimate_tokens(system_prompt)
+        return self.cost(len(compaction.tweets), input_tokens, compaction.max_tokens)
+
+    def actual(self, tweet_count: int, usage: Optional[Dict[str, Any]]) -> float:
+        """
+        Units actually consumed, from the token usage reported by Claude.
+
+        Args:
+            tweet_count: Tweets sent after compaction
+            usage: Token usage summed over the upstream call(s)
+        """
+        usage = usage or {}
+        input_tokens = (
+            (usage.get("input_tokens") or 0)
+            + (usage.get("cache_read_input_tokens") or 0)
+            + (usage.get("cache_creation_input_tokens") or 0)
+        )
+        return self.cost(tweet_count, input_tokens, usage.get("output_tokens") or 0)
+
+    def cache_hit(self, tweet_count: int) -> float:
+        """Units charged for a cached result (no upstream tokens)."""
+        return self.cost(tweet_count, 0, 0)
+
+
+# Global usage cost model
+usage_cost_model = UsageCostModel(
+    base=settings.usage_cost_base,
+    per_tweet=settings.usage_cost_per_tweet,
+    per_1k_input_tokens=settings.usage_cost_per_1k_input_tokens,
+    per_1k_output_tokens=settings.usage_cost_per_1k_output_tokens,
+)
@@ -0,0 +1,263 @@
+"""Write-behind recorder for usage statistics."""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import sys
+import os
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from core.config import settings
+from core.database import UsageStatsDB
+from core.logging_config import get_logger
+from services.retry_policy import RetryPolicy
+
+logger = get_logger("usage_recorder")
+
+OVERFLOW_DROP = "drop"
+OVERFLOW_BLOCK = "block"
+# Give up on a batch once retrying it would take longer than this
+FLUSH_RETRY_DEADLINE = 60.0
+# Shutdown flushes share this retry window so stop() cannot hang on a down database
+SHUTDOWN_FLUSH_DEADLINE = 5.0
+
+
+class UsageRecorder:
+    """
+    Queue usage records in process and write them to MySQL in batches.
+
+    Handlers only enqueue; a background flusher writes a batch once
+    batch_size records are waiting or flush_interval has passed since the
+    oldest one. When the queue is full the overflow policy applies:
+        drop: discard the new record (counted in dropped)
+        block: the handler waits for room (backpressure on requests)
+    A batch that fails to write is retried with backoff and only dropped
+    once the retries run out; while it is retried new records wait in the
+    (bounded) queue. Remaining records are flushed on shutdown with a
+    short retry window.
+    """
+
+    def __init__(
+        self,
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        overflow: str = OVERFLOW_DROP,
+        max_retries: int = 3,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 10.0,
+    ):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.retry_policy = RetryPolicy(
+            max_retries=max_retries,
+            base_delay=retry_base_delay,
+            max_delay=retry_max_delay,
+            deadline=FLUSH_RETRY_DEADLINE,
+        )
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        # Records the flusher took off the queue but had not written when stopped
+        self.unwritten: List[Dict[str, Any]] = []
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self.flushes = 0
+        self.total_flush_time = 0.0
+        self.max_flush_time = 0.0
+        self.last_flush_time = 0.0
+        self.max_batch_size = 0
+        self.last_flush_error: Optional[str] = None
+
+    def _get_queue(self) -> asyncio.Queue:
+        # Created lazily so it binds to the running event loop
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue)
+        return self.queue
+
+    async def record(self, **fields: Any):
+        """
+        Queue one usage record (columns of usage_statistics).
+
+        created_at is stamped now, so rows keep the request time however
+        late they are flushed.
+        """
+        fields.setdefault("created_at", datetime.now())
+        queue = self._get_queue()
+        try:
+            queue.put_nowait(fields)
+        except asyncio.QueueFull:
+            if self.overflow != OVERFLOW_BLOCK:
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    logger.warning(
+                        "Usage record queue full, dropping records",
+                        dropped=self.dropped,
+                        max_queue=self.max_queue,
+                    )
+                return
+            self.blocked += 1
+            await queue.put(fields)
+        self.enqueued += 1
+
+    async def start(self):
+        """Start the background flusher."""
+        if self.task is None:
+            self._get_queue()
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the flusher and write every record still queued.
+
+        All shutdown flushes share one SHUTDOWN_FLUSH_DEADLINE retry window;
+        once it has passed, each remaining batch gets a single attempt.
+        """
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        shutdown_deadline_at = time.monotonic() + SHUTDOWN_FLUSH_DEADLINE
+        batch, self.unwritten = self.unwritten, []
+        while True:
+            if self.queue is not None and len(batch) < self.batch_size:
+                self._take(self.batch_size, batch)
+            if not batch:
+                break
+            await self.flush(
+                batch, deadline=max(0.0, shutdown_deadline_at - time.monotonic())
+            )
+            batch = []
+
+    def _take(self, limit: int, batch: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Move up to limit queued records into batch without waiting."""
+        batch = [] if batch is None else batch
+        while len(batch) < limit and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        """Collect batches by size or interval until cancelled."""
+        loop = asyncio.get_running_loop()
+        batch: List[Dict[str, Any]] = []
+        try:
+            while True:
+                batch = [await self.queue.get()]
+                deadline = loop.time() + self.flush_interval
+                while len(self._take(self.batch_size, batch)) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                await self.flush(batch)
+                batch = []
+        except asyncio.CancelledError:
+            # Records taken off the queue but not yet written (possibly
+            # cancelled mid-retry); stop() writes them with its own deadline
+            self.unwritten = batch
+            raise
+
+    async def flush(self, batch: List[Dict[str, Any]], deadline: Optional[float] = None):
+        """
+        Write one batch, retrying failed writes with backoff.
+
+        Failures are counted and logged, never raised; the batch is only
+        dropped once the retry policy is exhausted.
+
+        Args:
+            batch: Records to write
+            deadline: Retry window in seconds (defaults to FLUSH_RETRY_DEADLINE;
+                0 allows a single attempt)
+        """
+        if not batch:
+            return
+        started = time.perf_counter()
+        retry_state = self.retry_policy.start(deadline=deadline)
+        while True:
+            attempt = retry_state.next_attempt()
+            try:
+                await UsageStatsDB.add_usage_records(batch)
+                self.written += len(batch)
+                self.last_flush_error = None
+                break
+            except Exception as e:
+                self.last_flush_error = str(e) or type(e).__name__
+                delay = retry_state.next_delay()
+                if delay is None:
+                    self.failed += len(batch)
+                    logger.error(
+                        "Failed to write usage records, dropping batch",
+                        records=len(batch),
+                        attempts=attempt,
+                        error=self.last_flush_error,
+                    )
+                    break
+                self.retries += 1
+                logger.warning(
+                    "Failed to write usage records, retrying",
+                    records=len(batch),
+                    attempt=attempt,
+                    retry_in_seconds=round(delay, 2),
+                    error=self.last_flush_error,
+                )
+                await asyncio.sleep(delay)
+        elapsed = time.perf_counter() - started
+        self.flushes += 1
+        self.total_flush_time += elapsed
+        self.last_flush_time = elapsed
+        self.max_flush_time = max(self.max_flush_time, elapsed)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue, batch and flush latency statistics."""
+        return {
+            "overflow_policy": self.overflow,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "blocked": self.blocked,
+            "flushes": self.flushes,
+            "avg_batch_size": (
+                round((self.written + self.failed) / self.flushes, 2)
+                if self.flushes
+                else None
+            ),
+            "max_batch_size": self.max_batch_size,
+            "avg_flush_ms": (
+                round(self.total_flush_time / self.flushes * 1000, 2)
+                if self.flushes
+                else None
+            ),
+            "last_flush_ms": round(self.last_flush_time * 1000, 2),
+            "max_flush_ms": round(self.max_flush_time * 1000, 2),
+            "last_flush_error": self.last_flush_error,
+        }
+
+
+# Global usage recorder
+usage_recorder = UsageRecorder(
+    max_queue=settings.usage_recorder_queue_size,
+    batch_size=settings.usage_recorder_batch_size,
+    flush_interval=settings.usage_recorder_flush_interval,
+    overflow=settings.usage_recorder_overflow,
+    max_retries=settings.usage_recorder_max_retries,
+    retry_base_delay=settings.usage_recorder_retry_base_delay,
+    retry_max_delay=settings.usage_recorder_retry_max_delay,
+)
@@ -0,0 +1,157 @@
+"""Constant-memory rate limiting algorithms with idle-key eviction."""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Type
+
+# Expired keys evicted per check; each key is evicted once, so this keeps
+# eviction amortized O(1) while bounding the work done by a single call
+EVICTIONS_PER_CALL = 64
+
+
+class RateLimitAlgorithm:
+    """
+    Base for per-key algorithms with O(1) time and state per key.
+
+    Keys are kept in last-update order, so expired keys gather at the
+    front and are evicted lazily a few at a time on every check.
+    """
+
+    name = ""
+
+    def __init__(self, max_requests: int, window: float):
+        self.max_requests = max_requests
+        self.window = window
+        self.state: "OrderedDict[str, Any]" = OrderedDict()
+        self.evictions = 0
+
+    def _check(self, key: str, now: float) -> Tuple[bool, float]:
+        """Check and record one request; returns (allowed, retry_after)."""
+        raise NotImplementedError
+
+    def _is_expired(self, value: Any, now: float) -> bool:
+        """Whether a key's state is equivalent to never having seen it."""
+        raise NotImplementedError
+
+    def _store(self, key: str, value: Any):
+        """Save a key's state and mark it most recently updated."""
+        self.state[key] = value
+        self.state.move_to_end(key)
+
+    def allow(self, key: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """
+        Check and record a request for the given key.
+
+        Args:
+            key: Client key
+            now: Monotonic time in seconds (defaults to time.monotonic())
+
+        Returns:
+            Tuple of (is_allowed, retry_after_seconds); retry_after is 0 if allowed
+        """
+        now = time.monotonic() if now is None else now
+        self.evict_expired(now, EVICTIONS_PER_CALL)
+        return self._check(key, now)
+
+    def evict_expired(self, now: Optional[float] = None, limit: Optional[int] = None) -> int:
+        """
+        Drop keys whose state has expired, oldest first.
+
+        Args:
+            now: Monotonic time in seconds (defaults to time.monotonic())
+            limit: Maximum number of keys to evict (None for all)
+
+        Returns:
+            Number of keys evicted
+        """
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        while self.state and (limit is None or evicted < limit):
+            value = next(iter(self.state.values()))
+            if not self._is_expired(value, now):
+                break
+            self.state.popitem(last=False)
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get key count and eviction statistics."""
+        return {
+            "algorithm": self.name,
+            "keys": len(self.state),
+            "evictions": self.evictions,
+        }
+
+
+class GCRA(RateLimitAlgorithm):
+    """
+    Generic cell rate algorithm: one float per key.
+
+    Each key stores its theoretical arrival time (TAT). Requests are spaced
+    window / max_requests apart, with bursts of up to max_requests allowed.
+    Since the TAT never runs more than one window ahead of the last update,
+    the key order is also a bound on expiry.
+    """
+
+    name = "gcra"
+
+    def __init__(self, max_requests: int, window: float):
+        super().__init__(max_requests, window)
+        self.emission_interval = window / max_requests
+        self.tolerance = window - self.emission_interval
+
+    def _check(self, key: str, now: float) -> Tuple[bool, float]:
+        tat = max(self.state.get(key, now), now)
+        if tat - now > self.tolerance:
+            return False, tat - self.tolerance - now
+        self._store(key, tat + self.emission_interval)
+        return True, 0.0
+
+    def _is_expired(self, value: float, now: float) -> bool:
+        return value <= now
+
+
+class SlidingWindowCounter(RateLimitAlgorithm):
+    """
+    Sliding window approximated from two fixed-window counters.
+
+    Each key stores (window index, current count, previous count). The
+    previous window's count is weighted by how much of it still overlaps
+    the sliding window.
+    """
+
+    name = "sliding_window"
+
+    def _check(self, key: str, now: float) -> Tuple[bool, float]:
+        index, elapsed = divmod(now, self.window)
+        current = previous = 0
+        stored = self.state.get(key)
+        if stored is not None:
+            if stored[0] == index:
+                _, current, previous = stored
+            elif stored[0] == index - 1:
+                previous = stored[1]
+
+        weight = 1 - elapsed / self.window
+        if previous * weight + current + 1 > self.max_requests:
+            # Time (from this window's start) when the estimate drops enough
+            limit = self.max_requests - 1
+            if current <= limit and previous:
+                ready_at = self.window * (1 - (limit - current) / previous)
+            else:
+                ready_at = self.window * (2 - limit / max(current, 1))
+            return False, max(0.0, ready_at - elapsed)
+
+        self._store(key, (index, current + 1, previous))
+        return True, 0.0
+
+    def _is_expired(self, value: Tuple[float, int, int], now: float) -> bool:
+        return value[0] < now // self.window - 1
+
+
+# Algorithms selectable through RATE_LIMIT_ALGORITHM
+RATE_LIMIT_ALGORITHMS: Dict[str, Type[RateLimitAlgorithm]] = {
+    GCRA.name: GCRA,
+    SlidingWindowCounter.name: SlidingWindowCounter,
+}
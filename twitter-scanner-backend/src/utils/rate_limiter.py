@@ -1,9 +1,14 @@
 """Rate limiting and usage tracking for Twitter Scanner Backend."""
 
+import asyncio
+import json
+import math
 import time
 import hashlib
-from typing import Dict, Optional, Tuple
-from datetime import datetime, timedelta
+import tempfile
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+from datetime import datetime
 from fastapi import Request
 import sys
 import os
@@ -14,17 +19,82 @@ sys.path.append(
 
 from core.config import settings
 from core.logging_config import get_logger
+from utils.rate_limit_algorithms import RATE_LIMIT_ALGORITHMS
 
 logger = get_logger("rate_limiter")
 
+T = TypeVar("T")
+
+# Sliding-window log check and record in one round trip. Uses Redis server
+# time so instances with skewed clocks share one window.
+# Returns -1 if allowed, otherwise milliseconds until the oldest entry expires.
+SLIDING_WINDOW_SCRIPT = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local window_ms = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now_ms - window_ms)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], now_ms, now_ms .. '-' .. ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window_ms)
+    return -1
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return tonumber(oldest[2]) + window_ms - now_ms
+"""
+
+# Add (or with ARGV[4] = 1, reserve) usage units; the first charge starts
+# the client's window. Refunds and zero settlements never create a window.
+# A reservation is denied once the window is used up or cannot cover
+# delta, so a zero-unit reservation is an atomic admission check.
+# Floats are returned as strings since Lua numbers are truncated to integers.
+# Returns {allowed, usage, remaining, limit, milliseconds until the window
+# ends}, so callers never need a second read for the usage info.
+USAGE_ADD_SCRIPT = """
+local delta = tonumber(ARGV[1])
+local limit = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local function result(allowed, count)
+    return {allowed, tostring(count), tostring(math.max(0, limit - count)),
+            ARGV[3], redis.call('PTTL', KEYS[1])}
+end
+if delta <= 0 and redis.call('EXISTS', KEYS[1]) == 0 then
+    return result(1, 0)
+end
+if ARGV[4] == '1' and current > 0 and (current >= limit or current + delta > limit) then
+    return result(0, current)
+end
+local count = tonumber(redis.call('INCRBYFLOAT', KEYS[1], delta))
+if count < 0 then
+    count = 0
+    redis.call('SET', KEYS[1], '0', 'KEEPTTL')
+end
+if redis.call('PTTL', KEYS[1]) < 0 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return result(1, count)
+"""
+
+
+class RateLimiterUnavailableError(Exception):
+    """Raised when the shared limiter is unreachable and the policy is fail-closed."""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"Rate limiter unavailable, retry after {retry_after}s")
 
-class MemoryRateLimiter:
-    """In-memory rate limiter for API requests."""
 
-    def __init__(self, max_requests: int = 100, window_ms: int = 900000):
+class MemoryRateLimiter:
+    """In-memory rate limiter for API requests (O(1) time and state per key)."""
+
+    def __init__(
+        self,
+        max_requests: int = 100,
+        window_ms: int = 900000,
+        algorithm: str = "sliding_window",
+    ):
         self.max_requests = max_requests
         self.window_ms = window_ms
-        self.requests: Dict[str, list] = {}
+        self.algorithm = RATE_LIMIT_ALGORITHMS[algorithm](max_requests, window_ms / 1000)
 
     def is_allowed(self, key: str) -> Tuple[bool, Optional[int]]:
         """
@@ -33,97 +103,418 @@ class MemoryRateLimiter:
         Returns:
             Tuple of (is_allowed, retry_after_seconds)
         """
-        now = time.time() * 1000  # Convert to milliseconds
-        window_start = now - self.window_ms
+        allowed, retry_after = self.algorithm.allow(key)
+        if allowed:
+            return True, None
+        return False, max(1, math.ceil(retry_after))
 
-        # Clean old requests
-        if key in self.requests:
-            self.requests[key] = [
-                req_time for req_time in self.requests[key] if req_time > window_start
-            ]
-        else:
-            self.requests[key] = []
+    def get_stats(self) -> Dict[str, Any]:
+        """Get key count and eviction statistics."""
+        return self.algorithm.get_stats()
 
-        # Check if under limit
-        if len(self.requests[key]) < self.max_requests:
-            self.requests[key].append(now)
-            return True, None
-        else:
-            # Calculate retry after time
-            oldest_request = min(self.requests[key])
-            retry_after_ms = oldest_request + self.window_ms - now
-            retry_after_seconds = max(1, int(retry_after_ms / 1000))
-            return False, retry_after_seconds
+
+def format_usage(
+    count: float, limit: float, reset_at: float, remaining: Optional[float] = None
+) -> Dict[str, Any]:
+    """Usage info in cost units, rounded for display."""
+    if remaining is None:
+        remaining = max(0, limit - count)
+    return {
+        "usage": round(count, 2),
+        "limit": limit,
+        "remaining": round(remaining, 2),
+        "reset_time": datetime.fromtimestamp(reset_at).isoformat(),
+    }
 
 
 class UsageTracker:
-    """Track usage for free tier limits."""
+    """
+    Track usage for free tier limits.
+
+    Each client gets its own rolling window, anchored at its first request
+    in the window, so quotas do not all refresh at the same moment. Live
+    windows can be snapshotted to disk and restored on startup so a restart
+    does not hand every client a fresh quota.
 
-    def __init__(self, max_usage: int = 50, reset_interval_hours: int = 24):
+    Windows are per process: the snapshot is meant for a single-process
+    deployment (or as the fallback state of one). Several processes sharing
+    a snapshot path each overwrite it with their own windows; use Redis for
+    usage shared between workers.
+    """
+
+    def __init__(self, max_usage: float = 50, reset_interval_hours: int = 24):
         self.max_usage = max_usage
         self.reset_interval_hours = reset_interval_hours
-        self.usage: Dict[str, Dict[str, any]] = {}
-        self.last_reset = datetime.now()
+        self.reset_interval = reset_interval_hours * 3600
+        # client_key -> {"count": cost units, "window_start": epoch seconds}
+        self.usage: Dict[str, Dict[str, Any]] = {}
         logger.info(
             "Usage tracker initialized",
             max_usage=max_usage,
             reset_interval_hours=reset_interval_hours,
         )
 
-    def _reset_if_needed(self):
-        """Reset usage counters if reset interval has passed."""
-        now = datetime.now()
-        if now - self.last_reset >= timedelta(hours=self.reset_interval_hours):
-            self.usage.clear()
-            self.last_reset = now
-            logger.info("Usage counters reset", timestamp=now.isoformat())
-
-    def get_usage(self, client_key: str) -> Dict[str, any]:
-        """Get current usage for client."""
-        self._reset_if_needed()
+    def _get_window(self, client_key: str, now: float) -> Optional[Dict[str, Any]]:
+        """Get the client's current window, dropping it if it has ended."""
+        window = self.usage.get(client_key)
+        if window is not None and now - window["window_start"] >= self.reset_interval:
+            del self.usage[client_key]
+            window = None
+        return window
 
-        if client_key not in self.usage:
-            self.usage[client_key] = {"count": 0, "first_request": datetime.now()}
+    def _format(self, count: float, reset_at: float) -> Dict[str, Any]:
+        return format_usage(count, self.max_usage, reset_at)
 
-        usage_count = self.usage[client_key]["count"]
-        return {
-            "usage": usage_count,
-            "limit": self.max_usage,
-            "remaining": max(0, self.max_usage - usage_count),
-            "reset_time": (
-                self.last_reset + timedelta(hours=self.reset_interval_hours)
-            ).isoformat(),
-        }
+    def get_usage(self, client_key: str) -> Dict[str, Any]:
+        """Get current usage for client."""
+        now = time.time()
+        window = self._get_window(client_key, now)
+        if window is None:
+            # No window yet: one would start (and end) from a request now
+            return self._format(0, now + self.reset_interval)
+        return self._format(
+            window["count"], window["window_start"] + self.reset_interval
+        )
 
     def is_usage_allowed(self, client_key: str) -> bool:
         """Check if client is under usage limit."""
         usage_info = self.get_usage(client_key)
         return usage_info["remaining"] > 0
 
-    def increment_usage(self, client_key: str) -> Dict[str, any]:
-        """Increment usage count for client."""
-        self._reset_if_needed()
-
-        if client_key not in self.usage:
-            self.usage[client_key] = {"count": 0, "first_request": datetime.now()}
+    def add_usage(self, client_key: str, units: float) -> Dict[str, Any]:
+        """
+        Add usage units for client, starting its window if needed.
 
-        self.usage[client_key]["count"] += 1
+        Negative units refund a reservation; refunds never go below zero
+        and are dropped if the window they belonged to has ended.
+        """
+        now = time.time()
+        window = self._get_window(client_key, now)
+        if window is None:
+            if units <= 0:
+                return self.get_usage(client_key)
+            window = self.usage[client_key] = {"count": 0, "window_start": now}
+        window["count"] = max(0, window["count"] + units)
         return self.get_usage(client_key)
 
+    def reserve_usage(self, client_key: str, units: float) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Reserve units if they fit in the remaining budget.
+
+        A request larger than the whole limit is admitted only as the
+        first charge in a window, so it can never be blocked forever.
+        Reserving zero units checks admission without charging.
+
+        Returns:
+            Tuple of (reserved, usage_info)
+        """
+        window = self._get_window(client_key, time.time())
+        count = window["count"] if window else 0
+        if count > 0 and (count >= self.max_usage or count + units > self.max_usage):
+            return False, self.get_usage(client_key)
+        return True, self.add_usage(client_key, units)
+
+    def evict_expired(self) -> int:
+        """Drop windows that have ended; returns the number dropped."""
+        cutoff = time.time() - self.reset_interval
+        expired = [
+            key for key, window in self.usage.items() if window["window_start"] <= cutoff
+        ]
+        for key in expired:
+            del self.usage[key]
+        return len(expired)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the live windows in snapshot form."""
+        self.evict_expired()
+        return {
+            "saved_at": time.time(),
+            "reset_interval": self.reset_interval,
+            "clients": {
+                key: [window["count"], window["window_start"]]
+                for key, window in self.usage.items()
+            },
+        }
+
+    def restore(self, snapshot: Dict[str, Any]) -> int:
+        """
+        Restore windows from a snapshot, skipping those that have ended.
+
+        Requests counted since startup are kept on top of the snapshot.
+
+        Returns:
+            Number of windows restored
+        """
+        cutoff = time.time() - self.reset_interval
+        restored = 0
+        for key, (count, window_start) in snapshot.get("clients", {}).items():
+            if window_start <= cutoff:
+                continue
+            window = self.usage.get(key)
+            if window is None:
+                self.usage[key] = {"count": count, "window_start": window_start}
+            else:
+                window["count"] += count
+                window["window_start"] = min(window["window_start"], window_start)
+            restored += 1
+        return restored
+
+
+def write_snapshot(path: str, snapshot: Dict[str, Any]):
+    """
+    Write a usage snapshot, replacing the file atomically.
+
+    The snapshot is written to a uniquely named temporary file next to the
+    target, so concurrent writers never write into each other's file; the
+    last completed write wins.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def read_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    """Read a usage snapshot, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RedisRateLimiter:
+    """Sliding-window rate limiter shared by all processes through Redis."""
+
+    def __init__(self, redis, max_requests: int, window_ms: int, prefix: str):
+        self.max_requests = max_requests
+        self.window_ms = window_ms
+        self.prefix = prefix
+        self.script = redis.register_script(SLIDING_WINDOW_SCRIPT)
+
+    async def is_allowed(self, key: str) -> Tuple[bool, Optional[int]]:
+        """
+        Check and record a request for the given key atomically.
+
+        Returns:
+            Tuple of (is_allowed, retry_after_seconds)
+        """
+        retry_after_ms = await self.script(
+            keys=[f"{self.prefix}requests:{key}"],
+            args=[self.window_ms, self.max_requests, uuid.uuid4().hex[:12]],
+        )
+        if retry_after_ms < 0:
+            return True, None
+        return False, max(1, int(retry_after_ms / 1000))
+
+
+class RedisUsageTracker:
+    """
+    Free tier usage counters shared by all processes through Redis.
+
+    Each counter expires one reset interval after the client's first
+    charge, giving every client its own rolling window.
+    """
+
+    def __init__(self, redis, max_usage: float, reset_interval_hours: int, prefix: str):
+        self.redis = redis
+        self.max_usage = max_usage
+        self.reset_interval = reset_interval_hours * 3600
+        self.prefix = prefix
+        self.add_script = redis.register_script(USAGE_ADD_SCRIPT)
+
+    def _key(self, client_key: str) -> str:
+        return f"{self.prefix}usage:{client_key}"
+
+    def _format(
+        self, count: float, ttl_ms: int, remaining: Optional[float] = None
+    ) -> Dict[str, Any]:
+        # No window yet (or no expiry): one would start from a request now
+        remaining_seconds = ttl_ms / 1000 if count and ttl_ms > 0 else self.reset_interval
+        return format_usage(
+            count, self.max_usage, time.time() + remaining_seconds, remaining
+        )
+
+    async def _add(self, client_key: str, units: float, reserve: bool) -> Tuple[bool, Dict[str, Any]]:
+        allowed, count, remaining, _, ttl_ms = await self.add_script(
+            keys=[self._key(client_key)],
+            args=[units, self.reset_interval * 1000, self.max_usage, int(reserve)],
+        )
+        return bool(allowed), self._format(float(count), int(ttl_ms), float(remaining))
+
+    async def get_usage(self, client_key: str) -> Dict[str, Any]:
+        """Get current usage for client."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            key = self._key(client_key)
+            count, ttl_ms = await pipe.get(key).pttl(key).execute()
+        return self._format(float(count or 0), ttl_ms)
+
+    async def add_usage(self, client_key: str, units: float) -> Dict[str, Any]:
+        """Add (or refund, with negative units) usage units for client."""
+        _, usage_info = await self._add(client_key, units, reserve=False)
+        return usage_info
+
+    async def reserve_usage(self, client_key: str, units: float) -> Tuple[bool, Dict[str, Any]]:
+        """Reserve units atomically if they fit in the remaining budget."""
+        return await self._add(client_key, units, reserve=True)
+
 
 class RateLimitManager:
-    """Manages rate limiting and usage tracking."""
+    """
+    Manages rate limiting and usage tracking.
+
+    With REDIS_URL set (and RATE_LIMIT_USE_REDIS), limits and usage are
+    shared by all workers and instances. While Redis is unreachable the
+    per-process limiters take over; with RATE_LIMIT_FAILURE_MODE=closed
+    new requests are rejected instead until Redis answers again.
+    """
 
     def __init__(self):
         self.rate_limiter = MemoryRateLimiter(
             max_requests=settings.max_requests_per_ip,
             window_ms=settings.rate_limit_window_ms,
+            algorithm=settings.rate_limit_algorithm,
         )
         self.usage_tracker = UsageTracker(
             max_usage=settings.max_free_usage_per_ip,
             reset_interval_hours=settings.usage_reset_interval_hours,
         )
 
+        self._redis = None
+        self.redis_rate_limiter: Optional[RedisRateLimiter] = None
+        self.redis_usage_tracker: Optional[RedisUsageTracker] = None
+        if settings.redis_url and settings.rate_limit_use_redis:
+            import redis.asyncio as redis_asyncio
+
+            self._redis = redis_asyncio.from_url(
+                settings.redis_url,
+                decode_responses=True,
+                socket_timeout=settings.rate_limit_redis_timeout,
+                socket_connect_timeout=settings.rate_limit_redis_timeout,
+            )
+            self.redis_rate_limiter = RedisRateLimiter(
+                self._redis,
+                max_requests=settings.max_requests_per_ip,
+                window_ms=settings.rate_limit_window_ms,
+                prefix=settings.rate_limit_redis_prefix,
+            )
+            self.redis_usage_tracker = RedisUsageTracker(
+                self._redis,
+                max_usage=settings.max_free_usage_per_ip,
+                reset_interval_hours=settings.usage_reset_interval_hours,
+                prefix=settings.rate_limit_redis_prefix,
+            )
+
+        self.snapshot_task: Optional[asyncio.Task] = None
+        self.snapshots_saved = 0
+        self.snapshot_errors = 0
+        self.last_snapshot_at: Optional[float] = None
+        self.restored_windows = 0
+
+        self.redis_retry_at = 0.0
+        self.redis_failing = False
+        self.redis_errors = 0
+        self.local_fallbacks = 0
+        self.rejected_unavailable = 0
+
+    async def _call(
+        self,
+        redis_call: Optional[Callable[[], Awaitable[T]]],
+        local_call: Callable[[], T],
+        fail_closed: bool = False,
+    ) -> T:
+        """
+        Run against Redis, or the local limiter if Redis is off or unreachable.
+
+        Args:
+            redis_call: Redis operation (None when Redis is not configured)
+            local_call: Equivalent per-process operation
+            fail_closed: Whether this is an admission check that must be
+                rejected under RATE_LIMIT_FAILURE_MODE=closed
+
+        Raises:
+            RateLimiterUnavailableError: If Redis is unreachable and the
+                check fails closed
+        """
+        if redis_call is None:
+            return local_call()
+
+        now = time.monotonic()
+        if now >= self.redis_retry_at:
+            try:
+                result = await redis_call()
+                if self.redis_failing:
+                    self.redis_failing = False
+                    logger.info("Redis rate limiter recovered")
+                return result
+            except Exception as e:
+                self.redis_errors += 1
+                now = time.monotonic()
+                self.redis_retry_at = now + settings.rate_limit_redis_retry_seconds
+                if not self.redis_failing:
+                    self.redis_failing = True
+                    logger.warning(
+                        "Redis rate limiter unavailable, using local limits",
+                        error=str(e) or type(e).__name__,
+                        failure_mode=settings.rate_limit_failure_mode,
+                    )
+
+        if fail_closed and settings.rate_limit_failure_mode == "closed":
+            self.rejected_unavailable += 1
+            raise RateLimiterUnavailableError(
+                max(1, math.ceil(self.redis_retry_at - now))
+            )
+        self.local_fallbacks += 1
+        return local_call()
+
+    async def start(self):
+        """Restore local usage windows and start periodic snapshots."""
+        path = settings.usage_snapshot_path
+        if not path or self.snapshot_task is not None:
+            return
+        try:
+            started = time.monotonic()
+            snapshot = await asyncio.to_thread(read_snapshot, path)
+            if snapshot is not None:
+                self.restored_windows = self.usage_tracker.restore(snapshot)
+                logger.info(
+                    "Usage windows restored",
+                    path=path,
+                    restored=self.restored_windows,
+                    snapshot_age_seconds=round(time.time() - snapshot.get("saved_at", time.time())),
+                    duration_ms=round((time.monotonic() - started) * 1000, 2),
+                )
+        except Exception as e:
+            logger.error("Failed to restore usage snapshot", path=path, error=str(e))
+        self.snapshot_task = asyncio.create_task(self._snapshot_loop())
+
+    async def save_snapshot(self):
+        """Snapshot local usage windows to USAGE_SNAPSHOT_PATH."""
+        path = settings.usage_snapshot_path
+        if not path:
+            return
+        try:
+            # Copy on the event loop; only the file I/O runs in a thread
+            await asyncio.to_thread(write_snapshot, path, self.usage_tracker.snapshot())
+            self.snapshots_saved += 1
+            self.last_snapshot_at = time.time()
+        except Exception as e:
+            self.snapshot_errors += 1
+            logger.error("Failed to save usage snapshot", path=path, error=str(e))
+
+    async def _snapshot_loop(self):
+        """Save a snapshot every USAGE_SNAPSHOT_INTERVAL_SECONDS until cancelled."""
+        while True:
+            await asyncio.sleep(settings.usage_snapshot_interval_seconds)
+            await self.save_snapshot()
+
     def get_client_ip(self, request: Request) -> str:
         """Extract client IP address from request."""
         # Check for forwarded IP (behind proxy/load balancer)
@@ -156,30 +547,117 @@ class RateLimitManager:
         fingerprint = self.get_browser_fingerprint(request)
         return f"{client_ip}_{fingerprint}"
 
-    def check_rate_limit(self, request: Request) -> Tuple[bool, Optional[int]]:
-        """Check if request is within rate limits."""
+    async def check_rate_limit(self, request: Request) -> Tuple[bool, Optional[int]]:
+        """
+        Check if request is within rate limits (and count it if so).
+
+        Raises:
+            RateLimiterUnavailableError: If Redis is down and the policy is fail-closed
+        """
         client_ip = self.get_client_ip(request)
-        return self.rate_limiter.is_allowed(client_ip)
-
-    def check_usage_limit(self, request: Request) -> Tuple[bool, Dict[str, any]]:
-        """Check if request is within usage limits."""
-        client_key = self.get_client_key(request)
-        is_allowed = self.usage_tracker.is_usage_allowed(client_key)
-        usage_info = self.usage_tracker.get_usage(client_key)
-        return is_allowed, usage_info
-
-    def increment_usage(self, request: Request) -> Dict[str, any]:
-        """Increment usage for the client."""
-        client_key = self.get_client_key(request)
-        return self.usage_tracker.increment_usage(client_key)
-
-    def get_usage_stats(
-        self, request: Request, client_key: Optional[str] = None
+        return await self._call(
+            (lambda: self.redis_rate_limiter.is_allowed(client_ip)) if self.redis_rate_limiter else None,
+            lambda: self.rate_limiter.is_allowed(client_ip),
+            fail_closed=True,
+        )
+
+    async def reserve_usage(
+        self, request: Optional[Request], units: float, client_key: Optional[str] = None
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Reserve cost units before an upstream call.
+
+        This is the admission check: the budget is checked and charged in
+        one atomic call (zero units only checks), and the usage info comes
+        back with it.
+
+        Returns:
+            Tuple of (reserved, usage_info)
+
+        Raises:
+            RateLimiterUnavailableError: If Redis is down and the policy is fail-closed
+        """
+        if client_key is None:
+            client_key = self.get_client_key(request)
+        return await self._call(
+            (lambda: self.redis_usage_tracker.reserve_usage(client_key, units)) if self.redis_usage_tracker else None,
+            lambda: self.usage_tracker.reserve_usage(client_key, units),
+            fail_closed=True,
+        )
+
+    async def reconcile_usage(
+        self,
+        request: Optional[Request],
+        reserved: float,
+        actual: float,
+        client_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Settle a reservation against the units actually consumed (0 refunds it)."""
+        return await self.increment_usage(request, client_key, units=actual - reserved)
+
+    async def increment_usage(
+        self,
+        request: Optional[Request],
+        client_key: Optional[str] = None,
+        units: float = 1.0,
+    ) -> Dict[str, any]:
+        """
+        Add cost units for the client (by request, or by a stored client key).
+
+        Returns the updated usage info from the same call, so settling a
+        reservation (even at zero difference) needs no separate read.
+        """
+        if client_key is None:
+            client_key = self.get_client_key(request)
+        return await self._call(
+            (lambda: self.redis_usage_tracker.add_usage(client_key, units)) if self.redis_usage_tracker else None,
+            lambda: self.usage_tracker.add_usage(client_key, units),
+        )
+
+    async def get_usage_stats(
+        self, request: Optional[Request], client_key: Optional[str] = None
     ) -> Dict[str, any]:
         """Get usage statistics for client."""
         if client_key is None:
             client_key = self.get_client_key(request)
-        return self.usage_tracker.get_usage(client_key)
+        return await self._call(
+            (lambda: self.redis_usage_tracker.get_usage(client_key)) if self.redis_usage_tracker else None,
+            lambda: self.usage_tracker.get_usage(client_key),
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get rate limiter backend statistics."""
+        return {
+            "backend": "redis" if self.redis_rate_limiter else "memory",
+            "failure_mode": settings.rate_limit_failure_mode,
+            "redis_available": not self.redis_failing,
+            "redis_errors": self.redis_errors,
+            "local_fallbacks": self.local_fallbacks,
+            "rejected_unavailable": self.rejected_unavailable,
+            "local": self.rate_limiter.get_stats(),
+            "usage_windows": {
+                "local_clients": len(self.usage_tracker.usage),
+                "restored": self.restored_windows,
+                "snapshots_saved": self.snapshots_saved,
+                "snapshot_errors": self.snapshot_errors,
+                "last_snapshot_at": (
+                    datetime.fromtimestamp(self.last_snapshot_at).isoformat()
+                    if self.last_snapshot_at
+                    else None
+                ),
+            },
+        }
+
+    async def close(self):
+        """Save a final usage snapshot and close the Redis connection pool."""
+        if self.snapshot_task is not None:
+            self.snapshot_task.cancel()
+            await asyncio.gather(self.snapshot_task, return_exceptions=True)
+            self.snapshot_task = None
+            await self.save_snapshot()
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
 
 
 # Global rate limit manager instance
@@ -0,0 +1,27 @@
+"""Local token estimation helpers."""
+
+import re
+
+# CJK ideographs, kana and hangul are roughly one token per character
+_CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+
+# Average characters per token for Latin-script text
+CHARS_PER_TOKEN = 4.0
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of Claude tokens in a text without calling the API.
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Estimated token count (always at least 1 for non-empty text)
+    """
+    if not text:
+        return 0
+
+    cjk_chars = len(_CJK_PATTERN.findall(text))
+    other_chars = len(text) - cjk_chars
+    return max(1, cjk_chars + int(other_chars / CHARS_PER_TOKEN + 0.5))
@@ -42,6 +42,10 @@ if [ -f "logs/app.pid" ]; then
     fi
 fi
 
+# 执行数据库迁移
+echo "🗄️  执行数据库迁移..."
+python scripts/migrate.py upgrade
+
 echo "🚀 后台启动 Twitter Scanner Backend..."
 
 # 后台启动并保存PID
@@ -56,5 +56,9 @@ echo "📊 访问 API 文档: http://localhost:${PORT:-5000}/docs"
 echo "🏥 健康检查: http://localhost:${PORT:-5000}/health"
 echo ""
 
+# 执行数据库迁移
+echo "🗄️  执行数据库迁移..."
+python scripts/migrate.py upgrade
+
 # 启动服务
 python run.py 
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""Shared pytest setup: import path, test settings and a controllable clock."""
+
+import os
+import sys
+import time
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+# Settings are read at import time; keep tests off real services
+os.environ.setdefault("CLAUDE_API_KEY", "test-key")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+class FakeClock:
+    """Stand-in for time.monotonic that only moves when told to."""
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace time.monotonic with a FakeClock for the duration of a test."""
+    fake = FakeClock()
+    monkeypatch.setattr(time, "monotonic", fake)
+    return fake
@@ -0,0 +1,152 @@
+"""Tests for the content-addressed analysis result cache."""
+
+import asyncio
+import time
+
+import pytest
+
+from conftest import FakeClock
+from core.models import Tweet
+from services.analysis_cache import AnalysisCache, MemoryCacheTier
+
+TWEETS = [
+    Tweet(author="alice", content="Shipping a new release today", timestamp="2024-05-01"),
+    Tweet(author="bob", content="Benchmarks look good", timestamp="2024-05-01", url="https://x.com/b/1"),
+]
+PARAMS = {"model": "claude-sonnet", "max_tokens": 4000, "chunked": False}
+
+
+@pytest.fixture
+def wall_clock(monkeypatch):
+    fake = FakeClock(start=1_700_000_000.0)
+    monkeypatch.setattr(time, "time", fake)
+    return fake
+
+
+def test_key_ignores_whitespace_noise():
+    noisy = [
+        Tweet(author=" alice ", content="Shipping  a new\nrelease today ", timestamp="2024-05-01 "),
+        Tweet(author="bob", content="Benchmarks look good", timestamp="2024-05-01", url=" https://x.com/b/1"),
+    ]
+    assert AnalysisCache.make_key(noisy, "system", PARAMS) == AnalysisCache.make_key(
+        TWEETS, "system", PARAMS
+    )
+
+
+@pytest.mark.parametrize(
+    "tweets, system, params",
+    [
+        (TWEETS[:1], "system", PARAMS),
+        (list(reversed(TWEETS)), "system", PARAMS),
+        (TWEETS, "other system", PARAMS),
+        (TWEETS, "system", {**PARAMS, "model": "claude-haiku"}),
+        (TWEETS, "system", {**PARAMS, "chunked": True}),
+    ],
+)
+def test_key_changes_with_content_prompt_and_params(tweets, system, params):
+    assert AnalysisCache.make_key(tweets, system, params) != AnalysisCache.make_key(
+        TWEETS, "system", PARAMS
+    )
+
+
+def test_entries_expire_after_the_ttl(wall_clock):
+    tier = MemoryCacheTier(max_entries=10, max_bytes=1000, ttl_seconds=60)
+    tier.set("a", "value")
+    wall_clock.advance(59)
+    assert tier.get("a") == "value"
+    wall_clock.advance(1)
+    assert tier.get("a") is None
+    assert tier.current_bytes == 0
+
+
+def test_least_recently_used_entry_is_evicted_first(wall_clock):
+    tier = MemoryCacheTier(max_entries=2, max_bytes=1000, ttl_seconds=60)
+    tier.set("a", "1")
+    tier.set("b", "2")
+    tier.get("a")
+    tier.set("c", "3")
+    assert list(tier.entries) == ["a", "c"]
+    assert tier.evictions == 1
+
+
+def test_byte_budget_is_enforced(wall_clock):
+    tier = MemoryCacheTier(max_entries=10, max_bytes=10, ttl_seconds=60)
+    tier.set("a", "12345")
+    tier.set("b", "12345")
+    tier.set("c", "1234")
+    assert list(tier.entries) == ["b", "c"]
+    assert tier.current_bytes == 9
+    # Values larger than the whole budget are not cached at all
+    tier.set("huge", "x" * 11)
+    assert "huge" not in tier.entries
+    assert list(tier.entries) == ["b", "c"]
+
+
+def test_sizes_count_utf8_bytes(wall_clock):
+    tier = MemoryCacheTier(max_entries=10, max_bytes=100, ttl_seconds=60)
+    tier.set("a", "分析")
+    assert tier.current_bytes == 6
+
+
+def test_overwriting_a_key_releases_its_bytes(wall_clock):
+    tier = MemoryCacheTier(max_entries=10, max_bytes=100, ttl_seconds=60)
+    tier.set("a", "12345")
+    tier.set("a", "12")
+    assert tier.current_bytes == 2
+    assert tier.get("a") == "12"
+
+
+class FakeRedisTier:
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value):
+        self.values[key] = value
+
+
+def make_cache(redis=None, enabled=True) -> AnalysisCache:
+    cache = AnalysisCache()
+    cache.enabled = enabled
+    cache.memory = MemoryCacheTier(max_entries=10, max_bytes=1000, ttl_seconds=60)
+    cache.redis = redis
+    return cache
+
+
+def test_hits_and_misses_are_counted():
+    cache = make_cache()
+
+    async def scenario():
+        assert await cache.get("k") is None
+        await cache.set("k", "digest")
+        assert await cache.get("k") == "digest"
+
+    asyncio.run(scenario())
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 50.0)
+
+
+def test_redis_hits_are_promoted_to_memory():
+    redis = FakeRedisTier({"k": "digest"})
+    cache = make_cache(redis)
+
+    async def scenario():
+        assert await cache.get("k") == "digest"
+        await cache.set("other", "value")
+
+    asyncio.run(scenario())
+    assert cache.memory.get("k") == "digest"
+    assert redis.values["other"] == "value"
+
+
+def test_disabled_cache_stores_nothing():
+    cache = make_cache(enabled=False)
+
+    async def scenario():
+        await cache.set("k", "digest")
+        return await cache.get("k")
+
+    assert asyncio.run(scenario()) is None
+    assert cache.memory.entries == {}
@@ -0,0 +1,220 @@
+"""Tests for the analyze endpoints, with Claude, usage records and limits faked."""
+
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routes import analyze
+from services.analysis_cache import AnalysisCache, MemoryCacheTier
+from services.chunked_analysis import AnalysisResult
+from services.claude_client import ClaudeAPIError, claude_client
+from services.single_flight import SingleFlight
+from utils.rate_limiter import RateLimitManager
+
+TWEETS = [
+    {"author": "alice", "content": "Shipping a new release today", "timestamp": "2024-05-01"},
+    {"author": "bob", "content": "Benchmarks look good", "timestamp": "2024-05-01"},
+]
+
+
+def parse_sse(text):
+    """Split a server-sent event body into (event, data) pairs."""
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """Analyze router with a local rate limiter, a memory-only cache and fake records."""
+
+    class App:
+        records = []
+        stream_calls = 0
+        stream_events = [
+            {"type": "text", "text": "## Digest"},
+            {"type": "text", "text": " of the day"},
+            {"type": "done", "usage": {"input_tokens": 100, "output_tokens": 20}},
+        ]
+        stream_error = None
+        analyze_calls = 0
+        chunked_results = []
+
+    class FakeRecorder:
+        async def record(self, **record):
+            App.records.append(record)
+
+    async def stream_tweets_analysis(tweets, system_prompt=None, max_tokens=None, model=None):
+        App.stream_calls += 1
+        for event in App.stream_events:
+            yield event
+        if App.stream_error is not None:
+            raise App.stream_error
+
+    async def analyze_tweets(tweets, system_prompt=None, max_tokens=None, model=None):
+        App.analyze_calls += 1
+        return f"digest {App.analyze_calls}"
+
+    async def analyze_chunked(tweets, system_prompt=None, model=None, max_tokens=None):
+        App.analyze_calls += 1
+        return App.chunked_results.pop(0)
+
+    cache = AnalysisCache()
+    cache.enabled = True
+    cache.memory = MemoryCacheTier(max_entries=10, max_bytes=10_000, ttl_seconds=60)
+    cache.redis = None
+
+    manager = RateLimitManager()
+    manager.redis_rate_limiter = None
+    manager.redis_usage_tracker = None
+
+    monkeypatch.setattr(analyze, "analysis_cache", cache)
+    monkeypatch.setattr(analyze, "rate_limit_manager", manager)
+    monkeypatch.setattr(analyze, "usage_recorder", FakeRecorder())
+    monkeypatch.setattr(claude_client, "stream_tweets_analysis", stream_tweets_analysis)
+    monkeypatch.setattr(claude_client, "analyze_tweets", analyze_tweets)
+    monkeypatch.setattr(analyze.chunked_analyzer, "analyze", analyze_chunked)
+    monkeypatch.setattr(
+        analyze, "analysis_request_flights", SingleFlight("test_requests", result_ttl=60)
+    )
+    monkeypatch.setattr(analyze, "upstream_analysis_flights", SingleFlight("test_upstream"))
+
+    application = FastAPI()
+    application.include_router(analyze.router)
+    App.client = TestClient(application)
+    App.cache = cache
+    App.manager = manager
+    return App
+
+
+def test_stream_relays_deltas_and_settles_usage(app):
+    response = app.client.post("/api/analyze/stream", json={"tweets": TWEETS})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["delta", "delta", "done"]
+    assert "".join(data["text"] for event, data in events if event == "delta") == (
+        "## Digest of the day"
+    )
+    done = events[-1][1]
+    assert done["success"] is True
+    assert done["cacheStatus"] == "miss"
+    assert done["upstreamUsage"] == {"input_tokens": 100, "output_tokens": 20}
+    assert done["usage"]["current"] > 0
+    assert [record["outcome"] for record in app.records] == ["success"]
+
+
+def test_stream_reports_claude_errors_as_an_error_event(app):
+    app.stream_events = []
+    app.stream_error = ClaudeAPIError("Overloaded", status_code=529)
+
+    response = app.client.post("/api/analyze/stream", json={"tweets": TWEETS})
+    assert response.status_code == 200
+    events = parse_sse(response.text)
+    assert events == [
+        (
+            "error",
+            {
+                "success": False,
+                "error": "Overloaded",
+                "status_code": 529,
+                "retry_after": None,
+                "processingTime": events[0][1]["processingTime"],
+            },
+        )
+    ]
+    assert [record["outcome"] for record in app.records] == ["error"]
+    # Nothing reached the client, so the reservation is refunded
+    assert all(
+        window["count"] == 0 for window in app.manager.usage_tracker.usage.values()
+    )
+    # A failed stream is not cached
+    assert app.cache.memory.entries == {}
+
+
+def test_stream_serves_repeats_from_the_cache(app):
+    first = parse_sse(app.client.post("/api/analyze/stream", json={"tweets": TWEETS}).text)
+    second = parse_sse(app.client.post("/api/analyze/stream", json={"tweets": TWEETS}).text)
+
+    assert app.stream_calls == 1
+    assert second[0] == ("delta", {"text": "## Digest of the day"})
+    assert second[-1][1]["cacheStatus"] == "hit"
+    # Cache hits are free by default
+    assert second[-1][1]["usage"]["current"] == first[-1][1]["usage"]["current"]
+
+
+def test_stream_cache_bypass_calls_claude_again(app):
+    app.client.post("/api/analyze/stream", json={"tweets": TWEETS})
+    response = app.client.post(
+        "/api/analyze/stream", json={"tweets": TWEETS}, headers={"Cache-Control": "no-cache"}
+    )
+    assert app.stream_calls == 2
+    assert parse_sse(response.text)[-1][1]["cacheStatus"] == "bypass"
+
+
+def test_stream_rejects_clients_over_their_budget(app):
+    app.client.post("/api/analyze/stream", json={"tweets": TWEETS})
+    app.manager.usage_tracker.max_usage = 0.01
+
+    response = app.client.post(
+        "/api/analyze/stream", json={"tweets": TWEETS}, headers={"Cache-Control": "no-cache"}
+    )
+    assert response.status_code == 429
+    assert response.json()["detail"]["remaining"] == 0
+    assert app.stream_calls == 1
+
+
+def test_idempotency_key_reuses_the_result_without_charging_again(app):
+    headers = {"Idempotency-Key": "digest-1", "Cache-Control": "no-cache"}
+    first = app.client.post("/api/analyze", json={"tweets": TWEETS}, headers=headers)
+    second = app.client.post("/api/analyze", json={"tweets": TWEETS}, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert app.analyze_calls == 1
+    assert first.json()["cacheStatus"] == "bypass"
+    assert second.json()["cacheStatus"] == "shared"
+    assert second.json()["analysis"] == first.json()["analysis"] == "digest 1"
+    assert second.json()["usage"] == first.json()["usage"]
+
+
+def test_cache_bypass_without_idempotency_key_runs_again(app):
+    headers = {"Cache-Control": "no-cache"}
+    app.client.post("/api/analyze", json={"tweets": TWEETS}, headers=headers)
+    response = app.client.post("/api/analyze", json={"tweets": TWEETS}, headers=headers)
+
+    assert app.analyze_calls == 2
+    assert response.json()["analysis"] == "digest 2"
+
+
+def test_new_idempotency_key_is_a_new_request(app):
+    for key in ("digest-1", "digest-2"):
+        app.client.post(
+            "/api/analyze",
+            json={"tweets": TWEETS},
+            headers={"Idempotency-Key": key, "Cache-Control": "no-cache"},
+        )
+    assert app.analyze_calls == 2
+
+
+def test_partial_results_are_neither_retained_nor_cached(app):
+    app.chunked_results = [
+        AnalysisResult("partial digest", 1, failed_chunks=1, total_chunks=2),
+        AnalysisResult("full digest", 2, failed_chunks=0, total_chunks=2),
+    ]
+    body = {"tweets": TWEETS, "mode": "chunked"}
+    headers = {"Idempotency-Key": "digest-1"}
+
+    first = app.client.post("/api/analyze", json=body, headers=headers).json()
+    second = app.client.post("/api/analyze", json=body, headers=headers).json()
+    third = app.client.post("/api/analyze", json=body, headers=headers).json()
+
+    assert (first["analysis"], first["partial"]) == ("partial digest", True)
+    assert (second["analysis"], second["partial"]) == ("full digest", False)
+    assert second["cacheStatus"] == "miss"
+    assert third["cacheStatus"] == "hit"
+    assert app.analyze_calls == 2
@@ -0,0 +1,239 @@
+"""Tests for Message Batches submission, polling and resuming after a restart."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from core.config import settings
+from core.models import Tweet
+from services.batch_collector import BatchCollector
+from services.claude_client import ClaudeClient
+from services.job_queue import (
+    JOB_FAILED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    JobFailedError,
+    MemoryJobStore,
+    new_job,
+)
+
+BATCH_ID = "msgbatch_01"
+
+
+class FakeBatchesAPI:
+    """MockTransport handler serving one message batch."""
+
+    def __init__(self, results=None, create_status=200):
+        self.status = "in_progress"
+        self.results = results or {}
+        self.create_status = create_status
+        self.submitted = []
+        self.polls = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        if request.method == "POST" and url == settings.claude_batches_url:
+            if self.create_status != 200:
+                return httpx.Response(
+                    self.create_status,
+                    json={"error": {"type": "invalid_request_error", "message": "bad batch"}},
+                )
+            self.submitted.append(json.loads(request.content)["requests"])
+            return httpx.Response(200, json={"id": BATCH_ID, "processing_status": "in_progress"})
+        if url == f"{settings.claude_batches_url}/{BATCH_ID}":
+            self.polls += 1
+            return httpx.Response(
+                200, json={"id": BATCH_ID, "processing_status": self.status}
+            )
+        if url == f"{settings.claude_batches_url}/{BATCH_ID}/results":
+            lines = [
+                json.dumps({"custom_id": custom_id, "result": result})
+                for custom_id, result in self.results.items()
+            ]
+            return httpx.Response(200, text="\n".join(lines))
+        return httpx.Response(404, json={"error": {"message": "not found"}})
+
+
+def succeeded(text: str) -> dict:
+    return {
+        "type": "succeeded",
+        "message": {
+            "content": [{"type": "text", "text": text}],
+            "usage": {"input_tokens": 10, "output_tokens": 5},
+        },
+    }
+
+
+def make_job(index: int) -> dict:
+    tweets = [{"author": f"user{index}", "content": f"tweet {index}", "timestamp": "2024-05-01"}]
+    return new_job("bulk", {"tweets": tweets}, {"client_key": "1.1.1.1"})
+
+
+def make_collector(api: FakeBatchesAPI, store=None, abandoned=None) -> BatchCollector:
+    client = ClaudeClient(transport=httpx.MockTransport(api))
+    collector = BatchCollector(store or MemoryJobStore(100, 3600), client, max_requests=10)
+
+    def prepare(job):
+        tweets = [Tweet(**tweet) for tweet in job["payload"]["tweets"]]
+        return client.build_batch_request(job["id"], tweets)
+
+    async def finish(job, entry):
+        result = entry["result"]
+        if result["type"] != "succeeded":
+            raise JobFailedError({"error": f"Batch request {result['type']}"})
+        return {"analysis": result["message"]["content"][0]["text"]}
+
+    async def abandon(job):
+        if abandoned is not None:
+            abandoned.append(job["id"])
+
+    collector.register("bulk", prepare, finish, abandon)
+    return collector
+
+
+def test_jobs_are_submitted_polled_and_mapped_back():
+    api = FakeBatchesAPI()
+    abandoned = []
+    collector = make_collector(api, abandoned=abandoned)
+    jobs = [make_job(index) for index in range(3)]
+    api.results = {
+        jobs[0]["id"]: succeeded("digest 0"),
+        jobs[1]["id"]: {"type": "errored", "error": {"type": "error", "error": {"message": "overloaded"}}},
+        jobs[2]["id"]: {"type": "expired"},
+    }
+
+    async def scenario():
+        for job in jobs:
+            await collector.submit(job)
+        await collector.flush()
+        # The memory store hands out its live records; keep snapshots
+        running = [dict(await collector.store.get(job["id"])) for job in jobs]
+
+        await collector.poll(BATCH_ID)
+        still_running = dict(await collector.store.get(jobs[0]["id"]))
+
+        api.status = "ended"
+        await collector.poll(BATCH_ID)
+        finished = [await collector.store.get(job["id"]) for job in jobs]
+        return running, still_running, finished
+
+    running, still_running, finished = asyncio.run(scenario())
+
+    submitted = api.submitted[0]
+    assert [entry["custom_id"] for entry in submitted] == [job["id"] for job in jobs]
+    assert submitted[0]["params"]["messages"][0]["content"][0]["text"].count("tweet 0") == 1
+    assert all(job["status"] == JOB_RUNNING for job in running)
+    assert all(job["context"]["batch_id"] == BATCH_ID for job in running)
+    assert still_running["status"] == JOB_RUNNING
+
+    assert finished[0]["status"] == JOB_SUCCEEDED
+    assert finished[0]["result"] == {"analysis": "digest 0"}
+    assert [job["status"] for job in finished[1:]] == [JOB_FAILED, JOB_FAILED]
+    assert finished[1]["error"] == {"error": "Batch request errored"}
+    assert finished[2]["error"] == {"error": "Batch request expired"}
+    assert abandoned == [jobs[1]["id"], jobs[2]["id"]]
+    assert collector.get_stats()["succeeded"] == 1
+    assert collector.get_stats()["failed"] == 2
+    assert collector.in_flight == {}
+    assert collector.store.bulk_batches == {}
+
+
+def test_jobs_missing_from_results_fail():
+    api = FakeBatchesAPI()
+    abandoned = []
+    collector = make_collector(api, abandoned=abandoned)
+    job = make_job(0)
+
+    async def scenario():
+        await collector.submit(job)
+        await collector.flush()
+        api.status = "ended"
+        await collector.poll(BATCH_ID)
+        return await collector.store.get(job["id"])
+
+    finished = asyncio.run(scenario())
+    assert finished["status"] == JOB_FAILED
+    assert finished["error"] == {"error": "Missing from batch results"}
+    assert abandoned == [job["id"]]
+
+
+def test_invalid_submission_fails_jobs_and_forgets_them():
+    api = FakeBatchesAPI(create_status=400)
+    abandoned = []
+    collector = make_collector(api, abandoned=abandoned)
+    job = make_job(0)
+
+    async def scenario():
+        await collector.submit(job)
+        await collector.flush()
+        return await collector.store.get(job["id"])
+
+    assert asyncio.run(scenario())["status"] == JOB_FAILED
+    assert abandoned == [job["id"]]
+    assert collector.store.bulk_pending == {}
+
+
+@pytest.mark.parametrize("status", [429, 500])
+def test_retryable_submission_failure_keeps_jobs_pending(status):
+    api = FakeBatchesAPI(create_status=status)
+    collector = make_collector(api)
+    job = make_job(0)
+
+    async def scenario():
+        await collector.submit(job)
+        await collector.flush()
+
+    asyncio.run(scenario())
+    assert [job_id for job_id, _ in collector.pending] == [job["id"]]
+    assert list(collector.store.bulk_pending) == [job["id"]]
+
+
+def test_restarted_collector_resumes_batches_and_pending_jobs():
+    api = FakeBatchesAPI()
+    store = MemoryJobStore(100, 3600)
+    submitted, waiting = make_job(0), make_job(1)
+    api.results = {submitted["id"]: succeeded("digest")}
+
+    async def scenario():
+        before = make_collector(api, store=store)
+        await before.submit(submitted)
+        await before.flush()
+        await before.submit(waiting)
+
+        # A new process sees only what the job store recorded
+        after = make_collector(api, store=store)
+        await after.resume()
+        resumed = (dict(after.in_flight), list(after.pending))
+
+        api.status = "ended"
+        await after.poll(BATCH_ID)
+        return resumed, await store.get(submitted["id"])
+
+    (in_flight, pending), finished = asyncio.run(scenario())
+    assert in_flight[BATCH_ID]["job_ids"] == [submitted["id"]]
+    assert [job_id for job_id, _ in pending] == [waiting["id"]]
+    assert finished["status"] == JOB_SUCCEEDED
+    assert store.bulk_batches == {}
+    assert list(store.bulk_pending) == [waiting["id"]]
+
+
+def test_resumed_batch_skips_jobs_already_collected():
+    api = FakeBatchesAPI()
+    abandoned = []
+    collector = make_collector(api, abandoned=abandoned)
+    job = make_job(0)
+    api.results = {job["id"]: {"type": "expired"}}
+
+    async def scenario():
+        await collector.submit(job)
+        await collector.flush()
+        await collector.store.update(job["id"], status=JOB_SUCCEEDED, result={"analysis": "done"})
+        api.status = "ended"
+        await collector.poll(BATCH_ID)
+        return await collector.store.get(job["id"])
+
+    finished = asyncio.run(scenario())
+    assert finished["status"] == JOB_SUCCEEDED
+    assert abandoned == []
@@ -0,0 +1,88 @@
+"""Tests for map-reduce analysis of large batches and its partial results."""
+
+import asyncio
+
+import pytest
+
+from core.config import settings
+from core.models import Tweet
+from services.chunked_analysis import PARTIAL_NOTICE, ChunkedAnalyzer
+from services.claude_client import ClaudeAPIError, UpstreamUnavailableError
+
+TWEETS = [
+    Tweet(author=f"user{index}", content=f"tweet number {index}", timestamp="2024-05-01")
+    for index in range(3)
+]
+
+
+class FakeClient:
+    """Answers chunk prompts, failing those that mention a given tweet."""
+
+    def __init__(self, failing=(), error=lambda: ClaudeAPIError("chunk failed")):
+        self.failing = set(failing)
+        self.error = error
+        self.prompts = []
+
+    def get_default_system_prompt(self) -> str:
+        return "system"
+
+    def format_tweet(self, tweet: Tweet) -> str:
+        return f"@{tweet.author}: {tweet.content}"
+
+    def build_user_prompt(self, tweets) -> str:
+        return "\n".join(self.format_tweet(tweet) for tweet in tweets)
+
+    async def analyze_tweets(self, tweets, system_prompt=None, max_tokens=None, model=None):
+        return "single"
+
+    async def complete(self, system_prompt, user_prompt, **kwargs):
+        self.prompts.append(user_prompt)
+        if any(tweet.content in user_prompt for tweet in TWEETS if tweet.author in self.failing):
+            if "were analyzed in" not in user_prompt:
+                raise self.error()
+        if "were analyzed in" in user_prompt:
+            return "digest"
+        return f"notes {len(self.prompts)}"
+
+
+@pytest.fixture(autouse=True)
+def three_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "analysis_chunk_concurrency", 3)
+
+
+def test_complete_batch_is_not_partial():
+    result = asyncio.run(ChunkedAnalyzer(FakeClient()).analyze(TWEETS))
+    assert result.text == "digest"
+    assert not result.partial
+    assert result.analyzed_tweets == 3
+    assert result.total_chunks == 3
+
+
+def test_failed_chunk_makes_a_partial_result():
+    result = asyncio.run(ChunkedAnalyzer(FakeClient(failing={"user1"})).analyze(TWEETS))
+    assert result.partial
+    assert result.failed_chunks == 1
+    # Only the tweets that made it into the digest are charged
+    assert result.analyzed_tweets == 2
+    assert result.text.startswith(PARTIAL_NOTICE.format(failed=1, total=3))
+
+
+def test_every_chunk_failing_raises():
+    client = FakeClient(failing={tweet.author for tweet in TWEETS})
+    with pytest.raises(ClaudeAPIError):
+        asyncio.run(ChunkedAnalyzer(client).analyze(TWEETS))
+
+
+def test_upstream_unavailable_fails_the_whole_batch():
+    client = FakeClient(
+        failing={"user0"}, error=lambda: UpstreamUnavailableError("overloaded", retry_after=5)
+    )
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(ChunkedAnalyzer(client).analyze(TWEETS))
+
+
+def test_single_chunk_uses_one_call():
+    result = asyncio.run(ChunkedAnalyzer(FakeClient()).analyze(TWEETS[:1]))
+    assert result.text == "single"
+    assert result.analyzed_tweets == 1
+    assert not result.partial
@@ -0,0 +1,242 @@
+"""Tests for ClaudeClient request building and usage accounting against a stub API."""
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from core.config import settings
+from core.models import Tweet
+from services.claude_client import ClaudeAPIError, ClaudeClient, track_usage
+from services.concurrency_limiter import AdaptiveConcurrencyLimiter
+from services.retry_policy import CircuitBreaker, RetryPolicy
+
+TWEETS = [Tweet(author="alice", content="Shipping a new release today", timestamp="2024-05-01")]
+USAGE = {
+    "input_tokens": 20,
+    "output_tokens": 30,
+    "cache_creation_input_tokens": 1500,
+    "cache_read_input_tokens": 4000,
+}
+
+
+class FakeMessagesAPI:
+    """MockTransport handler answering every messages call with one reply."""
+
+    def __init__(self, usage=None):
+        self.usage = usage or USAGE
+        self.bodies = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.bodies.append(json.loads(request.content))
+        return httpx.Response(
+            200,
+            json={
+                "content": [{"type": "text", "text": "digest"}],
+                "usage": self.usage,
+            },
+        )
+
+
+def test_system_and_tweet_blocks_are_marked_cacheable():
+    api = FakeMessagesAPI()
+    client = ClaudeClient(transport=httpx.MockTransport(api))
+    assert asyncio.run(client.analyze_tweets(TWEETS, "Be brief")) == "digest"
+
+    body = api.bodies[0]
+    assert body["system"] == [
+        {"type": "text", "text": "Be brief", "cache_control": {"type": "ephemeral"}}
+    ]
+    (message,) = body["messages"]
+    assert message["role"] == "user"
+    (block,) = message["content"]
+    assert "Shipping a new release today" in block["text"]
+    assert block["cache_control"] == {"type": "ephemeral"}
+
+
+def test_caching_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "claude_prompt_caching", False)
+    api = FakeMessagesAPI()
+    client = ClaudeClient(transport=httpx.MockTransport(api))
+    asyncio.run(client.analyze_tweets(TWEETS, "Be brief"))
+    body = api.bodies[0]
+    assert "cache_control" not in body["system"][0]
+    assert "cache_control" not in body["messages"][0]["content"][0]
+
+
+def test_cache_token_usage_is_recorded():
+    client = ClaudeClient(transport=httpx.MockTransport(FakeMessagesAPI()))
+
+    async def scenario():
+        with track_usage() as usage:
+            await client.analyze_tweets(TWEETS)
+            await client.analyze_tweets(TWEETS)
+        return usage
+
+    usage = asyncio.run(scenario())
+    assert usage == {field: value * 2 for field, value in USAGE.items()}
+    stats = client.get_stats()
+    assert stats["usage"]["requests"] == 2
+    assert stats["usage"]["cache_read_input_tokens"] == 8000
+    assert stats["usage"]["cache_creation_input_tokens"] == 3000
+    assert stats["prompt_cache_read_ratio"] == pytest.approx(
+        round(8000 / (8000 + 3000 + 40) * 100, 2)
+    )
+
+
+def test_batch_requests_use_the_same_cacheable_blocks():
+    client = ClaudeClient()
+    entry = client.build_batch_request("job-1", TWEETS, "Be brief")
+    assert entry["custom_id"] == "job-1"
+    assert entry["params"]["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert entry["params"]["messages"][0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+
+
+def sse(*events) -> bytes:
+    return "".join(f"event: {event}\ndata: {data}\n\n" for event, data in events).encode()
+
+
+def stream_events(body: bytes) -> list:
+    client = ClaudeClient(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(
+                200, content=body, headers={"content-type": "text/event-stream"}
+            )
+        )
+    )
+
+    async def scenario():
+        events = []
+        try:
+            async for event in client.stream_tweets_analysis(TWEETS):
+                events.append(event)
+        except Exception as e:
+            events.append(e)
+        return events
+
+    return asyncio.run(scenario())
+
+
+def test_stream_relays_text_and_usage():
+    events = stream_events(
+        sse(
+            ("message_start", json.dumps({"message": {"usage": {"input_tokens": 20, "cache_read_input_tokens": 4000}}})),
+            ("content_block_delta", json.dumps({"delta": {"type": "text_delta", "text": "Hello"}})),
+            ("content_block_delta", json.dumps({"delta": {"type": "text_delta", "text": " world"}})),
+            ("message_delta", json.dumps({"delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 7}})),
+            ("message_stop", "{}"),
+        )
+    )
+    assert [event["text"] for event in events if event["type"] == "text"] == ["Hello", " world"]
+    done = events[-1]
+    assert done["type"] == "done"
+    assert done["stop_reason"] == "end_turn"
+    assert done["usage"] == {"input_tokens": 20, "cache_read_input_tokens": 4000, "output_tokens": 7}
+
+
+def test_stream_with_invalid_event_data_fails_like_an_error_event():
+    events = stream_events(
+        sse(
+            ("content_block_delta", json.dumps({"delta": {"type": "text_delta", "text": "Hello"}})),
+            ("content_block_delta", '{"delta": {"type": "text_delta", "te'),
+        )
+    )
+    assert events[0] == {"type": "text", "text": "Hello"}
+    error = events[1]
+    assert isinstance(error, ClaudeAPIError)
+    assert error.message == "Stream error: invalid content_block_delta event data"
+
+
+def test_stream_error_event_is_raised():
+    events = stream_events(
+        sse(("error", json.dumps({"error": {"type": "overloaded_error", "message": "Overloaded"}})))
+    )
+    assert isinstance(events[0], ClaudeAPIError)
+    assert events[0].message == "Stream error: overloaded_error - Overloaded"
+
+
+def make_pooled_client(monkeypatch, handler) -> ClaudeClient:
+    """Client over two keys with its own limiter, breaker and instant retries."""
+    monkeypatch.setattr(settings, "claude_api_keys", "key-one,key-two")
+    client = ClaudeClient(transport=httpx.MockTransport(handler))
+    client.concurrency_limiter = AdaptiveConcurrencyLimiter(
+        "test", initial_limit=4, min_limit=1, max_limit=8, decrease_cooldown=0.0
+    )
+    client.circuit_breaker = CircuitBreaker("test")
+    client.retry_policy = RetryPolicy(base_delay=0.0, max_delay=0.0)
+    return client
+
+
+def reply(request: httpx.Request, throttled_key: str, status: int) -> httpx.Response:
+    if request.headers["x-api-key"] == throttled_key:
+        return httpx.Response(status, json={"error": {"message": "slow down"}})
+    return httpx.Response(
+        200,
+        json={"content": [{"type": "text", "text": "digest"}], "usage": {"output_tokens": 5}},
+    )
+
+
+def test_key_rate_limit_cools_down_the_key_not_the_shared_limit(monkeypatch):
+    client = make_pooled_client(
+        monkeypatch, lambda request: reply(request, "key-one", 429)
+    )
+    # Idle keys tie on load, so the first call goes to the first key
+    assert asyncio.run(client.complete("system", "user")) == "digest"
+    throttled, healthy = client.upstream_pool.endpoints
+    assert throttled.is_ejected(time.monotonic())
+    assert throttled.throttled == 1
+    assert not healthy.is_ejected(time.monotonic())
+    # Only the successful call was sampled: additive increase, no backoff
+    assert client.concurrency_limiter.limit == pytest.approx(4.25)
+
+
+@pytest.mark.parametrize("status", [503, 529])
+def test_upstream_overload_shrinks_the_shared_limit(monkeypatch, status):
+    client = make_pooled_client(
+        monkeypatch, lambda request: httpx.Response(status, json={"error": {"message": "overloaded"}})
+    )
+    with pytest.raises(ClaudeAPIError):
+        asyncio.run(client.complete("system", "user", max_retries=0))
+    assert client.concurrency_limiter.limit == 2.0
+
+
+def test_calls_reuse_one_pooled_http_client():
+    api = FakeMessagesAPI()
+    client = ClaudeClient(transport=httpx.MockTransport(api))
+    created = []
+    create = client._create_http_client
+    client._create_http_client = lambda: created.append(1) or create()
+
+    async def scenario():
+        await client.start()
+        pooled = client.http_client
+        await asyncio.gather(*(client.analyze_tweets(TWEETS) for _ in range(3)))
+        same = client.get_http_client() is pooled
+        await client.close()
+        return pooled, same
+
+    pooled, same = asyncio.run(scenario())
+    assert same
+    assert len(created) == 1
+    assert len(api.bodies) == 3
+    assert pooled.is_closed
+    assert client.http_client is None
+
+
+def test_http_client_is_created_lazily_and_after_close():
+    client = ClaudeClient(transport=httpx.MockTransport(FakeMessagesAPI()))
+
+    async def scenario():
+        first = client.get_http_client()
+        await client.start()
+        assert client.http_client is first
+        await client.close()
+        second = client.get_http_client()
+        await client.close()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first is not second
+    assert first.is_closed and second.is_closed
@@ -0,0 +1,162 @@
+"""Tests for the adaptive (AIMD) concurrency limiter."""
+
+import asyncio
+
+import pytest
+
+from services.concurrency_limiter import (
+    AdaptiveConcurrencyLimiter,
+    AdmissionRejectedError,
+    size_bucket,
+)
+
+
+def make_limiter(**overrides) -> AdaptiveConcurrencyLimiter:
+    options = dict(
+        initial_limit=4,
+        min_limit=1,
+        max_limit=8,
+        max_queue_size=2,
+        queue_timeout=1.0,
+        latency_tolerance=3.0,
+        decrease_cooldown=0.0,
+    )
+    options.update(overrides)
+    return AdaptiveConcurrencyLimiter("test", **options)
+
+
+async def call(limiter, clock, latency, output_tokens=None, overload=False):
+    """Run one call through the limiter taking `latency` fake seconds."""
+    async with limiter.acquire() as slot:
+        clock.advance(latency)
+        if overload:
+            slot.record_overload()
+        elif output_tokens is not None:
+            slot.record_success(output_tokens)
+
+
+def test_size_bucket_rounds_up_to_powers_of_two():
+    assert size_bucket(0) == size_bucket(1) == 0
+    assert size_bucket(2) == 1
+    assert size_bucket(100) == size_bucket(128) == 7
+    assert size_bucket(129) == 8
+
+
+def test_healthy_calls_increase_the_limit_additively(clock):
+    limiter = make_limiter()
+    asyncio.run(call(limiter, clock, 1.0, output_tokens=100))
+    assert limiter.limit == pytest.approx(4.25)
+    assert limiter.bucket_baselines == {7: 1.0}
+
+
+def test_overload_halves_the_limit(clock):
+    limiter = make_limiter()
+    asyncio.run(call(limiter, clock, 1.0, overload=True))
+    assert limiter.limit == 2.0
+    assert limiter.baseline_latency is None
+
+
+def test_large_output_is_not_judged_against_small_call_baseline(clock):
+    limiter = make_limiter()
+
+    async def scenario():
+        for _ in range(5):
+            await call(limiter, clock, 1.0, output_tokens=50)
+        # Ten times slower, but it also produced forty times more output
+        await call(limiter, clock, 10.0, output_tokens=2000)
+
+    asyncio.run(scenario())
+    assert limiter.limit > 4
+    assert set(limiter.bucket_baselines) == {6, 11}
+
+
+def test_slow_call_within_its_size_bucket_decreases_the_limit(clock):
+    limiter = make_limiter()
+
+    async def scenario():
+        await call(limiter, clock, 1.0, output_tokens=50)
+        before = limiter.limit
+        await call(limiter, clock, 5.0, output_tokens=60)
+        return before
+
+    before = asyncio.run(scenario())
+    assert limiter.limit == pytest.approx(before / 2)
+
+
+def test_failed_and_cancelled_calls_leave_limit_and_baseline_alone(clock):
+    limiter = make_limiter()
+
+    async def scenario():
+        await call(limiter, clock, 1.0)  # finished without record_success
+        with pytest.raises(RuntimeError):
+            async with limiter.acquire():
+                clock.advance(50.0)
+                raise RuntimeError("upstream error")
+
+    asyncio.run(scenario())
+    assert limiter.limit == 4.0
+    assert limiter.baseline_latency is None
+    assert limiter.bucket_baselines == {}
+    assert limiter.in_flight == 0
+
+
+def test_decreases_respect_the_cooldown(clock):
+    limiter = make_limiter(decrease_cooldown=5.0)
+
+    async def scenario():
+        await call(limiter, clock, 0.0, overload=True)
+        await call(limiter, clock, 0.0, overload=True)
+
+    asyncio.run(scenario())
+    assert limiter.limit == 2.0
+
+
+def test_calls_beyond_the_limit_queue_and_overflow_is_rejected():
+    limiter = make_limiter(initial_limit=1, max_queue_size=1)
+
+    async def scenario():
+        release = asyncio.Event()
+        order = []
+
+        async def holder():
+            async with limiter.acquire():
+                order.append("first")
+                await release.wait()
+
+        async def waiter():
+            async with limiter.acquire():
+                order.append("second")
+
+        first = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        assert len(limiter.waiters) == 1
+
+        with pytest.raises(AdmissionRejectedError) as excinfo:
+            async with limiter.acquire():
+                pass
+        assert excinfo.value.reason == "queue_full"
+
+        release.set()
+        await asyncio.gather(first, second)
+        return order
+
+    assert asyncio.run(scenario()) == ["first", "second"]
+    assert limiter.rejected_queue_full == 1
+    assert limiter.in_flight == 0
+
+
+def test_queue_timeout_rejects_the_waiter():
+    limiter = make_limiter(initial_limit=1, queue_timeout=0.01)
+
+    async def scenario():
+        async with limiter.acquire():
+            with pytest.raises(AdmissionRejectedError) as excinfo:
+                async with limiter.acquire():
+                    pass
+            return excinfo.value.reason
+
+    assert asyncio.run(scenario()) == "queue_timeout"
+    assert not limiter.waiters
+    assert limiter.in_flight == 0
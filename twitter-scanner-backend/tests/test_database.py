@@ -0,0 +1,96 @@
+"""Tests for usage record batching into rollup rows and deadlock retries."""
+
+import asyncio
+from datetime import date, datetime
+
+import aiomysql
+import pytest
+
+from core import database
+from core.database import ER_LOCK_DEADLOCK, UsageStatsDB, rollup_rows
+
+
+def record(created_at, client_ip="1.1.1.1", user_id=None, outcome="success", tweets=10):
+    return {
+        "created_at": created_at,
+        "client_ip": client_ip,
+        "user_id": user_id,
+        "success": outcome == "success",
+        "outcome": outcome,
+        "twitter_count": tweets,
+        "content_length": 100,
+        "processing_time_ms": 50,
+    }
+
+
+def test_rollup_rows_aggregate_one_row_per_key():
+    records = [
+        record(datetime(2024, 5, 1, 10, 5)),
+        record(datetime(2024, 5, 1, 10, 50), tweets=5),
+        record(datetime(2024, 5, 1, 11, 0)),
+    ]
+    hourly = rollup_rows(records, hourly=True)
+    assert [row[:5] for row in hourly] == [
+        (datetime(2024, 5, 1, 10), "1.1.1.1", "", "success", 2),
+        (datetime(2024, 5, 1, 11), "1.1.1.1", "", "success", 1),
+    ]
+    assert hourly[0][5:] == (15, 200, 100, datetime(2024, 5, 1, 10, 5), datetime(2024, 5, 1, 10, 50))
+
+    daily = rollup_rows(records, hourly=False)
+    assert len(daily) == 1
+    assert daily[0][:5] == (date(2024, 5, 1), "1.1.1.1", "", "success", 3)
+
+
+def test_rollup_rows_are_sorted_by_primary_key():
+    at = datetime(2024, 5, 1, 10)
+    records = [
+        record(at, client_ip="9.9.9.9"),
+        record(at, client_ip="1.1.1.1", outcome="error"),
+        record(at, client_ip="1.1.1.1", user_id="u2"),
+        record(at, client_ip="1.1.1.1"),
+        record(datetime(2024, 4, 30, 23), client_ip="9.9.9.9"),
+    ]
+    keys = [row[:4] for row in rollup_rows(records, hourly=True)]
+    assert keys == sorted(keys)
+    assert keys[0][0] == datetime(2024, 4, 30, 23)
+
+
+def test_deadlocked_batch_is_retried(monkeypatch):
+    attempts = []
+
+    async def write(rows, rollups):
+        attempts.append(rows)
+        if len(attempts) < 3:
+            raise aiomysql.OperationalError(ER_LOCK_DEADLOCK, "Deadlock found")
+        return len(rows)
+
+    monkeypatch.setattr(UsageStatsDB, "_write_usage_records", staticmethod(write))
+    inserted = asyncio.run(UsageStatsDB.add_usage_records([record(datetime(2024, 5, 1))]))
+    assert inserted == 1
+    assert len(attempts) == 3
+
+
+def test_deadlock_retries_are_bounded(monkeypatch):
+    attempts = []
+
+    async def write(rows, rollups):
+        attempts.append(rows)
+        raise aiomysql.OperationalError(ER_LOCK_DEADLOCK, "Deadlock found")
+
+    monkeypatch.setattr(UsageStatsDB, "_write_usage_records", staticmethod(write))
+    with pytest.raises(aiomysql.OperationalError):
+        asyncio.run(UsageStatsDB.add_usage_records([record(datetime(2024, 5, 1))]))
+    assert len(attempts) == database.DEADLOCK_RETRIES
+
+
+def test_other_errors_are_not_retried(monkeypatch):
+    attempts = []
+
+    async def write(rows, rollups):
+        attempts.append(rows)
+        raise aiomysql.OperationalError(2003, "Can't connect to MySQL server")
+
+    monkeypatch.setattr(UsageStatsDB, "_write_usage_records", staticmethod(write))
+    with pytest.raises(aiomysql.OperationalError):
+        asyncio.run(UsageStatsDB.add_usage_records([record(datetime(2024, 5, 1))]))
+    assert len(attempts) == 1
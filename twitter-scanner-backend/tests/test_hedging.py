@@ -0,0 +1,107 @@
+"""Tests for the hedge budget, latency tracker and hedging policy."""
+
+import pytest
+
+from services.hedging import HedgeBudget, HedgingPolicy, LatencyTracker
+
+
+def make_policy(**overrides) -> HedgingPolicy:
+    options = dict(
+        enabled=True, percentile=95, budget_ratio=0.1, min_delay=0.5, min_samples=5
+    )
+    options.update(overrides)
+    return HedgingPolicy(**options)
+
+
+def test_budget_starts_empty():
+    budget = HedgeBudget(ratio=0.1)
+    assert not budget.try_spend()
+
+
+def test_budget_allows_one_hedge_per_ratio_of_requests():
+    budget = HedgeBudget(ratio=0.1)
+    hedges = 0
+    for _ in range(100):
+        budget.on_request()
+        if budget.try_spend():
+            hedges += 1
+    assert hedges == pytest.approx(10, abs=1)
+
+
+def test_budget_is_capped():
+    budget = HedgeBudget(ratio=1.0, max_tokens=3)
+    for _ in range(50):
+        budget.on_request()
+    assert [budget.try_spend() for _ in range(4)] == [True, True, True, False]
+
+
+def test_percentile_picks_rank():
+    tracker = LatencyTracker()
+    assert tracker.percentile(95) is None
+    for latency in range(1, 101):
+        tracker.record(latency / 100)
+    assert tracker.percentile(50) == 0.5
+    assert tracker.percentile(95) == 0.95
+    assert tracker.percentile(100) == 1.0
+
+
+def test_tracker_keeps_a_rolling_window():
+    tracker = LatencyTracker(window_size=3)
+    for latency in (9.0, 1.0, 2.0, 3.0):
+        tracker.record(latency)
+    assert tracker.percentile(100) == 3.0
+
+
+def test_expected_latency_beyond_averages_the_tail():
+    tracker = LatencyTracker()
+    for latency in (1.0, 2.0, 4.0, 6.0):
+        tracker.record(latency)
+    assert tracker.expected_latency_beyond(3.0) == 5.0
+    assert tracker.expected_latency_beyond(10.0) is None
+
+
+def test_no_hedge_delay_until_enough_samples():
+    policy = make_policy()
+    for _ in range(4):
+        policy.latency.record(1.0)
+    assert policy.hedge_delay() is None
+    policy.latency.record(1.0)
+    assert policy.hedge_delay() == 1.0
+
+
+def test_hedge_delay_respects_min_delay():
+    policy = make_policy(min_delay=2.0)
+    for _ in range(5):
+        policy.latency.record(0.1)
+    assert policy.hedge_delay() == 2.0
+
+
+def test_disabled_policy_never_hedges():
+    policy = make_policy(enabled=False)
+    for _ in range(10):
+        policy.latency.record(1.0)
+    assert policy.hedge_delay() is None
+    assert policy.requests == 0
+
+
+def test_allow_hedge_denies_when_overloaded_or_out_of_budget():
+    policy = make_policy(budget_ratio=1.0)
+    policy.hedge_delay()
+    assert not policy.allow_hedge(overloaded=True)
+    assert policy.allow_hedge(overloaded=False)
+    assert not policy.allow_hedge(overloaded=False)
+    stats = policy.get_stats()
+    assert stats["hedges_sent"] == 1
+    assert stats["hedges_denied"] == 2
+
+
+def test_hedge_win_estimates_latency_saved(clock):
+    policy = make_policy()
+    for latency in (1.0, 2.0, 4.0, 6.0):
+        policy.latency.record(latency)
+    started_at = clock()
+    clock.advance(3.0)
+    policy.record_hedge_win(started_at)
+    # Calls slower than 3s averaged 5s, so the hedge saved about 2s
+    assert policy.latency_saved == pytest.approx(2.0)
+    assert policy.hedge_wins == 1
@@ -0,0 +1,161 @@
+"""Tests for migration discovery and the migration runner."""
+
+import asyncio
+import inspect
+from contextlib import asynccontextmanager
+
+import pytest
+
+from core import migrations
+from core.migrations import (
+    SchemaOutdatedError,
+    check_schema,
+    discover_migrations,
+    latest_version,
+    migrate,
+)
+
+
+def write_migration(directory, filename: str, marker: str = ""):
+    (directory / filename).write_text(
+        "async def upgrade(cursor):\n"
+        f"    await cursor.execute({marker!r})\n"
+    )
+
+
+@pytest.fixture
+def migrations_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(migrations, "MIGRATIONS_DIR", str(tmp_path))
+    return tmp_path
+
+
+class FakeCursor:
+    """Answers the runner's bookkeeping queries and records everything else."""
+
+    def __init__(self, applied, lock_acquired=True):
+        self.applied = set(applied)
+        self.lock_acquired = lock_acquired
+        self.executed = []
+        self.result = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        if sql.startswith("SELECT GET_LOCK"):
+            self.result = [(1 if self.lock_acquired else 0,)]
+        elif sql.startswith("SELECT version FROM schema_version"):
+            self.result = [(version,) for version in sorted(self.applied)]
+        elif sql.startswith("SELECT MAX(version)"):
+            self.result = [(max(self.applied, default=None),)]
+        elif sql.startswith("INSERT INTO schema_version"):
+            self.applied.add(params[0])
+        elif not sql.startswith(("CREATE TABLE IF NOT EXISTS schema_version", "SELECT RELEASE_LOCK")):
+            self.executed.append(sql)
+
+    async def fetchone(self):
+        return self.result[0]
+
+    async def fetchall(self):
+        return self.result
+
+
+class FakePool:
+    def __init__(self, cursor: FakeCursor):
+        self.fake_cursor = cursor
+
+    @asynccontextmanager
+    async def get_connection(self):
+        pool = self
+
+        class Connection:
+            def cursor(self):
+                return pool.fake_cursor
+
+        yield Connection()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    def install(applied=(), lock_acquired=True) -> FakeCursor:
+        cursor = FakeCursor(applied, lock_acquired)
+        monkeypatch.setattr(migrations, "db_pool", FakePool(cursor))
+        return cursor
+
+    return install
+
+
+def test_shipped_migrations_are_numbered_and_loadable():
+    found = discover_migrations()
+    assert [migration.version for migration in found] == list(range(1, len(found) + 1))
+    for migration in found:
+        assert inspect.iscoroutinefunction(migration.load().upgrade)
+    assert latest_version() == found[-1].version
+
+
+def test_discovery_orders_by_version_and_ignores_other_files(migrations_dir):
+    write_migration(migrations_dir, "0010_later.py")
+    write_migration(migrations_dir, "0002_second.py")
+    write_migration(migrations_dir, "0001_first.py")
+    (migrations_dir / "__init__.py").write_text("")
+    (migrations_dir / "notes.txt").write_text("")
+    (migrations_dir / "003_short.py").write_text("")
+    found = discover_migrations()
+    assert [(m.version, m.name) for m in found] == [
+        (1, "first"),
+        (2, "second"),
+        (10, "later"),
+    ]
+
+
+def test_duplicate_versions_are_rejected(migrations_dir):
+    write_migration(migrations_dir, "0001_first.py")
+    write_migration(migrations_dir, "0001_other.py")
+    with pytest.raises(ValueError, match="Duplicate migration version 0001"):
+        discover_migrations()
+
+
+def test_latest_version_without_migrations(migrations_dir):
+    assert latest_version() == 0
+
+
+def test_migrate_applies_pending_migrations_in_order(migrations_dir, fake_db):
+    for filename in ("0001_a.py", "0002_b.py", "0003_c.py"):
+        write_migration(migrations_dir, filename, marker=filename)
+    cursor = fake_db(applied={1})
+    applied = asyncio.run(migrate())
+    assert [migration.version for migration in applied] == [2, 3]
+    assert cursor.executed == ["0002_b.py", "0003_c.py"]
+    assert cursor.applied == {1, 2, 3}
+
+
+def test_migrate_stops_at_target(migrations_dir, fake_db):
+    for filename in ("0001_a.py", "0002_b.py", "0003_c.py"):
+        write_migration(migrations_dir, filename, marker=filename)
+    cursor = fake_db()
+    applied = asyncio.run(migrate(target=2))
+    assert [migration.version for migration in applied] == [1, 2]
+    assert cursor.applied == {1, 2}
+
+
+def test_migrate_refuses_without_the_lock(migrations_dir, fake_db):
+    write_migration(migrations_dir, "0001_a.py", marker="0001_a.py")
+    cursor = fake_db(lock_acquired=False)
+    with pytest.raises(RuntimeError):
+        asyncio.run(migrate())
+    assert cursor.executed == []
+
+
+def test_check_schema_refuses_outdated_schema(migrations_dir, fake_db, monkeypatch):
+    write_migration(migrations_dir, "0001_a.py")
+    write_migration(migrations_dir, "0002_b.py")
+    fake_db(applied={1})
+    monkeypatch.setattr(migrations.settings, "schema_check", "refuse")
+    with pytest.raises(SchemaOutdatedError):
+        asyncio.run(check_schema())
+    monkeypatch.setattr(migrations.settings, "schema_check", "warn")
+    assert asyncio.run(check_schema()) == 1
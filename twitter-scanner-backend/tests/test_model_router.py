@@ -0,0 +1,106 @@
+"""Tests for model tier routing and per-route statistics."""
+
+import asyncio
+
+import pytest
+
+from api.routes import analyze
+from core.models import AnalyzeRequest, Tweet
+from services.claude_client import ClaudeAPIError, claude_client
+from services.model_router import ModelRoute, ModelRouter, parse_template_rules
+from services.tweet_compactor import CompactionResult
+
+DEFAULT = ModelRoute("default", "claude-sonnet", 4000)
+SMALL = ModelRoute("small", "claude-haiku", 2000)
+
+
+def tweets(count: int, length: int = 10):
+    return [
+        Tweet(author="alice", content="x" * length, timestamp="2024-05-01")
+        for _ in range(count)
+    ]
+
+
+def make_router(enabled=True, rules=""):
+    return ModelRouter(
+        enabled=enabled,
+        default_route=DEFAULT,
+        small_route=SMALL,
+        small_max_tweets=5,
+        small_max_chars=100,
+        template_routes=parse_template_rules(rules),
+    )
+
+
+def test_small_batches_need_both_limits():
+    router = make_router()
+    assert router.route(tweets(5, 20)) is SMALL
+    assert router.route(tweets(6, 1)) is DEFAULT
+    assert router.route(tweets(2, 51)) is DEFAULT
+
+
+def test_template_rules_win_over_size():
+    router = make_router(rules="digest=claude-haiku:1500, deep=claude-opus")
+    route = router.route(tweets(50), "digest")
+    assert (route.name, route.model, route.max_tokens) == ("template:digest", "claude-haiku", 1500)
+    assert router.route(tweets(1), "deep").model == "claude-opus"
+    # Unknown templates fall through to the size rule
+    assert router.route(tweets(1), "unknown") is SMALL
+
+
+def test_disabled_router_always_uses_the_default_route():
+    router = make_router(enabled=False, rules="digest=claude-haiku")
+    assert router.route(tweets(1), "digest") is DEFAULT
+
+
+@pytest.mark.parametrize("rules", ["digest", "=claude-haiku", "digest=", "digest=:100"])
+def test_malformed_template_rules_are_rejected(rules):
+    with pytest.raises(ValueError, match="MODEL_ROUTING_TEMPLATE_RULES"):
+        parse_template_rules(rules)
+
+
+def test_failures_count_latency_but_not_tokens():
+    router = make_router()
+    router.record(
+        SMALL,
+        4,
+        0.5,
+        {"input_tokens": 100, "cache_read_input_tokens": 50, "output_tokens": 20},
+    )
+    router.record(SMALL, 6, 1.5, {"input_tokens": 999}, success=False)
+    stats = router.get_stats()["routes"]["small"]
+    assert stats == {
+        "model": "claude-haiku",
+        "requests": 2,
+        "failures": 1,
+        "avg_latency_ms": 1000.0,
+        "avg_tweets": 5.0,
+        "avg_input_tokens": 150,
+        "avg_output_tokens": 20,
+    }
+
+
+def test_route_with_only_failures_has_no_token_averages():
+    router = make_router()
+    router.record(DEFAULT, 3, 2.0, success=False)
+    stats = router.get_stats()["routes"]["default"]
+    assert stats["avg_input_tokens"] is None
+    assert stats["avg_output_tokens"] is None
+
+
+def test_failed_analysis_is_recorded_against_its_route(monkeypatch):
+    router = make_router()
+    monkeypatch.setattr(analyze, "model_router", router)
+
+    async def analyze_tweets(*args, **kwargs):
+        raise ClaudeAPIError("Overloaded", status_code=529)
+
+    monkeypatch.setattr(claude_client, "analyze_tweets", analyze_tweets)
+    batch = tweets(3)
+    request = AnalyzeRequest(tweets=batch)
+    compaction = CompactionResult(batch, 2000, {"tokens_saved": 0})
+
+    with pytest.raises(ClaudeAPIError):
+        asyncio.run(analyze.run_claude_analysis(request, compaction, False, SMALL))
+    stats = router.get_stats()["routes"]["small"]
+    assert (stats["requests"], stats["failures"], stats["avg_tweets"]) == (1, 1, 3.0)
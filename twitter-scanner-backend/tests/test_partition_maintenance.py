@@ -0,0 +1,165 @@
+"""Tests for monthly partition helpers and the maintenance pass."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date
+
+import pytest
+
+from services import partition_maintenance as maintenance_module
+from services.partition_maintenance import (
+    FUTURE_PARTITION,
+    PartitionMaintenance,
+    add_months,
+    month_start,
+    partition_clause,
+    partition_definition,
+    partition_month,
+    partition_name,
+)
+
+
+@pytest.mark.parametrize(
+    "month, months, expected",
+    [
+        (date(2024, 1, 1), 1, date(2024, 2, 1)),
+        (date(2024, 12, 1), 1, date(2025, 1, 1)),
+        (date(2024, 1, 1), -1, date(2023, 12, 1)),
+        (date(2024, 3, 1), -14, date(2023, 1, 1)),
+        (date(2024, 3, 1), 24, date(2026, 3, 1)),
+        (date(2024, 3, 1), 0, date(2024, 3, 1)),
+    ],
+)
+def test_add_months(month, months, expected):
+    assert add_months(month, months) == expected
+
+
+def test_month_start_and_names():
+    assert month_start(date(2024, 2, 29)) == date(2024, 2, 1)
+    assert partition_name(date(2024, 2, 1)) == "p202402"
+    assert partition_month("p202402") == date(2024, 2, 1)
+    assert partition_month(FUTURE_PARTITION) is None
+
+
+def test_partition_definition_ends_at_next_month():
+    assert partition_definition(date(2024, 12, 1)) == (
+        "PARTITION p202412 VALUES LESS THAN (UNIX_TIMESTAMP('2025-01-01 00:00:00'))"
+    )
+
+
+def test_partition_clause_covers_every_month_and_the_catch_all():
+    clause = partition_clause(date(2024, 11, 1), date(2025, 2, 1))
+    assert clause.startswith("PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (")
+    names = [line.split()[1] for line in clause.splitlines()[1:-1]]
+    assert names == ["p202411", "p202412", "p202501", "p202502", FUTURE_PARTITION]
+    assert clause.rstrip().endswith(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE\n)")
+
+
+def test_partition_clause_single_month():
+    clause = partition_clause(date(2024, 5, 1), date(2024, 5, 1))
+    assert clause.count("PARTITION p2") == 1
+
+
+class FakeCursor:
+    """Serves INFORMATION_SCHEMA partitions and applies REORGANIZE/DROP to them."""
+
+    def __init__(self, partitions, lock_acquired=True):
+        self.partitions = list(partitions)
+        self.lock_acquired = lock_acquired
+        self.statements = []
+        self.result = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.statements.append(sql)
+        if sql.startswith("SELECT GET_LOCK"):
+            self.result = [(1 if self.lock_acquired else 0,)]
+        elif "INFORMATION_SCHEMA.PARTITIONS" in sql:
+            self.result = [(name, 0) for name in self.partitions]
+        elif "REORGANIZE PARTITION" in sql:
+            new = [word for word in sql.split() if word.startswith("p2")]
+            self.partitions = self.partitions[:-1] + new + [FUTURE_PARTITION]
+        elif "DROP PARTITION" in sql:
+            self.partitions.remove(sql.split()[-1])
+
+    async def fetchone(self):
+        return self.result[0]
+
+    async def fetchall(self):
+        return self.result
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    def install(partitions, lock_acquired=True) -> FakeCursor:
+        cursor = FakeCursor(partitions, lock_acquired)
+
+        class Pool:
+            @asynccontextmanager
+            async def get_connection(self):
+                class Connection:
+                    def cursor(self):
+                        return cursor
+
+                yield Connection()
+
+        monkeypatch.setattr(maintenance_module, "db_pool", Pool())
+        return cursor
+
+    return install
+
+
+@pytest.fixture
+def archived(monkeypatch):
+    months = []
+
+    async def archive(self, name, month):
+        months.append(name)
+        return 10
+
+    monkeypatch.setattr(PartitionMaintenance, "_archive", archive)
+    return months
+
+
+def make_maintenance(tmp_path) -> PartitionMaintenance:
+    return PartitionMaintenance(
+        retention_months=2, precreate_months=2, archive_dir=str(tmp_path), interval_hours=24
+    )
+
+
+def test_run_creates_future_months_and_drops_expired(tmp_path, fake_db, archived):
+    cursor = fake_db(["p202401", "p202402", "p202403", "p202404", FUTURE_PARTITION])
+    summary = asyncio.run(make_maintenance(tmp_path).run_once(today=date(2024, 4, 15)))
+    assert summary["created"] == ["p202405", "p202406"]
+    # Retention of 2 months before April keeps February onwards
+    assert summary["dropped"] == ["p202401"]
+    assert archived == ["p202401"]
+    assert summary["rows_archived"] == 10
+    assert cursor.partitions == ["p202402", "p202403", "p202404", "p202405", "p202406", FUTURE_PARTITION]
+
+
+def test_run_is_idempotent(tmp_path, fake_db, archived):
+    cursor = fake_db(["p202402", "p202403", "p202404", "p202405", "p202406", FUTURE_PARTITION])
+    summary = asyncio.run(make_maintenance(tmp_path).run_once(today=date(2024, 4, 15)))
+    assert summary["created"] == []
+    assert summary["dropped"] == []
+    assert not any("ALTER TABLE" in sql for sql in cursor.statements)
+
+
+def test_run_skips_when_another_process_holds_the_lock(tmp_path, fake_db, archived):
+    cursor = fake_db(["p202401", FUTURE_PARTITION], lock_acquired=False)
+    summary = asyncio.run(make_maintenance(tmp_path).run_once(today=date(2024, 4, 15)))
+    assert "skipped" in summary
+    assert cursor.partitions == ["p202401", FUTURE_PARTITION]
+
+
+def test_run_skips_unpartitioned_table(tmp_path, fake_db, archived):
+    fake_db([])
+    summary = asyncio.run(make_maintenance(tmp_path).run_once(today=date(2024, 4, 15)))
+    assert "not partitioned" in summary["skipped"]
@@ -0,0 +1,180 @@
+"""
+EXPLAIN-plan tests for the raw usage_statistics queries.
+
+These need a scratch MySQL database; they are skipped unless TEST_MYSQL_HOST
+is set (with TEST_MYSQL_PORT, TEST_MYSQL_USER, TEST_MYSQL_PASSWORD and
+TEST_MYSQL_DATABASE). The database's tables are dropped and rebuilt from
+the migrations, so never point these at real data.
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import aiomysql
+import pytest
+
+from core import database
+from core.database import ROLLUP_TABLES, UsageStatsDB
+from core.migrations import discover_migrations
+
+TEST_MYSQL_HOST = os.environ.get("TEST_MYSQL_HOST")
+ROWS = 10000
+CLIENTS = 100
+
+pytestmark = pytest.mark.skipif(
+    not TEST_MYSQL_HOST, reason="TEST_MYSQL_HOST not set (no scratch MySQL database)"
+)
+
+
+async def connect() -> aiomysql.Connection:
+    return await aiomysql.connect(
+        host=TEST_MYSQL_HOST,
+        port=int(os.environ.get("TEST_MYSQL_PORT", "3306")),
+        user=os.environ.get("TEST_MYSQL_USER", "root"),
+        password=os.environ.get("TEST_MYSQL_PASSWORD", ""),
+        db=os.environ.get("TEST_MYSQL_DATABASE", "twitter_scanner_test"),
+        autocommit=True,
+    )
+
+
+async def build_schema(base: datetime):
+    """Recreate the tables from the migrations and fill them with spread-out rows."""
+    conn = await connect()
+    try:
+        async with conn.cursor() as cursor:
+            for table in ["usage_statistics"] + [table for table, _ in ROLLUP_TABLES]:
+                await cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            for migration in discover_migrations():
+                await migration.load().upgrade(cursor)
+            # One row every ~14 minutes over 100 days, spread over 100 clients
+            rows = [
+                (
+                    f"user-{index % CLIENTS}",
+                    f"10.0.{index % CLIENTS}.1",
+                    "pytest",
+                    True,
+                    "success",
+                    10,
+                    1000,
+                    500,
+                    base + timedelta(seconds=index * 864),
+                )
+                for index in range(ROWS)
+            ]
+            await cursor.executemany("""
+                INSERT INTO usage_statistics
+                (user_id, client_ip, user_agent, success, outcome, twitter_count, content_length, processing_time_ms, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, rows)
+            await cursor.execute("ANALYZE TABLE usage_statistics")
+            await cursor.fetchall()
+    finally:
+        conn.close()
+
+
+class ExplainCursor:
+    """Cursor that EXPLAINs each statement instead of running it."""
+
+    def __init__(self, conn: aiomysql.Connection, plans: list):
+        self.conn = conn
+        self.plans = plans
+        self.cursor = None
+
+    async def __aenter__(self):
+        self.cursor = await self.conn.cursor(aiomysql.DictCursor)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.cursor.close()
+
+    async def execute(self, sql, params=None):
+        await self.cursor.execute(f"EXPLAIN {sql}", params)
+        self.plans.append(await self.cursor.fetchall())
+
+    async def fetchone(self):
+        return (0,)
+
+    async def fetchall(self):
+        return []
+
+
+class ExplainConnection:
+    """Connection whose cursors only EXPLAIN; transactions pass through."""
+
+    def __init__(self, conn: aiomysql.Connection, plans: list):
+        self.conn = conn
+        self.plans = plans
+
+    def cursor(self):
+        return ExplainCursor(self.conn, self.plans)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+class ExplainPool:
+    """Stand-in for db_pool handing out EXPLAIN-only connections."""
+
+    def __init__(self):
+        self.plans = []
+
+    @asynccontextmanager
+    async def get_connection(self):
+        conn = await connect()
+        try:
+            yield ExplainConnection(conn, self.plans)
+        finally:
+            conn.close()
+
+
+@pytest.fixture(scope="module")
+def base_time():
+    base = datetime.now().replace(microsecond=0) - timedelta(days=100)
+    try:
+        asyncio.run(build_schema(base))
+    except (aiomysql.Error, OSError) as e:
+        pytest.skip(f"Scratch MySQL database unavailable: {e}")
+    return base
+
+
+@pytest.fixture
+def explain_pool(base_time, monkeypatch):
+    pool = ExplainPool()
+    monkeypatch.setattr(database, "db_pool", pool)
+    return pool
+
+
+def usage_statistics_keys(plans) -> list:
+    """Index chosen for usage_statistics in each EXPLAIN that reads it."""
+    return [
+        row["key"]
+        for plan in plans
+        for row in plan
+        if row["table"] == "usage_statistics"
+    ]
+
+
+def test_date_range_stats_use_created_client_index(base_time, explain_pool):
+    day = (base_time + timedelta(days=50)).replace(hour=0, minute=0, second=0)
+    asyncio.run(UsageStatsDB.rebuild_rollups(day, day + timedelta(days=1)))
+    keys = usage_statistics_keys(explain_pool.plans)
+    # The COUNT(*) over the range and the INSERT ... SELECT aggregate
+    assert keys == ["idx_created_client", "idx_created_client"]
+
+
+def test_client_ip_pages_use_client_id_index(explain_pool):
+    asyncio.run(UsageStatsDB.get_recent_records(limit=50, client_ip="10.0.7.1"))
+    asyncio.run(
+        UsageStatsDB.get_recent_records(limit=50, client_ip="10.0.7.1", before_id=ROWS // 2)
+    )
+    assert usage_statistics_keys(explain_pool.plans) == ["idx_client_id", "idx_client_id"]
+
+
+def test_user_id_pages_use_user_id_index(explain_pool):
+    asyncio.run(UsageStatsDB.get_recent_records(limit=50, user_id="user-7"))
+    asyncio.run(
+        UsageStatsDB.get_recent_records(limit=50, user_id="user-7", before_id=ROWS // 2)
+    )
+    assert usage_statistics_keys(explain_pool.plans) == ["idx_user_id_id", "idx_user_id_id"]
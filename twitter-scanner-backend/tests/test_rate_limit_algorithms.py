@@ -0,0 +1,94 @@
+"""Tests for the GCRA and sliding window counter rate limiting algorithms."""
+
+import pytest
+
+from utils.rate_limit_algorithms import GCRA, SlidingWindowCounter
+
+
+def allowed_count(algorithm, key: str, now: float, attempts: int) -> int:
+    return sum(algorithm.allow(key, now)[0] for _ in range(attempts))
+
+
+def test_gcra_allows_a_full_burst_then_spaces_requests():
+    gcra = GCRA(max_requests=5, window=10)
+    assert allowed_count(gcra, "a", 0.0, 10) == 5
+    allowed, retry_after = gcra.allow("a", 0.0)
+    assert not allowed
+    assert retry_after == pytest.approx(2.0)
+    assert not gcra.allow("a", 1.9)[0]
+    assert gcra.allow("a", 2.0)[0]
+
+
+def test_gcra_sustained_rate_matches_limit():
+    gcra = GCRA(max_requests=5, window=10)
+    allowed = sum(gcra.allow("a", step * 0.5)[0] for step in range(200))
+    # A full burst, then one request per emission interval over 100s
+    assert allowed == 5 + 50 - 1
+
+
+def test_gcra_keys_are_independent():
+    gcra = GCRA(max_requests=2, window=10)
+    assert allowed_count(gcra, "a", 0.0, 3) == 2
+    assert allowed_count(gcra, "b", 0.0, 3) == 2
+
+
+def test_gcra_evicts_keys_once_idle():
+    gcra = GCRA(max_requests=5, window=10)
+    gcra.allow("a", 0.0)
+    gcra.allow("b", 1.0)
+    assert gcra.evict_expired(now=2.0) == 1
+    assert list(gcra.state) == ["b"]
+    # Checks evict idle keys lazily as well
+    gcra.allow("c", 3.0)
+    assert list(gcra.state) == ["c"]
+    assert gcra.get_stats() == {"algorithm": "gcra", "keys": 1, "evictions": 2}
+
+
+def test_sliding_window_blocks_at_the_limit():
+    counter = SlidingWindowCounter(max_requests=10, window=10)
+    assert allowed_count(counter, "a", 100.0, 15) == 10
+    allowed, retry_after = counter.allow("a", 100.0)
+    assert not allowed
+    assert retry_after == pytest.approx(11.0)
+
+
+def test_sliding_window_weights_the_previous_window():
+    counter = SlidingWindowCounter(max_requests=10, window=10)
+    assert allowed_count(counter, "a", 100.0, 10) == 10
+    # Halfway through the next window the previous one counts for 5
+    assert allowed_count(counter, "a", 115.0, 10) == 5
+    allowed, retry_after = counter.allow("a", 115.0)
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+    assert counter.allow("a", 116.0)[0]
+
+
+def test_sliding_window_retry_after_is_when_a_request_fits():
+    counter = SlidingWindowCounter(max_requests=10, window=10)
+    allowed_count(counter, "a", 100.0, 10)
+    _, retry_after = counter.allow("a", 100.0)
+    assert not counter.allow("a", 100.0 + retry_after - 0.5)[0]
+    assert counter.allow("a", 100.0 + retry_after)[0]
+
+
+def test_sliding_window_forgets_windows_older_than_the_previous_one():
+    counter = SlidingWindowCounter(max_requests=10, window=10)
+    allowed_count(counter, "a", 100.0, 10)
+    assert allowed_count(counter, "a", 120.0, 15) == 10
+
+
+def test_sliding_window_evicts_keys_after_two_windows():
+    counter = SlidingWindowCounter(max_requests=10, window=10)
+    counter.allow("a", 100.0)
+    counter.allow("b", 115.0)
+    assert counter.evict_expired(now=119.0) == 0
+    assert counter.evict_expired(now=120.0) == 1
+    assert list(counter.state) == ["b"]
+
+
+def test_eviction_limit_bounds_work_per_call():
+    gcra = GCRA(max_requests=1, window=1)
+    for index in range(10):
+        gcra.allow(f"key{index}", 0.0)
+    assert gcra.evict_expired(now=5.0, limit=4) == 4
+    assert len(gcra.state) == 6
@@ -0,0 +1,139 @@
+"""Tests for client deadlines and cancellation of abandoned analyses."""
+
+import asyncio
+
+import pytest
+
+from api.routes.analyze import (
+    RequestCancelledError,
+    get_client_timeout,
+    run_until_cancelled,
+)
+from core.config import settings
+from core.database import OUTCOME_CANCELLED, OUTCOME_DEADLINE_EXCEEDED
+from services.claude_client import ClaudeClient, _request_deadline, request_deadline
+from services.retry_policy import RetryPolicy
+
+
+class FakeRequest:
+    """Request whose receive() reports a disconnect once disconnect is set."""
+
+    def __init__(self, headers=None):
+        self.headers = headers or {}
+        self.disconnect = asyncio.Event()
+
+    async def receive(self):
+        await self.disconnect.wait()
+        return {"type": "http.disconnect"}
+
+
+def test_nested_deadlines_never_extend_the_outer_one(clock):
+    with request_deadline(10):
+        assert _request_deadline.get() == clock() + 10
+        with request_deadline(30):
+            assert _request_deadline.get() == clock() + 10
+        with request_deadline(None):
+            assert _request_deadline.get() == clock() + 10
+        with request_deadline(4):
+            assert _request_deadline.get() == clock() + 4
+        assert _request_deadline.get() == clock() + 10
+    assert _request_deadline.get() is None
+
+
+def test_retries_and_read_timeouts_are_clamped_to_the_deadline(clock):
+    client = ClaudeClient()
+    client.retry_policy = RetryPolicy(deadline=150)
+    assert client._start_retry_state().remaining_time() == 150
+
+    with request_deadline(5):
+        retry_state = client._start_retry_state()
+    assert retry_state.remaining_time() == 5
+    assert client._build_timeout(60, retry_state).read == 5
+    clock.advance(4.5)
+    # Never below one second, so a last attempt can still be made
+    assert client._build_timeout(60, retry_state).read == 1.0
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(None, None), ("2500", 2.5), ("0", None), ("-5", None), ("soon", None)],
+)
+def test_client_timeout_header_parsing(value, expected):
+    headers = {} if value is None else {settings.client_timeout_header: value}
+    assert get_client_timeout(FakeRequest(headers)) == expected
+
+
+def test_finished_work_is_returned():
+    async def scenario():
+        async def work():
+            return "digest"
+
+        return await run_until_cancelled(FakeRequest(), work, timeout=1)
+
+    assert asyncio.run(scenario()) == "digest"
+
+
+def test_work_sees_the_client_deadline(clock):
+    async def scenario():
+        async def work():
+            return _request_deadline.get()
+
+        return await run_until_cancelled(FakeRequest(), work, timeout=3)
+
+    assert asyncio.run(scenario()) == clock() + 3
+
+
+def test_disconnect_cancels_the_work():
+    cancelled = []
+
+    async def scenario():
+        request = FakeRequest()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def disconnect_soon():
+            await asyncio.sleep(0.01)
+            request.disconnect.set()
+
+        asyncio.ensure_future(disconnect_soon())
+        with pytest.raises(RequestCancelledError) as error:
+            await run_until_cancelled(request, work)
+        return error.value.outcome
+
+    assert asyncio.run(scenario()) == OUTCOME_CANCELLED
+    assert cancelled == [True]
+
+
+def test_deadline_cancels_the_work():
+    cancelled = []
+
+    async def scenario():
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        with pytest.raises(RequestCancelledError) as error:
+            await run_until_cancelled(FakeRequest(), work, timeout=0.01)
+        return error.value.outcome
+
+    assert asyncio.run(scenario()) == OUTCOME_DEADLINE_EXCEEDED
+    assert cancelled == [True]
+
+
+def test_work_errors_propagate():
+    async def scenario():
+        async def work():
+            raise ValueError("boom")
+
+        await run_until_cancelled(FakeRequest(), work, timeout=1)
+
+    with pytest.raises(ValueError, match="boom"):
+        asyncio.run(scenario())
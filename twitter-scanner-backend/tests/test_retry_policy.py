@@ -0,0 +1,117 @@
+"""Tests for RetryPolicy, parse_retry_after and CircuitBreaker."""
+
+import pytest
+
+from services.retry_policy import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    parse_retry_after,
+)
+
+
+def test_parse_retry_after_seconds_and_invalid_values():
+    assert parse_retry_after({"retry-after": "2.5"}) == 2.5
+    assert parse_retry_after({"retry-after": "-3"}) == 0.0
+    assert parse_retry_after({"retry-after": "soon"}) is None
+    assert parse_retry_after({}) is None
+
+
+def test_parse_retry_after_http_date_in_the_past_is_zero():
+    assert parse_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+
+
+def test_delays_stay_within_bounds_and_attempts_are_capped(clock):
+    policy = RetryPolicy(max_retries=3, base_delay=1.0, max_delay=5.0, deadline=1000.0)
+    state = policy.start()
+
+    delays = []
+    while True:
+        state.next_attempt()
+        delay = state.next_delay()
+        if delay is None:
+            break
+        delays.append(delay)
+
+    assert state.attempt == state.max_attempts == 4
+    assert len(delays) == 3
+    assert all(1.0 <= delay <= 5.0 for delay in delays)
+
+
+def test_retry_after_raises_the_delay(clock):
+    state = RetryPolicy(base_delay=0.1, max_delay=0.2, deadline=100.0).start()
+    state.next_attempt()
+    assert state.next_delay(retry_after=7.0) == 7.0
+
+
+def test_no_retry_when_delay_would_overrun_the_deadline(clock):
+    state = RetryPolicy(max_retries=5, base_delay=1.0, deadline=10.0).start()
+    state.next_attempt()
+    clock.advance(9.5)
+    assert state.next_delay() is None
+
+
+def test_per_request_overrides():
+    state = RetryPolicy(max_retries=3, deadline=150.0).start(max_retries=0, deadline=5.0)
+    state.next_attempt()
+    assert state.max_attempts == 1
+    assert state.next_delay() is None
+    assert state.remaining_time() <= 5.0
+
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=30.0)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.retry_after == pytest.approx(30.0)
+    assert breaker.rejected_calls == 1
+
+
+def test_half_open_admits_limited_probes_then_closes(clock):
+    breaker = CircuitBreaker(
+        "test", failure_threshold=1, recovery_timeout=10.0, half_open_max_calls=1
+    )
+    breaker.record_failure()
+    clock.advance(10.0)
+
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=10.0)
+    breaker.record_failure()
+    clock.advance(10.0)
+    breaker.before_call()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+
+
+def test_stale_half_open_probe_slots_are_released(clock):
+    breaker = CircuitBreaker(
+        "test", failure_threshold=1, recovery_timeout=10.0, half_open_max_calls=1
+    )
+    breaker.record_failure()
+    clock.advance(10.0)
+    breaker.before_call()  # probe that never reports back
+
+    clock.advance(10.0)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
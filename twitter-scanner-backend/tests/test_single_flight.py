@@ -0,0 +1,159 @@
+"""Tests for single-flight coalescing."""
+
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("key", work) for _ in range(3)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [value for value, _ in results] == ["result"] * 3
+    assert sorted(shared for _, shared in results) == [False, True, True]
+    assert flights.flights == {}
+    assert flights.get_stats()["shared_calls"] == 2
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        return await asyncio.gather(flights.do("a", work), flights.do("b", work))
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_errors_are_shared_and_not_retained():
+    flights = SingleFlight("test", result_ttl=60)
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        return await asyncio.gather(
+            flights.do("key", failing), flights.do("key", failing), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.results == {}
+
+
+def test_one_caller_leaving_does_not_cancel_the_shared_call():
+    flights = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        first = asyncio.create_task(flights.do("key", work))
+        second = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == ("done", True)
+
+
+def test_call_is_cancelled_when_every_caller_leaves():
+    flights = SingleFlight("test")
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        caller = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert cancelled == [True]
+    assert flights.flights == {}
+
+
+def test_results_are_retained_for_the_ttl(monkeypatch):
+    flights = SingleFlight("test", result_ttl=10)
+    calls = []
+    now = [1000.0]
+    monkeypatch.setattr("services.single_flight.time.time", lambda: now[0])
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        first = await flights.do("key", work)
+        repeat = await flights.do("key", work)
+        fresh = await flights.do("key", work, reuse_result=False)
+        now[0] += 11
+        expired = await flights.do("key", work)
+        return first, repeat, fresh, expired
+
+    assert asyncio.run(scenario()) == ((1, False), (1, True), (2, False), (3, False))
+
+
+def test_retained_results_are_bounded():
+    flights = SingleFlight("test", result_ttl=60, max_results=2)
+
+    async def work():
+        return "value"
+
+    async def scenario():
+        for key in ("a", "b", "c"):
+            await flights.do(key, work)
+
+    asyncio.run(scenario())
+    assert list(flights.results) == ["b", "c"]
+
+
+def test_results_rejected_by_retain_are_not_kept():
+    flights = SingleFlight("test", result_ttl=60)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return "partial" if len(calls) == 1 else "complete"
+
+    def retain(value):
+        return value != "partial"
+
+    async def scenario():
+        first = await flights.do("key", work, retain=retain)
+        second = await flights.do("key", work, retain=retain)
+        third = await flights.do("key", work, retain=retain)
+        return first, second, third
+
+    assert asyncio.run(scenario()) == (
+        ("partial", False),
+        ("complete", False),
+        ("complete", True),
+    )
@@ -0,0 +1,136 @@
+"""Tests for the streaming usage record export endpoint."""
+
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routes import stats
+from core.database import USAGE_RECORD_COLUMNS, UsageStatsDB, record_filters
+
+ROWS = [
+    (1, "u1", "1.1.1.1", "pytest", 1, "success", 10, 100, 50, datetime(2024, 5, 1, 10)),
+    (2, None, "2.2.2.2", None, 0, "error", 3, 30, 70, datetime(2024, 5, 2, 11)),
+    (3, "u1", "1.1.1.1", "pytest", 1, "success", 5, 50, 40, datetime(2024, 5, 3, 12)),
+]
+
+
+@pytest.fixture
+def export(monkeypatch):
+    """Serve ROWS (two per chunk) from a fake stream_records and record its filters."""
+
+    class Export:
+        filters = []
+        rows = ROWS
+        error = None
+
+    async def stream_records(**filters):
+        Export.filters.append(filters)
+        if Export.error is not None:
+            raise Export.error
+        for index in range(0, len(Export.rows), 2):
+            yield Export.rows[index : index + 2]
+
+    monkeypatch.setattr(UsageStatsDB, "stream_records", staticmethod(stream_records))
+    monkeypatch.setattr(stats, "export_slots", asyncio.Semaphore(1))
+    app = FastAPI()
+    app.include_router(stats.router)
+    Export.client = TestClient(app)
+    return Export
+
+
+def test_ndjson_export(export):
+    response = export.client.get("/api/stats/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert 'filename="usage_statistics-all-now.ndjson"' in response.headers["content-disposition"]
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["id"] for record in records] == [1, 2, 3]
+    assert records[1] == {
+        "id": 2,
+        "user_id": None,
+        "client_ip": "2.2.2.2",
+        "user_agent": None,
+        "success": False,
+        "outcome": "error",
+        "twitter_count": 3,
+        "content_length": 30,
+        "processing_time_ms": 70,
+        "created_at": "2024-05-02T11:00:00",
+    }
+
+
+def test_csv_export(export):
+    response = export.client.get("/api/stats/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == list(USAGE_RECORD_COLUMNS)
+    assert [row[0] for row in rows[1:]] == ["1", "2", "3"]
+    assert rows[2][1] == ""
+    assert rows[3][-1] == "2024-05-03T12:00:00"
+
+
+@pytest.mark.parametrize("format, body", [("ndjson", ""), ("csv", ",".join(USAGE_RECORD_COLUMNS) + "\r\n")])
+def test_empty_export(export, format, body):
+    export.rows = []
+    response = export.client.get("/api/stats/export", params={"format": format})
+    assert response.status_code == 200
+    assert response.text == body
+
+
+def test_date_filters_cover_whole_days(export):
+    response = export.client.get(
+        "/api/stats/export",
+        params={"start": "2024-05-01", "end": "2024-05-02", "user_id": "u1"},
+    )
+    assert response.status_code == 200
+    assert export.filters == [
+        {
+            "user_id": "u1",
+            "client_ip": None,
+            "start": datetime(2024, 5, 1),
+            "end": datetime(2024, 5, 3),
+        }
+    ]
+    assert 'filename="usage_statistics-2024-05-01-2024-05-02.ndjson"' in response.headers["content-disposition"]
+
+
+def test_record_filters_build_a_half_open_range():
+    where, params = record_filters(
+        client_ip="1.1.1.1", start=datetime(2024, 5, 1), end=datetime(2024, 5, 3)
+    )
+    assert where == "WHERE client_ip = %s AND created_at >= %s AND created_at < %s"
+    assert params == ["1.1.1.1", datetime(2024, 5, 1), datetime(2024, 5, 3)]
+    assert record_filters() == ("", [])
+
+
+@pytest.mark.parametrize("params", [{"start": "2024-13-01"}, {"end": "yesterday"}, {"format": "xml"}])
+def test_invalid_parameters_are_rejected(export, params):
+    response = export.client.get("/api/stats/export", params=params)
+    assert response.status_code in (400, 422)
+    assert export.filters == []
+
+
+def test_database_error_is_a_500_and_frees_the_slot(export):
+    export.error = RuntimeError("connection refused")
+    assert export.client.get("/api/stats/export").status_code == 500
+    assert not stats.export_slots.locked()
+
+
+def test_concurrent_exports_are_capped(export):
+    asyncio.run(stats.export_slots.acquire())
+    response = export.client.get("/api/stats/export")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "30"
+    assert export.filters == []
+
+    stats.export_slots.release()
+    assert export.client.get("/api/stats/export").status_code == 200
+    # Finished exports give their slot back
+    assert not stats.export_slots.locked()
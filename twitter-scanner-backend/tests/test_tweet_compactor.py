@@ -0,0 +1,112 @@
+"""Tests for tweet compaction before prompt construction."""
+
+import pytest
+
+from core.config import settings
+from core.models import Tweet
+from services.tweet_compactor import TweetCompactor
+from utils.tokens import estimate_tokens
+
+
+def format_tweet(tweet: Tweet) -> str:
+    return f"@{tweet.author}: {tweet.content} {tweet.url or ''}"
+
+
+def tweet(content: str, author: str = "alice", url=None) -> Tweet:
+    return Tweet(author=author, content=content, timestamp="2024-05-01", url=url)
+
+
+@pytest.fixture
+def compactor(monkeypatch):
+    monkeypatch.setattr(settings, "compaction_enabled", True)
+    monkeypatch.setattr(settings, "compaction_max_tweet_tokens", 1000)
+    monkeypatch.setattr(settings, "compaction_output_ratio", 0.75)
+    monkeypatch.setattr(settings, "compaction_min_output_tokens", 1500)
+    return TweetCompactor(format_tweet)
+
+
+def test_normalize_collapses_whitespace_and_invisible_characters():
+    text = "  Big​  news\t today \n\n\n  details　here  "
+    assert TweetCompactor.normalize_text(text) == "Big news today\ndetails here"
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("https://www.example.com/post/?utm_source=x&id=7#top", "https://example.com/post?id=7"),
+        ("https://x.com/alice/status/1?s=20&t=abc", "https://x.com/alice/status/1"),
+        ("https://example.com", "https://example.com/"),
+    ],
+)
+def test_shorten_url_drops_tracking_noise(url, expected):
+    assert TweetCompactor.shorten_url(url) == expected
+
+
+def test_repeated_and_own_urls_are_removed_from_content(compactor):
+    result = compactor.compact(
+        [
+            tweet(
+                "Read https://example.com/a?utm_medium=s and https://www.example.com/a/ "
+                "then https://x.com/alice/status/1?s=20",
+                url="https://x.com/alice/status/1",
+            )
+        ],
+        4000,
+    )
+    [compacted] = result.tweets
+    assert compacted.content == "Read https://example.com/a and then"
+    assert compacted.url == "https://x.com/alice/status/1"
+
+
+def test_duplicates_and_retweets_keep_the_first_tweet(compactor):
+    result = compactor.compact(
+        [
+            tweet("Launch day!"),
+            tweet("RT @alice: Launch  day!", author="bob"),
+            tweet("launch day!", author="carol"),
+            tweet("Something else"),
+        ],
+        4000,
+    )
+    assert [t.author for t in result.tweets] == ["alice", "alice"]
+    assert [t.content for t in result.tweets] == ["Launch day!", "Something else"]
+    assert result.stats["steps"]["dedupe"]["tweets"] == 2
+
+
+def test_long_tweets_are_truncated(compactor, monkeypatch):
+    monkeypatch.setattr(settings, "compaction_max_tweet_tokens", 10)
+    [compacted] = compactor.compact([tweet("word " * 200)], 4000).tweets
+    assert compacted.content.endswith("…")
+    assert len(compacted.content) <= 41
+
+
+def test_budget_keeps_tweets_in_order_until_it_is_used(compactor):
+    tweets = [tweet(f"Tweet number {index} " + "detail " * 20) for index in range(10)]
+    per_tweet = estimate_tokens(format_tweet(tweets[0]))
+    result = compactor.compact(tweets, 4000, input_budget=per_tweet * 3)
+    assert [t.content for t in result.tweets] == [t.content.strip() for t in tweets[:3]]
+    assert result.stats["tweets_after"] == 3
+    assert result.tokens_saved == result.stats["tokens_before"] - result.stats["tokens_after"]
+
+
+def test_first_tweet_is_kept_even_over_budget(compactor):
+    result = compactor.compact([tweet("detail " * 100)], 4000, input_budget=1)
+    assert len(result.tweets) == 1
+
+
+def test_max_tokens_follows_input_size_within_bounds(compactor):
+    assert TweetCompactor.pick_max_tokens(100, 4000) == 1500
+    assert TweetCompactor.pick_max_tokens(4000, 4000) == 3000
+    assert TweetCompactor.pick_max_tokens(100_000, 4000) == 4000
+    # The floor never exceeds the route's ceiling
+    assert TweetCompactor.pick_max_tokens(100, 1000) == 1000
+
+
+def test_disabled_compaction_passes_tweets_through(compactor, monkeypatch):
+    monkeypatch.setattr(settings, "compaction_enabled", False)
+    tweets = [tweet("Launch  day!"), tweet("Launch  day!")]
+    result = compactor.compact(tweets, 4000)
+    assert result.tweets is tweets
+    assert result.max_tokens == 4000
+    assert result.tokens_saved == 0
+    assert compactor.get_stats()["requests"] == 0
@@ -0,0 +1,168 @@
+"""Tests for the pool of Claude API keys and endpoints."""
+
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from core.config import settings
+from services.upstream_pool import (
+    NoUpstreamAvailableError,
+    UpstreamEndpoint,
+    UpstreamPool,
+)
+
+
+@pytest.fixture
+def pool(clock, monkeypatch):
+    monkeypatch.setattr(settings, "upstream_ejection_seconds", 30)
+    monkeypatch.setattr(settings, "upstream_ejection_failure_threshold", 3)
+    return UpstreamPool(
+        [
+            UpstreamEndpoint("a", "key-a", "https://a.example/v1/messages"),
+            UpstreamEndpoint("b", "key-b", "https://b.example/v1/messages"),
+        ]
+    )
+
+
+def budget_headers(remaining: int, limit: int = 100, reset: str = None):
+    headers = {
+        "anthropic-ratelimit-requests-remaining": str(remaining),
+        "anthropic-ratelimit-requests-limit": str(limit),
+    }
+    if reset:
+        headers["anthropic-ratelimit-requests-reset"] = reset
+    return headers
+
+
+def test_select_prefers_the_least_loaded_endpoint(pool):
+    with pool.lease() as first:
+        with pool.lease() as second:
+            assert {first.endpoint.name, second.endpoint.name} == {"a", "b"}
+    assert [endpoint.in_flight for endpoint in pool.endpoints] == [0, 0]
+
+
+def test_select_weighs_rate_limit_utilization(pool):
+    a, b = pool.endpoints
+    with pool.lease() as lease:
+        lease.record_response(200, budget_headers(remaining=10))
+    assert lease.endpoint is a
+    # a has used 90% of its window, b is unknown (treated as unused)
+    assert pool.select() is b
+
+
+def test_429_ejects_the_key_for_retry_after(pool, clock):
+    a, b = pool.endpoints
+    with pool.lease() as lease:
+        lease.record_response(429, {}, retry_after=5)
+    assert a.is_ejected(clock())
+    assert a.throttled == 1
+    assert pool.select() is b
+    clock.advance(5)
+    assert not a.is_ejected(clock())
+
+
+def test_429_without_retry_after_uses_the_ejection_period(pool, clock):
+    with pool.lease() as lease:
+        lease.record_response(429, {})
+    clock.advance(29)
+    assert lease.endpoint.is_ejected(clock())
+    clock.advance(1)
+    assert not lease.endpoint.is_ejected(clock())
+
+
+def test_repeated_failures_eject_the_key(pool, clock):
+    a = pool.endpoints[0]
+    with pool.lease() as lease:
+        pass
+    lease.record_failure("timeout")
+    lease.record_response(503, {})
+    assert not a.is_ejected(clock())
+    lease.record_response(500, {})
+    assert a.is_ejected(clock())
+    assert a.consecutive_failures == 0
+
+
+def test_success_resets_the_failure_count(pool, clock):
+    with pool.lease() as lease:
+        pass
+    lease.record_failure("timeout")
+    lease.record_failure("timeout")
+    lease.record_response(200, {})
+    lease.record_failure("timeout")
+    assert not lease.endpoint.is_ejected(clock())
+
+
+def test_no_upstream_when_every_key_is_ejected(pool, clock):
+    for endpoint in pool.endpoints:
+        endpoint.eject(12, "test")
+    clock.advance(2)
+    with pytest.raises(NoUpstreamAvailableError) as error:
+        pool.select()
+    assert error.value.retry_after == pytest.approx(10)
+
+
+def test_exhausted_budget_takes_the_key_out_until_reset(pool):
+    reset = datetime.fromtimestamp(time.time() + 20, tz=timezone.utc).isoformat()
+    for endpoint in pool.endpoints:
+        with pool.lease() as lease:
+            pass
+        lease.record_response(200, budget_headers(remaining=1, reset=reset))
+        # Calls are deducted locally until the next response reports the budget
+        endpoint.requests_budget.spend(1)
+    with pytest.raises(NoUpstreamAvailableError) as error:
+        pool.select()
+    assert 18 <= error.value.retry_after <= 20
+
+
+def test_token_budget_must_cover_the_estimate(pool):
+    a, b = pool.endpoints
+    with pool.lease() as lease:
+        lease.record_response(
+            200,
+            {
+                "anthropic-ratelimit-input-tokens-remaining": "500",
+                "anthropic-ratelimit-input-tokens-limit": "1000",
+            },
+        )
+    assert a.has_budget(500)
+    assert not a.has_budget(501)
+    assert pool.select(estimated_tokens=501) is b
+
+
+def test_invalid_headers_are_ignored(pool):
+    a = pool.endpoints[0]
+    with pool.lease() as lease:
+        lease.record_response(200, {"anthropic-ratelimit-requests-remaining": "many"})
+    assert a.requests_budget.current() is None
+
+
+@pytest.mark.parametrize(
+    "keys, urls, expected",
+    [
+        ("k1,k2", "", [("k1", "default"), ("k2", "default")]),
+        ("k1,k2", "u1,u2", [("k1", "u1"), ("k2", "u2")]),
+        ("", "u1,u2", [("single", "u1"), ("single", "u2")]),
+    ],
+)
+def test_from_settings_pairs_keys_and_urls(monkeypatch, keys, urls, expected):
+    monkeypatch.setattr(settings, "claude_api_key", "single")
+    monkeypatch.setattr(settings, "claude_api_url", "default")
+    monkeypatch.setattr(settings, "claude_api_keys", keys)
+    monkeypatch.setattr(settings, "claude_api_urls", urls)
+    pool = UpstreamPool.from_settings()
+    assert [(e.api_key, e.api_url) for e in pool.endpoints] == expected
+
+
+def test_from_settings_rejects_mismatched_lists(monkeypatch):
+    monkeypatch.setattr(settings, "claude_api_keys", "k1,k2,k3")
+    monkeypatch.setattr(settings, "claude_api_urls", "u1,u2")
+    with pytest.raises(ValueError, match="one URL per key"):
+        UpstreamPool.from_settings()
+
+
+def test_from_settings_requires_a_key(monkeypatch):
+    monkeypatch.setattr(settings, "claude_api_key", "")
+    monkeypatch.setattr(settings, "claude_api_keys", "")
+    with pytest.raises(ValueError, match="CLAUDE_API_KEY"):
+        UpstreamPool.from_settings()
@@ -0,0 +1,53 @@
+"""Tests for the usage cost model and the compaction stats it reads."""
+
+import pytest
+
+from core.config import settings
+from core.models import Tweet
+from services.tweet_compactor import tweet_compactor
+from services.usage_cost import UsageCostModel
+
+TWEETS = [
+    Tweet(author="alice", content="Shipping a new release today", timestamp="2024-05-01"),
+    Tweet(author="bob", content="Benchmarks look   good", timestamp="2024-05-01"),
+]
+
+
+def make_model() -> UsageCostModel:
+    return UsageCostModel(
+        base=0.5, per_tweet=0.01, per_1k_input_tokens=0.1, per_1k_output_tokens=0.5
+    )
+
+
+def test_cost_formula():
+    assert make_model().cost(10, 2000, 1000) == pytest.approx(0.5 + 0.1 + 0.2 + 0.5)
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_estimate_works_with_and_without_compaction(monkeypatch, enabled):
+    monkeypatch.setattr(settings, "compaction_enabled", enabled)
+    compaction = tweet_compactor.compact(TWEETS, 1000)
+    assert compaction.stats["tokens_after"] > 0
+    assert compaction.stats["tokens_saved"] >= 0
+    units = make_model().estimate(compaction, system_prompt="Be brief")
+    assert units > make_model().cost(len(TWEETS), 0, compaction.max_tokens)
+
+
+def test_disabled_compaction_keeps_tweets_and_output_budget(monkeypatch):
+    monkeypatch.setattr(settings, "compaction_enabled", False)
+    compaction = tweet_compactor.compact(TWEETS, 1234)
+    assert compaction.tweets == TWEETS
+    assert compaction.max_tokens == 1234
+    assert compaction.stats["tokens_before"] == compaction.stats["tokens_after"]
+    assert compaction.tokens_saved == 0
+
+
+def test_actual_counts_cached_input_tokens():
+    usage = {
+        "input_tokens": 1000,
+        "cache_read_input_tokens": 500,
+        "cache_creation_input_tokens": 500,
+        "output_tokens": 1000,
+    }
+    assert make_model().actual(10, usage) == make_model().cost(10, 2000, 1000)
+    assert make_model().actual(10, None) == make_model().cost(10, 0, 0)
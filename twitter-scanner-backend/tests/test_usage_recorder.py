@@ -0,0 +1,149 @@
+"""Tests for the usage recorder's batch write retries."""
+
+import asyncio
+
+import pytest
+
+from services import usage_recorder as recorder_module
+from services.usage_recorder import UsageRecorder
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Record write attempts; each entry in failures fails one attempt."""
+
+    class Writes:
+        batches = []
+        failures = []
+        sleeps = []
+
+    async def add_usage_records(batch):
+        Writes.batches.append(list(batch))
+        if Writes.failures:
+            raise Writes.failures.pop(0)
+
+    async def sleep(delay):
+        Writes.sleeps.append(delay)
+
+    monkeypatch.setattr(
+        recorder_module.UsageStatsDB, "add_usage_records", staticmethod(add_usage_records)
+    )
+    monkeypatch.setattr(recorder_module.asyncio, "sleep", sleep)
+    return Writes
+
+
+def make_recorder(**overrides) -> UsageRecorder:
+    options = dict(max_queue=10, batch_size=5, flush_interval=1.0, max_retries=3)
+    options.update(overrides)
+    return UsageRecorder(**options)
+
+
+def test_failed_write_is_retried_until_it_succeeds(writes):
+    writes.failures = [ConnectionError("gone"), ConnectionError("gone")]
+    recorder = make_recorder()
+    asyncio.run(recorder.flush([{"id": 1}, {"id": 2}]))
+    assert len(writes.batches) == 3
+    assert len(writes.sleeps) == 2
+    stats = recorder.get_stats()
+    assert stats["written"] == 2
+    assert stats["failed"] == 0
+    assert stats["retries"] == 2
+    assert stats["last_flush_error"] is None
+
+
+def test_batch_is_dropped_after_retries_run_out(writes):
+    writes.failures = [ConnectionError("gone")] * 10
+    recorder = make_recorder(max_retries=2)
+    asyncio.run(recorder.flush([{"id": 1}]))
+    assert len(writes.batches) == 3
+    stats = recorder.get_stats()
+    assert stats["written"] == 0
+    assert stats["failed"] == 1
+    assert stats["retries"] == 2
+    assert stats["last_flush_error"] == "gone"
+
+
+def test_retry_delays_are_bounded(writes):
+    writes.failures = [ConnectionError("gone")] * 10
+    recorder = make_recorder(max_retries=5, retry_base_delay=0.5, retry_max_delay=2.0)
+    asyncio.run(recorder.flush([{"id": 1}]))
+    assert writes.sleeps
+    assert all(0.5 <= delay <= 2.0 for delay in writes.sleeps)
+
+
+def test_stop_flushes_queued_records(writes):
+    recorder = make_recorder(batch_size=2)
+
+    async def scenario():
+        for index in range(5):
+            await recorder.record(id=index)
+        await recorder.stop()
+
+    asyncio.run(scenario())
+    assert [len(batch) for batch in writes.batches] == [2, 2, 1]
+    assert recorder.get_stats()["written"] == 5
+
+
+@pytest.fixture
+def timed_sleeps(writes, clock, monkeypatch):
+    """Retry sleeps that advance the fake monotonic clock instead of waiting."""
+
+    async def sleep(delay):
+        writes.sleeps.append(delay)
+        clock.advance(delay)
+
+    monkeypatch.setattr(recorder_module.asyncio, "sleep", sleep)
+    return writes
+
+
+def test_shutdown_flushes_share_a_short_retry_window(timed_sleeps):
+    timed_sleeps.failures = [ConnectionError("gone")] * 100
+    recorder = make_recorder(
+        batch_size=1, max_retries=50, retry_base_delay=0.5, retry_max_delay=2.0
+    )
+
+    async def scenario():
+        for index in range(4):
+            await recorder.record(id=index)
+        await recorder.stop()
+
+    asyncio.run(scenario())
+    assert sum(timed_sleeps.sleeps) < recorder_module.SHUTDOWN_FLUSH_DEADLINE
+    # Once the window has passed the remaining batches get one attempt each
+    assert [batch[0]["id"] for batch in timed_sleeps.batches[-2:]] == [2, 3]
+    assert recorder.get_stats()["failed"] == 4
+
+
+def test_flush_cancelled_mid_retry_is_finished_by_stop(timed_sleeps, clock, monkeypatch):
+    timed_sleeps.failures = [ConnectionError("gone")] * 100
+    recorder = make_recorder(
+        batch_size=1, max_retries=50, retry_base_delay=0.5, retry_max_delay=2.0
+    )
+    shutdown_sleeps = []
+
+    async def scenario():
+        retrying = asyncio.Event()
+
+        async def sleep(delay):
+            if asyncio.current_task() is recorder.task:
+                if retrying.is_set():
+                    raise AssertionError("flusher retried after it was cancelled")
+                # The flusher waits out its backoff until stop() cancels it
+                retrying.set()
+                await asyncio.Event().wait()
+            shutdown_sleeps.append(delay)
+            clock.advance(delay)
+
+        monkeypatch.setattr(recorder_module.asyncio, "sleep", sleep)
+        await recorder.start()
+        await recorder.record(id=1)
+        await retrying.wait()
+        await recorder.stop()
+
+    asyncio.run(scenario())
+    # stop() finished the batch within its own short window, not a fresh
+    # FLUSH_RETRY_DEADLINE started from the flusher's cancellation handler
+    assert sum(shutdown_sleeps) < recorder_module.SHUTDOWN_FLUSH_DEADLINE
+    assert {record["id"] for batch in timed_sleeps.batches for record in batch} == {1}
+    assert recorder.get_stats()["failed"] == 1
+    assert recorder.unwritten == []
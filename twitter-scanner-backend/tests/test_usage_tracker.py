@@ -0,0 +1,148 @@
+"""Tests for local usage windows, admission checks and snapshots."""
+
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from conftest import FakeClock
+from utils.rate_limiter import (
+    RateLimitManager,
+    UsageTracker,
+    read_snapshot,
+    write_snapshot,
+)
+
+HOUR = 3600
+
+
+@pytest.fixture
+def wall_clock(monkeypatch):
+    """Replace time.time with a FakeClock for the duration of a test."""
+    fake = FakeClock(start=1_700_000_000.0)
+    monkeypatch.setattr(time, "time", fake)
+    return fake
+
+
+def test_window_starts_at_first_charge_and_resets(wall_clock):
+    tracker = UsageTracker(max_usage=10, reset_interval_hours=1)
+    tracker.add_usage("a", 4)
+    wall_clock.advance(HOUR - 1)
+    assert tracker.get_usage("a")["usage"] == 4
+    wall_clock.advance(1)
+    assert tracker.get_usage("a")["usage"] == 0
+
+
+def test_refund_never_starts_a_window(wall_clock):
+    tracker = UsageTracker(max_usage=10, reset_interval_hours=1)
+    tracker.add_usage("a", -3)
+    assert "a" not in tracker.usage
+
+
+def test_reserve_respects_remaining_budget(wall_clock):
+    tracker = UsageTracker(max_usage=10, reset_interval_hours=1)
+    # The first charge in a window is admitted even if it exceeds the limit
+    assert tracker.reserve_usage("a", 12)[0]
+    assert not tracker.reserve_usage("a", 1)[0]
+    assert tracker.reserve_usage("b", 6)[0]
+    reserved, usage_info = tracker.reserve_usage("b", 5)
+    assert not reserved
+    assert usage_info["remaining"] == 4
+
+
+def test_snapshot_skips_ended_windows(wall_clock):
+    tracker = UsageTracker(max_usage=10, reset_interval_hours=1)
+    tracker.add_usage("old", 1)
+    wall_clock.advance(HOUR / 2)
+    tracker.add_usage("new", 2)
+    wall_clock.advance(HOUR / 2)
+    snapshot = tracker.snapshot()
+    assert snapshot["clients"] == {"new": [2, wall_clock() - HOUR / 2]}
+
+
+def test_restore_keeps_window_start_and_merges_new_usage(wall_clock):
+    tracker = UsageTracker(max_usage=10, reset_interval_hours=1)
+    tracker.add_usage("a", 3)
+    tracker.add_usage("b", 1)
+    snapshot = tracker.snapshot()
+
+    wall_clock.advance(HOUR / 2)
+    restarted = UsageTracker(max_usage=10, reset_interval_hours=1)
+    restarted.add_usage("a", 2)
+    assert restarted.restore(snapshot) == 2
+    assert restarted.get_usage("a")["usage"] == 5
+    assert restarted.get_usage("b")["usage"] == 1
+    # Restored windows still end one interval after they first started
+    wall_clock.advance(HOUR / 2)
+    assert restarted.get_usage("a")["usage"] == 0
+    assert restarted.get_usage("b")["usage"] == 0
+
+
+def test_restore_skips_windows_that_ended_while_down(wall_clock):
+    tracker = UsageTracker(max_usage=10, reset_interval_hours=1)
+    tracker.add_usage("a", 3)
+    snapshot = tracker.snapshot()
+    wall_clock.advance(HOUR)
+    restarted = UsageTracker(max_usage=10, reset_interval_hours=1)
+    assert restarted.restore(snapshot) == 0
+    assert restarted.usage == {}
+
+
+def test_snapshot_file_round_trip(tmp_path, wall_clock):
+    tracker = UsageTracker(max_usage=10, reset_interval_hours=1)
+    tracker.add_usage("a", 3)
+    path = str(tmp_path / "nested" / "usage_snapshot.json")
+    write_snapshot(path, tracker.snapshot())
+    write_snapshot(path, tracker.snapshot())
+    assert read_snapshot(path) == json.loads(json.dumps(tracker.snapshot()))
+    # Temporary files are renamed into place, never left behind
+    assert os.listdir(tmp_path / "nested") == ["usage_snapshot.json"]
+
+
+def test_read_missing_snapshot(tmp_path):
+    assert read_snapshot(str(tmp_path / "missing.json")) is None
+
+
+def test_failed_write_keeps_previous_snapshot(tmp_path):
+    path = str(tmp_path / "usage_snapshot.json")
+    write_snapshot(path, {"clients": {}})
+    with pytest.raises(TypeError):
+        write_snapshot(path, {"clients": object()})
+    assert read_snapshot(path) == {"clients": {}}
+    assert os.listdir(tmp_path) == ["usage_snapshot.json"]
+
+
+def test_zero_unit_reservation_is_an_admission_check(wall_clock):
+    tracker = UsageTracker(max_usage=10, reset_interval_hours=1)
+    reserved, usage_info = tracker.reserve_usage("a", 0)
+    assert reserved
+    assert usage_info["remaining"] == 10
+    # Checking never starts a window
+    assert "a" not in tracker.usage
+    tracker.add_usage("a", 9)
+    assert tracker.reserve_usage("a", 0)[0]
+    tracker.add_usage("a", 1)
+    reserved, usage_info = tracker.reserve_usage("a", 0)
+    assert not reserved
+    assert usage_info["usage"] == 10
+
+
+def test_admission_is_one_call_to_the_shared_tracker():
+    class SharedTracker:
+        calls = []
+
+        async def reserve_usage(self, client_key, units):
+            self.calls.append((client_key, units))
+            return False, {"usage": 10, "limit": 10, "remaining": 0, "reset_time": ""}
+
+        async def get_usage(self, client_key):
+            raise AssertionError("admission must not read usage separately")
+
+    manager = RateLimitManager()
+    manager.redis_usage_tracker = SharedTracker()
+    reserved, usage_info = asyncio.run(manager.reserve_usage(None, 0, client_key="a"))
+    assert not reserved
+    assert usage_info["remaining"] == 0
+    assert SharedTracker.calls == [("a", 0)]